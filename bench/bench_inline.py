@@ -0,0 +1,59 @@
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from inline_split import text_to_textnodes, text_to_textnodes_reference
+
+'''
+    Builds a paragraph made of count link (and image) spans separated by a few words of plain text
+'''
+def link_dense_paragraph(count: int):
+    spans = []
+    for i in range(count):
+        if i % 4 == 3:
+            spans.append(f"see ![figure {i}](/images/figure-{i}.png)")
+        else:
+            spans.append(f"read [page number {i}](https://example.com/pages/{i})")
+    return " and ".join(spans)
+
+'''
+    Builds a paragraph made of count alternating bold, italic and code spans
+'''
+def emphasis_dense_paragraph(count: int):
+    spans = []
+    for i in range(count):
+        match i % 3:
+            case 0:
+                spans.append(f"**bold {i}**")
+            case 1:
+                spans.append(f"_italic {i}_")
+            case _:
+                spans.append(f"`code {i}`")
+    return " then ".join(spans)
+
+'''
+    Times one implementation on one paragraph, returning the best per-call time in seconds
+'''
+def time_call(function, text: str, repeat: int = 5):
+    calls = max(1, 20000 // (len(text) // 50 + 1))
+    return min(timeit.repeat(lambda: function(text), number=calls, repeat=repeat)) / calls
+
+def main():
+    print(f"{'paragraph':<12}{'spans':>8}{'chars':>10}{'reference':>14}{'single pass':>14}{'speedup':>10}")
+
+    for name, builder in [("links", link_dense_paragraph), ("emphasis", emphasis_dense_paragraph)]:
+        for count in [10, 100, 1000, 5000]:
+            text = builder(count)
+
+            # Benchmarks are only meaningful if both implementations agree
+            if text_to_textnodes(text) != text_to_textnodes_reference(text):
+                raise Exception(f"text_to_textnodes differs from reference on {name} paragraph with {count} spans")
+
+            reference = time_call(text_to_textnodes_reference, text)
+            single_pass = time_call(text_to_textnodes, text)
+            print(f"{name:<12}{count:>8}{len(text):>10}{reference * 1000:>12.3f}ms{single_pass * 1000:>12.3f}ms{reference / single_pass:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
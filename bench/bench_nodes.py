@@ -0,0 +1,133 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from block_split import markdown_to_html_node
+from htmlnode import HTMLNode, LeafNode, ParentNode
+from inline_split import text_to_textnodes
+from textnode import TextNode, TextType
+from corpus import add_corpus_arguments, corpus_options, generate_page_markdown
+from bench_pipeline import current_commit
+
+'''
+    Returns the bytes one object takes up, including its instance __dict__ if it has one
+'''
+def instance_size(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+'''
+    Counts the HTMLNodes of a tree
+'''
+def count_nodes(root: HTMLNode):
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.children:
+            stack.extend(node.children)
+    return count
+
+'''
+    Measures the memory held by the HTML trees of every page while all of them are alive at once
+    Returns:
+        tuple[int, int, int]: (nodes, bytes held by the trees, peak bytes while building them)
+'''
+def measure_trees(documents: list[str]):
+    gc.collect()
+    tracemalloc.start()
+    trees = [markdown_to_html_node(markdown) for markdown in documents]
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = sum(count_nodes(tree) for tree in trees)
+    return nodes, held, peak
+
+'''
+    Measures the memory held by the inline TextNodes of every paragraph while all of them are alive at once
+    Returns:
+        tuple[int, int]: (text nodes, bytes held by them)
+'''
+def measure_text_nodes(paragraphs: list[str]):
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    node_lists = [text_to_textnodes(paragraph) for paragraph in paragraphs]
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return sum(len(nodes) for nodes in node_lists), held - baseline
+
+'''
+    Times building the HTML tree of every page, returning the fastest of repeat runs in seconds
+'''
+def time_trees(documents: list[str], repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for markdown in documents:
+            markdown_to_html_node(markdown)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory use and build throughput of the node classes on a synthetic corpus")
+    add_corpus_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs, the fastest is reported")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    options = corpus_options(args)
+    rng = random.Random(args.seed)
+    documents = [
+        generate_page_markdown(rng, args.page_size, args.link_density, args.image_density, args.list_depth, args.code_ratio)
+        for _ in range(args.pages)
+    ]
+    paragraphs = [block for markdown in documents for block in markdown.split("\n\n") if not block.startswith(("#", "```", "-", ">", "1."))]
+
+    sizes = {
+        "TextNode": instance_size(TextNode("text", TextType.PLAIN_TEXT)),
+        "LeafNode": instance_size(LeafNode("b", "text")),
+        "ParentNode": instance_size(ParentNode("p", [])),
+    }
+    nodes, tree_bytes, tree_peak = measure_trees(documents)
+    text_nodes, text_node_bytes = measure_text_nodes(paragraphs)
+    seconds = time_trees(documents, args.repeat)
+
+    print(f"{'class':<12}{'bytes/instance':>16}")
+    for name, size in sizes.items():
+        print(f"{name:<12}{size:>16}")
+    print()
+    print(f"HTML trees:  {nodes} nodes, {tree_bytes / 1_000_000:.2f}MB held ({tree_bytes / nodes:.0f} bytes/node), {tree_peak / 1_000_000:.2f}MB peak")
+    print(f"Text nodes:  {text_nodes} nodes, {text_node_bytes / 1_000_000:.2f}MB held ({text_node_bytes / text_nodes:.0f} bytes/node)")
+    print(f"Throughput:  {seconds * 1000:.1f}ms for {len(documents)} pages, {nodes / seconds:,.0f} nodes/sec")
+
+    if args.output:
+        results = {
+            "commit": current_commit(),
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "corpus": options,
+            "instance_bytes": sizes,
+            "html_tree": {"nodes": nodes, "bytes": tree_bytes, "peak_bytes": tree_peak, "seconds": round(seconds, 6)},
+            "text_nodes": {"nodes": text_nodes, "bytes": text_node_bytes},
+        }
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from block_split import BlockType, block_to_blocktype, markdown_to_blocks, markdown_to_html_node
+from generatepage import extract_title
+from inline_split import text_to_textnodes
+from template import load_template
+from corpus import add_corpus_arguments, corpus_options, generate_corpus
+
+# Stages in pipeline order. html_tree is the full markdown_to_html_node call, so it
+# includes the work measured separately by block_split, block_typing and inline_parse.
+STAGES = ["read", "block_split", "block_typing", "inline_parse", "html_tree", "serialize", "template", "write"]
+
+'''
+    Returns the inline text spans of a block the way markdown_to_html_node hands them to text_to_textnodes
+'''
+def inline_texts(block: str, block_type: BlockType):
+    match block_type:
+        case BlockType.PARAGRAPH:
+            return [block.replace("\n", " ")]
+        case BlockType.HEADING:
+            return [block.lstrip("#").strip()]
+        case BlockType.QUOTE:
+            return [block[1:].strip()]
+        case BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
+            return [line.split(" ", 1)[1] for line in block.split("\n")]
+        case _:
+            return []
+
+'''
+    Runs every page through each pipeline stage once, timing stages separately
+    Args:
+        paths (list[str]): REQUIRED - Markdown files to process
+        template_path (str): REQUIRED - HTML template to render pages with
+        out_dir (str): REQUIRED - Directory to write the generated pages into
+    Returns:
+        dict[str, float]: Stage name -> total seconds across all pages
+'''
+def run_pipeline(paths: list[str], template_path: str, out_dir: str):
+    totals = dict.fromkeys(STAGES, 0.0)
+    template = load_template(template_path)
+    clock = time.perf_counter
+
+    for i, file_path in enumerate(paths):
+        start = clock()
+        with open(file_path, "r") as f:
+            markdown = f.read()
+        totals["read"] += clock() - start
+
+        start = clock()
+        blocks = markdown_to_blocks(markdown)
+        totals["block_split"] += clock() - start
+
+        start = clock()
+        block_types = [block_to_blocktype(block) for block in blocks]
+        totals["block_typing"] += clock() - start
+
+        start = clock()
+        for block, block_type in zip(blocks, block_types):
+            for text in inline_texts(block, block_type):
+                text_to_textnodes(text)
+        totals["inline_parse"] += clock() - start
+
+        start = clock()
+        html_node = markdown_to_html_node(markdown)
+        totals["html_tree"] += clock() - start
+
+        start = clock()
+        content = html_node.to_html()
+        totals["serialize"] += clock() - start
+
+        start = clock()
+        page = template.render({"Title": extract_title(markdown), "Content": content})
+        totals["template"] += clock() - start
+
+        start = clock()
+        with open(os.path.join(out_dir, f"{i}.html"), "w") as f:
+            f.write(page)
+        totals["write"] += clock() - start
+
+    return totals
+
+'''
+    Returns the current git commit of the repository, or None outside a git checkout
+'''
+def current_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the markdown to HTML pipeline on a synthetic corpus")
+    add_corpus_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest is reported")
+    parser.add_argument("--template", default=os.path.join(ROOT_DIR, "src", "template.html"), help="HTML template to render with")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, "content")
+        out_dir = os.path.join(tmp, "out")
+        os.makedirs(out_dir)
+
+        paths = generate_corpus(content_dir, **corpus_options(args))
+        input_bytes = sum(os.path.getsize(file_path) for file_path in paths)
+
+        runs = [run_pipeline(paths, args.template, out_dir) for _ in range(args.repeat)]
+
+    megabytes = input_bytes / 1_000_000
+    stages = {}
+    for stage in STAGES:
+        seconds = min(run[stage] for run in runs)
+        stages[stage] = {
+            "seconds": round(seconds, 6),
+            "pages_per_sec": round(len(paths) / seconds, 1) if seconds else None,
+            "mb_per_sec": round(megabytes / seconds, 3) if seconds else None,
+        }
+
+    # html_tree already covers block_split, block_typing and inline_parse
+    total = sum(stages[stage]["seconds"] for stage in ["read", "html_tree", "serialize", "template", "write"])
+
+    results = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "corpus": dict(corpus_options(args), input_bytes=input_bytes),
+        "repeat": args.repeat,
+        "stages": stages,
+        "total": {
+            "seconds": round(total, 6),
+            "pages_per_sec": round(len(paths) / total, 1),
+            "mb_per_sec": round(megabytes / total, 3),
+        },
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Wrote results to {args.output}")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
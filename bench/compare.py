@@ -0,0 +1,30 @@
+import argparse
+import json
+
+'''
+    Prints the per-stage difference between two bench_pipeline.py result files
+'''
+def main():
+    parser = argparse.ArgumentParser(description="Compare two bench_pipeline.py JSON result files")
+    parser.add_argument("before", help="results from the baseline commit")
+    parser.add_argument("after", help="results from the commit being measured")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    if before["corpus"] != after["corpus"]:
+        print("Warning: results were measured on different corpora")
+
+    print(f"{'stage':<14}{'before':>12}{'after':>12}{'change':>10}")
+    rows = [(stage, before["stages"][stage]["seconds"], after["stages"][stage]["seconds"]) for stage in after["stages"] if stage in before["stages"]]
+    rows.append(("total", before["total"]["seconds"], after["total"]["seconds"]))
+
+    for stage, old, new in rows:
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{stage:<14}{old * 1000:>10.1f}ms{new * 1000:>10.1f}ms{change:>10}")
+
+if __name__ == "__main__":
+    main()
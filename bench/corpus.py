@@ -0,0 +1,143 @@
+import argparse
+import os
+import random
+
+WORDS = (
+    "the hobbit ring shire elves dwarves mountain river forest road journey wizard tower king "
+    "sword shield light shadow song tale map door stone fire water west east north south old new"
+).split()
+
+'''
+    Returns a sentence of count random words, optionally sprinkled with links and images
+'''
+def sentence(rng: random.Random, count: int, link_density: float, image_density: float):
+    parts = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < image_density:
+            name = rng.choice(WORDS)
+            parts.append(f"![{name} picture](/images/{name}.png)")
+        elif roll < image_density + link_density:
+            name = rng.choice(WORDS)
+            parts.append(f"[{name}](/blog/{name})")
+        elif roll < image_density + link_density + 0.05:
+            parts.append(f"**{rng.choice(WORDS)}**")
+        elif roll < image_density + link_density + 0.10:
+            parts.append(f"_{rng.choice(WORDS)}_")
+        elif roll < image_density + link_density + 0.12:
+            parts.append(f"`{rng.choice(WORDS)}`")
+        else:
+            parts.append(rng.choice(WORDS))
+    return " ".join(parts)
+
+'''
+    Returns an unordered list block, items below the first level are indented two spaces per level
+    (the parser only understands flat lists, deeper levels exercise its paragraph fallback)
+'''
+def list_block(rng: random.Random, depth: int, link_density: float, image_density: float):
+    lines = []
+    for _ in range(rng.randint(2, 5)):
+        for level in range(depth):
+            lines.append("  " * level + "- " + sentence(rng, rng.randint(3, 10), link_density, image_density))
+    return "\n".join(lines)
+
+'''
+    Generates the markdown for one synthetic page
+    Args:
+        rng (random.Random): REQUIRED - Seeded random generator
+        blocks (int): REQUIRED - Number of blocks after the title
+        link_density (float): REQUIRED - Chance of each word being a link
+        image_density (float): REQUIRED - Chance of each word being an image
+        list_depth (int): REQUIRED - Nesting depth of generated lists
+        code_ratio (float): REQUIRED - Share of blocks that are fenced code blocks
+    Returns:
+        str: Markdown document
+'''
+def generate_page_markdown(rng: random.Random, blocks: int, link_density: float, image_density: float, list_depth: int, code_ratio: float):
+    out = [f"# {sentence(rng, 4, 0, 0).title()}"]
+
+    for _ in range(blocks):
+        roll = rng.random()
+        if roll < code_ratio:
+            code = "\n".join(" ".join(rng.choices(WORDS, k=6)) for _ in range(rng.randint(2, 8)))
+            out.append(f"```\n{code}\n```")
+        elif roll < code_ratio + 0.1:
+            out.append(f"{'#' * rng.randint(2, 4)} {sentence(rng, 5, 0, 0)}")
+        elif roll < code_ratio + 0.2:
+            out.append(list_block(rng, list_depth, link_density, image_density))
+        elif roll < code_ratio + 0.25:
+            out.append(f"> {sentence(rng, 20, link_density, image_density)}")
+        elif roll < code_ratio + 0.3:
+            out.append("\n".join(f"{i + 1}. {sentence(rng, 6, link_density, image_density)}" for i in range(rng.randint(2, 5))))
+        else:
+            out.append(sentence(rng, rng.randint(30, 90), link_density, image_density))
+
+    return "\n\n".join(out) + "\n"
+
+'''
+    Writes a seeded synthetic content tree, the same arguments always produce the same files
+    Args:
+        dest (str): REQUIRED - Directory to write the content tree into
+        pages (int): OPTIONAL - Number of pages, default is 100
+        page_size (int): OPTIONAL - Number of blocks per page, default is 40
+        link_density (float): OPTIONAL - Chance of each word being a link, default is 0.05
+        image_density (float): OPTIONAL - Chance of each word being an image, default is 0.01
+        list_depth (int): OPTIONAL - Nesting depth of generated lists, default is 1
+        code_ratio (float): OPTIONAL - Share of blocks that are code blocks, default is 0.1
+        pages_per_dir (int): OPTIONAL - Pages per directory before starting a new one, default is 50
+        seed (int): OPTIONAL - Random seed, default is 0
+    Returns:
+        list[str]: Paths of the generated markdown files
+'''
+def generate_corpus(dest: str, pages: int = 100, page_size: int = 40, link_density: float = 0.05, image_density: float = 0.01, list_depth: int = 1, code_ratio: float = 0.1, pages_per_dir: int = 50, seed: int = 0):
+    rng = random.Random(seed)
+    paths = []
+
+    for i in range(pages):
+        dir_path = os.path.join(dest, f"section-{i // pages_per_dir:04d}")
+        os.makedirs(dir_path, exist_ok=True)
+
+        file_path = os.path.join(dir_path, f"page-{i:06d}.md")
+        with open(file_path, "w") as f:
+            f.write(generate_page_markdown(rng, page_size, link_density, image_density, list_depth, code_ratio))
+        paths.append(file_path)
+
+    return paths
+
+'''
+    Adds the corpus generator options to an argparse parser, shared with the benchmark scripts
+'''
+def add_corpus_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--pages", type=int, default=100, help="number of pages")
+    parser.add_argument("--page-size", type=int, default=40, help="blocks per page")
+    parser.add_argument("--link-density", type=float, default=0.05, help="chance of each word being a link")
+    parser.add_argument("--image-density", type=float, default=0.01, help="chance of each word being an image")
+    parser.add_argument("--list-depth", type=int, default=1, help="nesting depth of lists")
+    parser.add_argument("--code-ratio", type=float, default=0.1, help="share of blocks that are code blocks")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+
+'''
+    Returns the generate_corpus keyword arguments from parsed command line options
+'''
+def corpus_options(args: argparse.Namespace):
+    return {
+        "pages": args.pages,
+        "page_size": args.page_size,
+        "link_density": args.link_density,
+        "image_density": args.image_density,
+        "list_depth": args.list_depth,
+        "code_ratio": args.code_ratio,
+        "seed": args.seed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic markdown content tree")
+    parser.add_argument("dest", help="directory to write the content tree into")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.dest, **corpus_options(args))
+    print(f"Wrote {len(paths)} page(s) to {args.dest}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+from copystatic import transfer_file
+from manifest import hash_file, list_files
+import hashlib
+import json
+import os
+
+# Name of the asset manifest written to the root of docs
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+
+# Hex digits of the content hash put into fingerprinted names
+FINGERPRINT_LENGTH = 8
+
+# Static files referenced by pages that get a fingerprinted copy. HTML keeps its name, it's what URLs point to.
+FINGERPRINT_EXTENSIONS = {
+    ".css", ".js", ".mjs", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg", ".ico",
+    ".woff", ".woff2", ".ttf", ".otf", ".mp4", ".webm", ".mp3", ".pdf",
+}
+
+'''
+    Returns the fingerprinted name of a static file, the content hash goes before the extension
+    Args:
+        rel_path (str): REQUIRED - Path of the file relative to the static directory, e.g. "images/logo.png"
+        file_hash (str): REQUIRED - Hex digest of the file's contents, see hash_file
+    Returns:
+        str: e.g. "images/logo.3f9a1c2b.png"
+'''
+def fingerprint_path(rel_path: str, file_hash: str):
+    stem, extension = os.path.splitext(rel_path)
+    return f"{stem}.{file_hash[:FINGERPRINT_LENGTH]}{extension}"
+
+class AssetManifest:
+
+    '''
+    AssetManifest class, maps static files to their content-hashed copies so pages can reference assets
+    under names that change whenever their contents do (and can be cached forever by browsers).
+    The original files stay in docs too, for references that aren't rewritten (CSS url(), relative links).
+    Args:
+        assets (dict[str, str] | None): Static file path -> fingerprinted path, both relative to the docs directory
+    '''
+    def __init__(self, assets: dict[str, str] | None = None):
+        self.assets = assets if assets is not None else {}
+
+    '''
+    Fingerprints every static file with one of the FINGERPRINT_EXTENSIONS
+    Args:
+        static_path (str): REQUIRED - Path to the static assets directory
+        hashes (dict[str, str] | None): OPTIONAL - Already known hashes by relative path, to avoid hashing twice. Defaults to None.
+        docs_path (str | None): OPTIONAL - Output directory the static files are already synced into. Names are then
+            hashed from the copies in it, which hold what earlier stages wrote (minified CSS, optimized images), so
+            a name never stands for two different contents. Defaults to None, the static files are hashed.
+    Returns:
+        AssetManifest
+    '''
+    @classmethod
+    def from_static(cls, static_path: str, hashes: dict[str, str] | None = None, docs_path: str | None = None):
+        hashes = hashes if hashes is not None else {}
+        assets = {}
+        for rel_path in list_files(static_path):
+            if os.path.splitext(rel_path)[1].lower() in FINGERPRINT_EXTENSIONS:
+                file_hash = hashes.get(rel_path) or hash_file(os.path.join(docs_path if docs_path is not None else static_path, rel_path))
+                assets[rel_path] = fingerprint_path(rel_path, file_hash)
+        return cls(assets)
+
+    '''
+    Loads the asset manifest of the last build from a docs directory, an empty one when it has none
+    '''
+    @classmethod
+    def load(cls, docs_path: str):
+        try:
+            with open(os.path.join(docs_path, ASSET_MANIFEST_NAME), "r") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+    '''
+    Writes the manifest to the root of docs, replacing the old one atomically
+    '''
+    def save(self, docs_path: str):
+        manifest_path = os.path.join(docs_path, ASSET_MANIFEST_NAME)
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.assets, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+
+    '''
+    Short digest of the whole mapping, changes whenever any asset does
+    '''
+    @property
+    def digest(self):
+        return hashlib.sha256(json.dumps(self.assets, sort_keys=True).encode()).hexdigest()[:16]
+
+    '''
+    Returns the URL of an asset's fingerprinted copy. Only root-relative URLs are rewritten, query strings
+    and fragments are kept, anything that isn't a fingerprinted asset is returned unchanged.
+    Args:
+        url (str): REQUIRED - URL as written in a page or template, before the basepath is applied
+    Returns:
+        str
+    '''
+    def url_for(self, url: str):
+        if not url.startswith("/") or url.startswith("//"):
+            return url
+
+        end = len(url)
+        for separator in "?#":
+            position = url.find(separator)
+            if position != -1:
+                end = min(end, position)
+
+        fingerprinted = self.assets.get(url[1:end])
+        return "/" + fingerprinted + url[end:] if fingerprinted is not None else url
+
+    '''
+    Copies every asset in docs to its fingerprinted path. Copies are made from the docs tree rather than static,
+    so they match what earlier stages wrote there (e.g. optimized images). When the names were hashed from the
+    same docs tree (see from_static), a name changes with the contents, so copies that already exist are up to
+    date and skipped.
+    Args:
+        docs_path (str): REQUIRED - Path to the output directory, static files already synced into it
+        link (str): OPTIONAL - "hardlink", "reflink" or "copy", see transfer_file. Default is "reflink".
+    Returns:
+        int: Number of copies written
+    '''
+    def write(self, docs_path: str, link: str = "reflink"):
+        written = 0
+        for rel_path, fingerprinted in self.assets.items():
+            dest = os.path.join(docs_path, fingerprinted)
+            if not os.path.exists(dest):
+                transfer_file(os.path.join(docs_path, rel_path), dest, link)
+                written += 1
+        return written
+
+    '''
+    Returns every output the manifest accounts for: the fingerprinted copies and the manifest file itself
+    '''
+    def outputs(self):
+        return [*self.assets.values(), ASSET_MANIFEST_NAME]
+
+    def __repr__(self):
+        return f"AssetManifest(assets={len(self.assets)})"
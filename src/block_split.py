@@ -2,9 +2,18 @@ from enum import Enum
 from htmlnode import HTMLNode, LeafNode, ParentNode
 from textnode import *
 from inline_split import text_to_textnodes
+from profiling import stage
+from typing import Iterable, NamedTuple
 
 import re
 
+# Bump whenever a change to the parser (block_split, inline_split, textnode or htmlnode) changes the
+# HTML generated for the same markdown, it invalidates every render cached by earlier versions
+PARSER_VERSION = 2
+
+# Attributes holding URLs, of links (href) and images (src)
+URL_PROPS = ("href", "src")
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -13,6 +22,97 @@ class BlockType(Enum):
     UNORDERED_LIST = "unordered_list"
     ORDERED_LIST = "ordered_list"
 
+class Block(NamedTuple):
+    '''
+        A single block of Markdown text found by iter_blocks
+        Args:
+            text (str): Block text with leading and trailing whitespace stripped
+            block_type (BlockType): Type of the block
+            start_line (int): Line number (1-based) of the block's first line
+            end_line (int): Line number (1-based) of the block's last line
+    '''
+    text: str
+    block_type: BlockType
+    start_line: int
+    end_line: int
+
+'''
+    Scans Markdown line by line and lazily yields each block with its type and line range. Blocks are
+    separated by blank lines, except inside a fenced code block, which runs until its closing fence.
+    Only the current block is ever held in memory, so an open file can be scanned directly.
+    Args:
+        lines (Iterable[str]): REQUIRED - Lines of the document, with or without line endings (e.g. a file object)
+    Returns:
+        Iterator[Block]
+'''
+def iter_blocks(lines: Iterable[str]):
+    return _iter_numbered_blocks(enumerate(lines, 1))
+
+'''
+    iter_blocks over (line number, line) pairs, so the lines of an unclosed fence can be scanned again
+    with their own line numbers
+'''
+def _iter_numbered_blocks(numbered_lines: Iterable[tuple[int, str]]):
+    current = []
+    start_line = 0
+    in_fence = False
+    line_number = 0
+
+    for line_number, line in numbered_lines:
+        line = line.rstrip("\r\n")
+
+        if in_fence:
+            current.append(line)
+            if line.strip().startswith("```"):
+                in_fence = False
+                yield _make_block(current, start_line, line_number)
+                current = []
+            continue
+
+        if line.strip() == "":
+            if current:
+                yield _make_block(current, start_line, line_number - 1)
+                current = []
+            continue
+
+        if not current:
+            start_line = line_number
+            # A fence only opens a code block at the start of a block, like block_to_blocktype expects
+            in_fence = _is_fence_opener(line)
+        current.append(line)
+
+    if not current:
+        return
+    if not in_fence:
+        yield _make_block(current, start_line, line_number)
+        return
+
+    # The fence never closed: it ends at its first blank line like any other block, and the lines
+    # after that are blocks of their own
+    blank = next((i for i, line in enumerate(current) if line.strip() == ""), len(current))
+    yield _make_block(current[:blank], start_line, start_line + blank - 1)
+    yield from _iter_numbered_blocks(enumerate(current[blank + 1:], start_line + blank + 1))
+
+'''
+    Returns whether a line opens a fenced code block: it starts with ``` (indented or not) and doesn't
+    close it again on the same line, like ```code``` does
+    Args:
+        line (str): REQUIRED
+    Returns:
+        bool
+'''
+def _is_fence_opener(line: str):
+    stripped = line.strip()
+    return stripped.startswith("```") and "```" not in stripped[3:]
+
+'''
+    Strips a block's lines the way markdown_to_blocks always has and types it without re-splitting the text
+'''
+def _make_block(lines: list[str], start_line: int, end_line: int):
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return Block("\n".join(lines), lines_to_blocktype(lines), start_line, end_line)
+
 '''
     Takes a raw Markdown string (representing full doc) and returns a list of block strings
     Args:
@@ -21,14 +121,7 @@ class BlockType(Enum):
         list[str]: List of block strings, each block represents separate block of Markdown text
 '''
 def markdown_to_blocks(markdown: str):
-    blocks = []
-    split_by_newlines = markdown.split("\n\n")
-
-    for block in split_by_newlines:
-        if block.strip() != "":
-            blocks.append(block.strip())
-
-    return blocks
+    return [block.text for block in iter_blocks(markdown.split("\n"))]
 
 '''
     Takes a single block of Markdown text and returns the corresponding BlockType
@@ -39,24 +132,33 @@ def markdown_to_blocks(markdown: str):
         blocktype (BlockType)
 '''
 def block_to_blocktype(markdown: str):   
+    return lines_to_blocktype(markdown.split("\n"))
 
-    lines = markdown.split("\n")
+'''
+    Returns the BlockType of a block that is already split into lines
+    Args:
+        lines (list[str]): REQUIRED - Lines of the block, leading/trailing whitespace of the block stripped
+    Returns:
+        blocktype (BlockType)
+'''
+def lines_to_blocktype(lines: list[str]):
+    first = lines[0]
 
-    if (re.match(r"#{1,6} .+", markdown)):
+    if (re.match(r"#{1,6} .+", first)):
         return BlockType.HEADING
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
+    if len(lines) > 1 and _is_fence_opener(first) and lines[-1].lstrip().startswith("```"):
         return BlockType.CODE
-    if (markdown.startswith(">")):
+    if (first.startswith(">")):
         for line in lines:
             if not line.startswith(">"):
                 return BlockType.PARAGRAPH
         return BlockType.QUOTE
-    if (markdown.startswith("- ")):
+    if (first.startswith("- ")):
         for line in lines:
             if not line.startswith("- "):
                 return BlockType.PARAGRAPH
         return BlockType.UNORDERED_LIST
-    if markdown.startswith("1. "):
+    if first.startswith("1. "):
         for i, line in enumerate(lines):
             if not line.startswith(f"{i+1}. "):
                 return BlockType.PARAGRAPH
@@ -68,19 +170,26 @@ def block_to_blocktype(markdown: str):
     Converts a full Markdown doc into a single parent HTMLNode with children representing each
     block of Markdown text.
     Args:
-        markdown (str): REQUIRED - Full Markdown document to convert into HTMLNode tree
+        markdown (str | Iterable[str]): REQUIRED - Full Markdown document to convert into HTMLNode tree,
+            either as a string or as lines (e.g. an open file, which is then scanned without reading it whole)
+        links (list[tuple[str, int]] | None): OPTIONAL - Filled with (URL, line number) for every link and image
+            in the document, in document order. Defaults to None.
     Returns:
         HTMLNode: Root node of the resulting HTMLNode tree representing the full Markdown document
 '''
-def markdown_to_html_node(markdown: str):
-    # Get all separate blocks of Markdown from full doc
-    blocks = markdown_to_blocks(markdown)
+def markdown_to_html_node(markdown: str | Iterable[str], links: list[tuple[str, int]] | None = None):
+    lines = markdown.split("\n") if isinstance(markdown, str) else markdown
+    blocks = iter_blocks(lines)
 
     children = []
 
-    for block in blocks:
-        # Determine block type
-        block_type = block_to_blocktype(block)
+    while True:
+        # Get the next block of Markdown and its type
+        with stage("markdown_to_blocks"):
+            next_block = next(blocks, None)
+        if next_block is None:
+            break
+        block, block_type = next_block.text, next_block.block_type
 
         # Convert block to corresponding HTMLNode based on block type
         match block_type:
@@ -104,9 +213,48 @@ def markdown_to_html_node(markdown: str):
             case BlockType.ORDERED_LIST:
                 ol_node = ordered_list_to_htmlnode(block)
                 children.append(ol_node)
+
+        if links is not None and block_type != BlockType.CODE:
+            links.extend(block_links(children[-1], next_block))
     
     return ParentNode(tag="div", children=children)
 
+'''
+    Returns the (URL, line number) of every link and image in a block's HTMLNode, in document order.
+    Each URL is found again in the block's text after the previous one to tell which line it's on.
+    Args:
+        node (HTMLNode): REQUIRED - Node the block was converted to
+        block (Block): REQUIRED - The block
+    Returns:
+        list[tuple[str, int]]
+'''
+def block_links(node: HTMLNode, block: Block):
+    urls = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.props:
+            urls.extend(current.props[prop] for prop in URL_PROPS if prop in current.props)
+        if current.children:
+            stack.extend(reversed(current.children))
+
+    if not urls:
+        return []
+
+    lines = block.text.split("\n")
+    line_index, column = 0, 0
+    found = []
+    for url in urls:
+        target = f"]({url})"
+        for index in range(line_index, len(lines)):
+            position = lines[index].find(target, column if index == line_index else 0)
+            if position != -1:
+                line_index, column = index, position + len(target)
+                break
+        found.append((url, block.start_line + line_index))
+
+    return found
+
 '''
     Converts a block representing an unordered list into corresponding HTMLNode with 
     it's children representing each list item
@@ -220,14 +368,15 @@ def heading_to_htmlnode(block: str):
         list[HTMLNode]
 '''
 def text_to_children(text: str):
-    # Get a list of the various inline formatting within the text
-    inline_text_nodes = text_to_textnodes(text)
+    with stage("text_to_children"):
+        # Get a list of the various inline formatting within the text
+        inline_text_nodes = text_to_textnodes(text)
 
-    html_nodes = []
+        html_nodes = []
 
-    # Convert each TextNode to HTMLNodes 
-    for node in inline_text_nodes:
-        html_node = node.text_node_to_html_node()
-        html_nodes.append(html_node)
+        # Convert each TextNode to HTMLNodes 
+        for node in inline_text_nodes:
+            html_node = node.text_node_to_html_node()
+            html_nodes.append(html_node)
 
     return html_nodes
\ No newline at end of file
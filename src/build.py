@@ -0,0 +1,518 @@
+from os import path
+from assets import ASSET_MANIFEST_NAME, AssetManifest
+from copystatic import sync_directory, transfer_file
+from compress import precompress_tree, variant_paths
+from generatepage import PageBuildError, PageRecord, find_pages, generate_pages
+from images import DEFAULT_WIDTHS, image_outputs, images_digest, is_image, load_images, optimize_images
+from manifest import BuildManifest, hash_file, list_files
+from metaindex import MetadataIndex
+from listings import DEFAULT_PAGE_SIZE, listing_outputs, update_listings
+from pipeline import PipelineReport, generate_pipelined
+from minify import MinifyReport, is_minifiable, minify_static
+from depgraph import DependencyGraph
+from feeds import feed_outputs, load_feeds_state, update_feeds
+from rendercache import RenderCache
+from searchindex import load_search_state, search_outputs, update_search_index
+from template import load_template
+from profiling import stage
+from functools import partial
+import os
+import posixpath
+
+'''
+    Rebuilds the whole site: syncs static assets into the docs directory (copying only new or modified files
+    and removing anything stale) and generates every page
+    Args:
+        static_path (str): REQUIRED - Path to the static assets directory
+        content_path (str): REQUIRED - Path to the markdown content directory
+        template_path (str): REQUIRED - Path to HTML template file
+        docs_path (str): REQUIRED - Path to the output directory
+        basepath (str): OPTIONAL - Base path to use for generated links, default is "/"
+        workers (int): OPTIONAL - Number of worker processes to render pages with, default is 1
+        link (str): OPTIONAL - How static files are placed in docs, "hardlink", "reflink" or "copy". Default is "reflink".
+        compare (str): OPTIONAL - How unchanged static files are detected, "mtime" or "hash". Default is "mtime".
+        precompress_state (str | None): OPTIONAL - State file for precompress_tree, gzip/brotli variants are only
+            written (and kept between builds) when given. Defaults to None.
+        render_cache (RenderCache | None): OPTIONAL - Cache of rendered page bodies, pages whose markdown is
+            cached only re-run the template step. Defaults to None.
+        depgraph_path (str | None): OPTIONAL - File the build's DependencyGraph is saved to. Defaults to None.
+        search_state (str | None): OPTIONAL - State file for update_search_index, the search index is only
+            written when given. Defaults to None.
+        fingerprint (bool): OPTIONAL - Whether to copy assets to content-hashed names, point pages at them and
+            write docs/asset-manifest.json. Defaults to False.
+        image_state (str | None): OPTIONAL - State file for optimize_images, images are only optimized (and given
+            resized variants) when given. Processed images are cached in the directory next to it. Defaults to None.
+        image_widths (list[int]): OPTIONAL - Widths of the resized image variants, default is DEFAULT_WIDTHS
+        minify_state (str | None): OPTIONAL - State file for minify_static, pages and static HTML/CSS are only
+            minified when given. Minified static files are cached in the directory next to it. Defaults to None.
+        max_rss (int | None): OPTIONAL - Memory budget in bytes, page rendering is throttled while the build
+            process is over it, see generate_pages. Defaults to None.
+        site_url (str | None): OPTIONAL - Scheme and host the site is served from, e.g. "https://example.com".
+            Sitemaps and feeds need absolute URLs. Defaults to None.
+        feeds_state (str | None): OPTIONAL - State file for update_feeds, sitemap.xml, atom.xml and rss.xml are
+            only written when given along with site_url. Defaults to None.
+        metadata_db (str | None): OPTIONAL - SQLite database the pages' front matter, titles and dates are
+            indexed in, see MetadataIndex. Defaults to None.
+        listings_state (str | None): OPTIONAL - State file for update_listings, paginated directory, tag and
+            archive listings are only written when given along with metadata_db. Defaults to None.
+        page_size (int): OPTIONAL - Entries per listing page, default is DEFAULT_PAGE_SIZE
+        io_threads (int | None): OPTIONAL - Render through generate_pipelined with this many reader and as many
+            writer threads, and report the overlap of reading, rendering and writing. Defaults to None.
+    Returns:
+        None
+'''
+def full_build(static_path: str, content_path: str, template_path: str, docs_path: str, basepath: str = "/", workers: int = 1, link: str = "reflink", compare: str = "mtime", precompress_state: str | None = None, render_cache: RenderCache | None = None, depgraph_path: str | None = None, search_state: str | None = None, fingerprint: bool = False, image_state: str | None = None, image_widths: list[int] = DEFAULT_WIDTHS, minify_state: str | None = None, max_rss: int | None = None, site_url: str | None = None, feeds_state: str | None = None, metadata_db: str | None = None, listings_state: str | None = None, page_size: int = DEFAULT_PAGE_SIZE, io_threads: int | None = None):
+    pages = find_pages(content_path, docs_path, template_path)
+    images = None
+    if image_state is not None:
+        images = process_images(static_path, docs_path, image_state, workers, image_widths, link)
+        # Pages embed the images' sizes and variants, cached bodies are only valid for the same images
+        if render_cache is not None:
+            render_cache = render_cache.salted(images_digest(images))
+    report = MinifyReport() if minify_state is not None else None
+    # Written minified by the image and minify stages instead of being synced
+    exclude = set(images) if images is not None else set()
+    if report is not None:
+        exclude.update(minify_static_files(static_path, docs_path, minify_state, report))
+    # Names are hashed from docs once the static files are synced, the copies made for them until then stay
+    previous_assets = AssetManifest.load(docs_path) if fingerprint else None
+    # Pages are about to be rewritten, everything else in docs that isn't a static file is stale
+    keep = {path.relpath(dest_path, docs_path).replace(os.sep, "/") for _, dest_path, _ in pages}
+    if search_state is not None:
+        # Only shards whose pages changed get rewritten
+        keep.update(search_outputs(search_state))
+    feeds_state = feeds_state if site_url is not None else None
+    if feeds_state is not None:
+        keep.update(feed_outputs(feeds_state))
+    listings_state = listings_state if metadata_db is not None else None
+    if listings_state is not None:
+        keep.update(listing_outputs(listings_state))
+    if previous_assets is not None:
+        keep.update(previous_assets.outputs())
+    if images is not None:
+        keep.update(image_outputs(images))
+    if precompress_state is not None:
+        # Existing variants are checked against their source hash by precompress_tree, not thrown away
+        keep.update(variant for rel_path in keep | set(list_files(static_path)) for variant in variant_paths(rel_path))
+
+    with stage("sync_static"):
+        copied, skipped, removed = sync_directory(static_path, docs_path, compare=compare, link=link, keep=keep, exclude=exclude)
+    print(f"Synced static files: {copied} copied, {skipped} unchanged, {removed} stale output(s) removed")
+    assets = None
+    if fingerprint:
+        assets = AssetManifest.from_static(static_path, docs_path=docs_path)
+        fingerprint_assets(docs_path, assets, link)
+        for fingerprinted in set(previous_assets.assets.values()) - set(assets.assets.values()):
+            remove_output(path.join(docs_path, fingerprinted), docs_path)
+
+    graph = DependencyGraph(docs_path) if depgraph_path is not None else None
+    search_pages = {} if search_state is not None else None
+    feed_pages = {} if feeds_state is not None else None
+    metadata_index = MetadataIndex(metadata_db) if metadata_db is not None else None
+    pipeline_report = PipelineReport() if io_threads is not None else None
+    errors = pages_generator(io_threads, pipeline_report)(
+        pages, basepath, workers, render_cache, index_terms=search_state is not None, assets=assets, images=images, minify=report is not None,
+        on_record=lambda record: collect_record(record, docs_path, graph, search_pages, report, feed_pages, metadata_index), max_rss=max_rss,
+    )
+    if pipeline_report is not None:
+        print(pipeline_report.report())
+    if report is not None:
+        print(report.report())
+    if render_cache is not None:
+        prune_render_cache(render_cache)
+    if graph is not None:
+        record_dependencies(graph, static_path, pages)
+        graph.save(depgraph_path)
+    if metadata_index is not None:
+        update_metadata(metadata_index, pages, len(pages) - len(errors))
+
+    if search_state is not None:
+        update_search(docs_path, search_state, search_pages, basepath)
+
+    if feeds_state is not None:
+        write_feeds(docs_path, feeds_state, feed_pages, site_url, basepath)
+
+    if listings_state is not None:
+        write_listings(docs_path, listings_state, metadata_db, template_path, pages, page_size, basepath, assets, report is not None)
+
+    if precompress_state is not None:
+        precompress(docs_path, precompress_state, workers)
+
+    # Raised only now, so the search index, feeds and listings still cover the pages that did render
+    if errors:
+        raise PageBuildError(errors)
+
+'''
+    Returns generate_pages, or generate_pipelined with io_threads I/O threads filling report when io_threads is given
+'''
+def pages_generator(io_threads: int | None, report: PipelineReport | None = None):
+    if io_threads is None:
+        return generate_pages
+    return partial(generate_pipelined, io_threads=io_threads, report=report)
+
+'''
+    Runs the precompression stage over the docs directory and reports what it did
+'''
+def precompress(docs_path: str, precompress_state: str, workers: int = 1):
+    with stage("precompress"):
+        compressed, skipped, removed = precompress_tree(docs_path, precompress_state, workers)
+    print(f"Precompressed {compressed} file(s), {skipped} unchanged, variants of {removed} removed file(s) deleted")
+
+'''
+    Copies assets to their fingerprinted names and writes the asset manifest, see AssetManifest
+'''
+def fingerprint_assets(docs_path: str, assets: AssetManifest, link: str = "reflink"):
+    with stage("fingerprint_assets"):
+        written = assets.write(docs_path, link)
+        assets.save(docs_path)
+    print(f"Fingerprinted {len(assets.assets)} asset(s), {written} copied")
+
+'''
+    Runs the image stage and reports what it did, see optimize_images
+'''
+def process_images(static_path: str, docs_path: str, image_state: str, workers: int = 1, widths: list[int] = DEFAULT_WIDTHS, link: str = "reflink", hashes: dict[str, str] | None = None):
+    cache_dir = path.join(path.dirname(image_state), "images")
+    with stage("optimize_images"):
+        images, processed, reused = optimize_images(static_path, docs_path, image_state, cache_dir, workers, widths, link, hashes)
+    print(f"Optimized images: {processed} processed, {reused} from cache")
+    return images
+
+'''
+    Runs the static part of the minify stage and reports what it did, see minify_static.
+    Returns the paths relative to static of the files it wrote.
+'''
+def minify_static_files(static_path: str, docs_path: str, minify_state: str, report: MinifyReport, hashes: dict[str, str] | None = None):
+    cache_dir = path.join(path.dirname(minify_state), "minify")
+    with stage("minify_static"):
+        minified, skipped = minify_static(static_path, docs_path, minify_state, cache_dir, report, hashes)
+    print(f"Minified static files: {len(minified) - skipped} written, {skipped} unchanged")
+    return minified
+
+'''
+    Runs the search index stage and reports what it did, see update_search_index
+'''
+def update_search(docs_path: str, search_state: str, search_pages: dict[str, tuple[str, str, dict[str, int]]], basepath: str = "/"):
+    with stage("search_index"):
+        written, unchanged = update_search_index(docs_path, search_state, search_pages, basepath)
+    print(f"Search index: {len(search_pages)} page(s), {written} shard(s) written, {unchanged} unchanged")
+
+'''
+    Drops the metadata index rows of removed pages, commits the rows added while rendering and reports it
+'''
+def update_metadata(metadata_index: MetadataIndex, pages: list[tuple[str, str, str]], updated: int):
+    with stage("metadata_index"):
+        removed = metadata_index.retain(source for source, _, _ in pages)
+        metadata_index.commit()
+        metadata_index.close()
+    print(f"Metadata index: {updated} page(s) updated, {removed} removed")
+
+'''
+    Runs the sitemap and feeds stage and reports what it did, see update_feeds
+'''
+def write_feeds(docs_path: str, feeds_state: str, feed_pages: dict[str, tuple[str, str, float, str]], site_url: str, basepath: str = "/"):
+    with stage("feeds"):
+        written, unchanged = update_feeds(docs_path, feeds_state, feed_pages, site_url, basepath)
+    print(f"Sitemap and feeds: {len(feed_pages)} page(s), {written} file(s) written, {unchanged} unchanged")
+
+'''
+    Runs the listings stage and reports what it did, see update_listings. Listing directories use the template
+    of the pages found in them.
+'''
+def write_listings(docs_path: str, listings_state: str, metadata_db: str, template_path: str, pages: list[tuple[str, str, str]], page_size: int = DEFAULT_PAGE_SIZE, basepath: str = "/", assets: AssetManifest | None = None, minify: bool = False):
+    templates = {posixpath.dirname(path.relpath(dest_path, docs_path).replace(os.sep, "/")): page_template for _, dest_path, page_template in pages}
+    with stage("listings"):
+        metadata_index = MetadataIndex(metadata_db)
+        try:
+            groups, written, unchanged, removed = update_listings(docs_path, listings_state, metadata_index, template_path, templates, page_size, basepath, assets, minify)
+        finally:
+            metadata_index.close()
+    print(f"Listings: {groups} group(s) checked, {written} page(s) written, {unchanged} unchanged, {removed} removed")
+
+'''
+    Returns the partials a template includes, or none if it can't be compiled (its pages fail to render anyway)
+'''
+def template_partials(template_path: str):
+    try:
+        return load_template(template_path).partials
+    except (OSError, ValueError):
+        return []
+
+'''
+    Adds a build's static files and templates to a dependency graph, rendered pages are added by collect_record
+    Args:
+        graph (DependencyGraph): REQUIRED - Graph to fill
+        static_path (str): REQUIRED - Path to the static assets directory
+        pages (list[tuple[str, str, str]]): REQUIRED - Every page of the build, see find_pages
+    Returns:
+        None
+'''
+def record_dependencies(graph: DependencyGraph, static_path: str, pages: list[tuple[str, str, str]]):
+    graph.static = {path.join(static_path, rel_path): rel_path for rel_path in list_files(static_path)}
+
+    for _, _, page_template in pages:
+        if page_template not in graph.templates:
+            graph.templates[page_template] = template_partials(page_template)
+
+'''
+    Keeps what the later stages need of a rendered page as soon as it's done: its dependency graph entry,
+    search terms, minified size, sitemap/feed entry and metadata. Records aren't held until the end of the build.
+    Args:
+        record (PageRecord): REQUIRED - Record of the rendered page
+        docs_path (str): REQUIRED - Path to the output directory
+        graph (DependencyGraph | None): REQUIRED - Graph the page is added to, None when not recorded
+        search_pages (dict | None): REQUIRED - Filled with source MD path -> (output, title, terms), see update_search_index
+        report (MinifyReport | None): REQUIRED - Gets the page's size before and after minification
+        feed_pages (dict | None): OPTIONAL - Filled with source MD path -> (output, title, modification time, hash),
+            see update_feeds. Defaults to None.
+        metadata_index (MetadataIndex | None): OPTIONAL - Gets the page's row. Defaults to None.
+    Returns:
+        None
+'''
+def collect_record(record: PageRecord, docs_path: str, graph: DependencyGraph | None, search_pages: dict[str, tuple[str, str, dict[str, int]]] | None, report: MinifyReport | None, feed_pages: dict[str, tuple[str, str, float, str]] | None = None, metadata_index: MetadataIndex | None = None):
+    if graph is not None:
+        graph.add_page(record)
+    if search_pages is not None and record.terms is not None:
+        search_pages[record.source] = (path.relpath(record.output, docs_path).replace(os.sep, "/"), record.title, record.terms)
+    if report is not None and record.sizes is not None:
+        report.add(".html", *record.sizes)
+    if feed_pages is not None:
+        feed_pages[record.source] = (path.relpath(record.output, docs_path).replace(os.sep, "/"), record.title, record.modified, record.source_hash)
+    if metadata_index is not None:
+        metadata_index.add_page(record, docs_path)
+
+'''
+    Evicts least recently used render cache entries once the cache is over its size cap
+'''
+def prune_render_cache(render_cache: RenderCache):
+    with stage("render_cache_prune"):
+        evicted = render_cache.prune()
+    if evicted:
+        print(f"Render cache: evicted {evicted} least recently used entr{'y' if evicted == 1 else 'ies'}")
+
+'''
+    Deletes a generated file, then any directories above it (up to root) left empty by the removal
+    Args:
+        file_path (str): REQUIRED - Path of the output file to delete
+        root (str): REQUIRED - Output root directory, never removed itself
+    Returns:
+        None
+'''
+def remove_output(file_path: str, root: str):
+    if path.exists(file_path):
+        os.remove(file_path)
+
+    dir_path = path.dirname(file_path)
+    while path.abspath(dir_path) != path.abspath(root) and path.isdir(dir_path) and not os.listdir(dir_path):
+        os.rmdir(dir_path)
+        dir_path = path.dirname(dir_path)
+
+'''
+    Rebuilds only the outputs whose inputs changed since the last build, as recorded in the build manifest.
+    Static files are re-copied when their hash changes, pages are re-rendered when their markdown changes
+    (or when the template they use, one of its partials or the basepath changes), and outputs whose sources
+    were removed are deleted.
+    Args:
+        static_path (str): REQUIRED - Path to the static assets directory
+        content_path (str): REQUIRED - Path to the markdown content directory
+        template_path (str): REQUIRED - Path to the default HTML template file
+        docs_path (str): REQUIRED - Path to the output directory
+        manifest_path (str): REQUIRED - Path to the build manifest file
+        basepath (str): OPTIONAL - Base path to use for generated links, default is "/"
+        workers (int): OPTIONAL - Number of worker processes to render pages with, default is 1
+        link (str): OPTIONAL - How static files are placed in docs, "hardlink", "reflink" or "copy". Default is "reflink".
+        precompress_state (str | None): OPTIONAL - State file for precompress_tree, gzip/brotli variants are only
+            written when given. Defaults to None.
+        render_cache (RenderCache | None): OPTIONAL - Cache of rendered page bodies, so pages re-rendered for a
+            template or basepath change skip parsing. Defaults to None.
+        depgraph_path (str | None): OPTIONAL - File the DependencyGraph is kept in, entries of pages that aren't
+            re-rendered are carried over from the previous build. Defaults to None.
+        search_state (str | None): OPTIONAL - State file for update_search_index, the search index is only
+            written when given. Defaults to None.
+        fingerprint (bool): OPTIONAL - Whether to copy assets to content-hashed names, see full_build. Pages are
+            re-rendered when the fingerprinted names change. Defaults to False.
+        image_state (str | None): OPTIONAL - State file for optimize_images, see full_build. Pages are re-rendered
+            when an image's size or variants change. Defaults to None.
+        image_widths (list[int]): OPTIONAL - Widths of the resized image variants, default is DEFAULT_WIDTHS
+        minify_state (str | None): OPTIONAL - State file for minify_static, see full_build. Every page (and static
+            HTML/CSS file) is rewritten when the last build minified and this one doesn't, or the other way round.
+            Defaults to None.
+        max_rss (int | None): OPTIONAL - Memory budget in bytes, see full_build. Defaults to None.
+        site_url (str | None): OPTIONAL - Scheme and host the site is served from, see full_build. Defaults to None.
+        feeds_state (str | None): OPTIONAL - State file for update_feeds, see full_build. Pages whose entry
+            isn't in it are re-rendered. Defaults to None.
+        metadata_db (str | None): OPTIONAL - SQLite metadata index, see full_build. Only the rows of re-rendered
+            and removed pages change, pages missing from it are re-rendered. Defaults to None.
+        listings_state (str | None): OPTIONAL - State file for update_listings, see full_build. Only listings
+            of directories, tags and months whose pages' metadata changed are rendered. Defaults to None.
+        page_size (int): OPTIONAL - Entries per listing page, default is DEFAULT_PAGE_SIZE
+        io_threads (int | None): OPTIONAL - Render through generate_pipelined with this many reader and as many
+            writer threads, and report the overlap of reading, rendering and writing. Defaults to None.
+    Returns:
+        tuple[int, int, int]: Number of (pages rendered, static files copied, outputs removed)
+'''
+def incremental_build(static_path: str, content_path: str, template_path: str, docs_path: str, manifest_path: str, basepath: str = "/", workers: int = 1, link: str = "reflink", precompress_state: str | None = None, render_cache: RenderCache | None = None, depgraph_path: str | None = None, search_state: str | None = None, fingerprint: bool = False, image_state: str | None = None, image_widths: list[int] = DEFAULT_WIDTHS, minify_state: str | None = None, max_rss: int | None = None, site_url: str | None = None, feeds_state: str | None = None, metadata_db: str | None = None, listings_state: str | None = None, page_size: int = DEFAULT_PAGE_SIZE, io_threads: int | None = None):
+    if not path.exists(static_path):
+        raise ValueError("Source directory does not exist")
+
+    previous = BuildManifest.load(manifest_path)
+    manifest = BuildManifest(basepath=basepath, minify=minify_state is not None)
+    previous_graph = DependencyGraph.load(depgraph_path, docs_path) if depgraph_path is not None else None
+    graph = DependencyGraph(docs_path)
+    previous_search = load_search_state(search_state)["pages"] if search_state is not None else None
+    search_pages = {}
+    feeds_state = feeds_state if site_url is not None else None
+    previous_feeds = load_feeds_state(feeds_state)["pages"] if feeds_state is not None else None
+    feed_pages = {}
+    metadata_index = MetadataIndex(metadata_db) if metadata_db is not None else None
+    indexed = metadata_index.sources() if metadata_index is not None else None
+    listings_state = listings_state if metadata_db is not None else None
+
+    # A new basepath changes the output of every page, so does turning minification on or off
+    rebuild_all = previous.basepath != basepath or previous.minify != manifest.minify
+
+    copied, removed = 0, 0
+    stale_pages = []
+    # Static files the image and minify stages write to docs, their copies there differ from the source
+    staged = set()
+
+    with stage("copy_static"):
+        for rel_path in list_files(static_path):
+            src_entry = path.join(static_path, rel_path)
+            dest_entry = path.join(docs_path, rel_path)
+            file_hash = hash_file(src_entry)
+            manifest.static[rel_path] = file_hash
+
+            # Written by the image stage instead
+            if image_state is not None and is_image(rel_path):
+                staged.add(rel_path)
+                continue
+            # Written by the minify stage instead
+            if minify_state is not None and is_minifiable(rel_path):
+                staged.add(rel_path)
+                continue
+            # Minified by the last build
+            restore = previous.minify and is_minifiable(rel_path)
+            if restore or previous.static.get(rel_path) != file_hash or not path.exists(dest_entry):
+                transfer_file(src_entry, dest_entry, link)
+                copied += 1
+
+    for rel_path in previous.static:
+        if rel_path not in manifest.static:
+            remove_output(path.join(docs_path, rel_path), docs_path)
+            removed += 1
+
+    images = None
+    if image_state is not None:
+        previous_images = load_images(image_state)
+        images = process_images(static_path, docs_path, image_state, workers, image_widths, link, manifest.static)
+        # Pages embed the images' sizes and variants
+        rebuild_all = rebuild_all or images != previous_images
+        if render_cache is not None:
+            render_cache = render_cache.salted(images_digest(images))
+
+    report = None
+    if minify_state is not None:
+        report = MinifyReport()
+        minify_static_files(static_path, docs_path, minify_state, report, manifest.static)
+
+    previous_assets = AssetManifest.load(docs_path)
+    # Synced copies are the same as their sources, the others are hashed from docs
+    synced_hashes = {rel_path: file_hash for rel_path, file_hash in manifest.static.items() if rel_path not in staged}
+    assets = AssetManifest.from_static(static_path, synced_hashes, docs_path) if fingerprint else AssetManifest()
+    for rel_path, fingerprinted in previous_assets.assets.items():
+        if assets.assets.get(rel_path) != fingerprinted:
+            remove_output(path.join(docs_path, fingerprinted), docs_path)
+            removed += 1
+    if fingerprint:
+        fingerprint_assets(docs_path, assets, link)
+    elif path.exists(path.join(docs_path, ASSET_MANIFEST_NAME)):
+        os.remove(path.join(docs_path, ASSET_MANIFEST_NAME))
+    # Pages link to fingerprinted names, which change with the assets' contents
+    rebuild_all = rebuild_all or assets.assets != previous_assets.assets
+
+    pages = find_pages(content_path, docs_path, template_path)
+    for content_entry, dest_entry, page_template in pages:
+        rel_path = path.relpath(content_entry, content_path).replace(os.sep, "/")
+        rel_output = path.relpath(dest_entry, docs_path).replace(os.sep, "/")
+        file_hash = hash_file(content_entry)
+        manifest.pages[rel_path] = {"hash": file_hash, "output": rel_output, "template": page_template}
+
+        if page_template not in graph.templates:
+            graph.templates[page_template] = template_partials(page_template)
+            # Partials are hashed alongside the templates including them
+            for template_file in [page_template, *graph.templates[page_template]]:
+                if template_file not in manifest.templates and path.exists(template_file):
+                    manifest.templates[template_file] = hash_file(template_file)
+
+        previous_page = previous.pages.get(rel_path, {})
+        template_changed = previous_page.get("template") != page_template or any(
+            previous.templates.get(template_file) != manifest.templates.get(template_file)
+            for template_file in [page_template, *graph.templates[page_template]]
+        )
+        # Pages missing from the previous graph or search index are re-rendered to record their links and terms
+        untracked = (
+            (previous_graph is not None and content_entry not in previous_graph.pages)
+            or (previous_search is not None and content_entry not in previous_search)
+            or (previous_feeds is not None and content_entry not in previous_feeds)
+            or (indexed is not None and content_entry not in indexed)
+        )
+
+        if rebuild_all or template_changed or untracked or previous_page.get("hash") != file_hash or not path.exists(dest_entry):
+            stale_pages.append((content_entry, dest_entry, page_template))
+        else:
+            if previous_graph is not None:
+                graph.pages[content_entry] = previous_graph.pages[content_entry]
+            if previous_search is not None:
+                entry = previous_search[content_entry]
+                search_pages[content_entry] = (rel_output, entry["title"], entry["terms"])
+            if previous_feeds is not None:
+                entry = previous_feeds[content_entry]
+                feed_pages[content_entry] = (rel_output, entry["title"], entry["modified"], entry["hash"])
+
+    for rel_path, entry in previous.pages.items():
+        if rel_path not in manifest.pages:
+            remove_output(path.join(docs_path, entry["output"]), docs_path)
+            removed += 1
+
+    pipeline_report = PipelineReport() if io_threads is not None else None
+    errors = pages_generator(io_threads, pipeline_report)(
+        stale_pages, basepath, workers, render_cache, index_terms=search_state is not None, assets=assets if fingerprint else None, images=images, minify=report is not None,
+        on_record=lambda record: collect_record(record, docs_path, graph if depgraph_path is not None else None, search_pages if search_state is not None else None, report, feed_pages if feeds_state is not None else None, metadata_index), max_rss=max_rss,
+    )
+    if pipeline_report is not None:
+        print(pipeline_report.report())
+    if report is not None:
+        print(report.report())
+    if render_cache is not None:
+        prune_render_cache(render_cache)
+    if depgraph_path is not None:
+        record_dependencies(graph, static_path, pages)
+        graph.save(depgraph_path)
+    if metadata_index is not None:
+        update_metadata(metadata_index, pages, len(stale_pages) - len(errors))
+
+    # Forget failed pages so the next build retries them even if their markdown is untouched
+    for content_entry, _ in errors:
+        del manifest.pages[path.relpath(content_entry, content_path).replace(os.sep, "/")]
+
+    manifest.save(manifest_path)
+    rendered = len(stale_pages) - len(errors)
+    print(f"Incremental build: {rendered} page(s) rendered, {copied} static file(s) copied, {removed} output(s) removed")
+
+    if search_state is not None:
+        update_search(docs_path, search_state, search_pages, basepath)
+
+    if feeds_state is not None:
+        write_feeds(docs_path, feeds_state, feed_pages, site_url, basepath)
+
+    if listings_state is not None:
+        write_listings(docs_path, listings_state, metadata_db, template_path, pages, page_size, basepath, assets if fingerprint else None, report is not None)
+
+    if precompress_state is not None:
+        precompress(docs_path, precompress_state, workers)
+
+    # Raised only now, so the search index, feeds and listings still cover the pages that did render
+    if errors:
+        raise PageBuildError(errors)
+
+    return rendered, copied, removed
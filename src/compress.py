@@ -0,0 +1,137 @@
+from os import path
+from concurrent.futures import ProcessPoolExecutor
+from manifest import hash_file, list_files
+import gzip
+import json
+import os
+
+try:
+    import brotli
+except ImportError:
+    # Optional dependency, without it only .gz variants are written
+    brotli = None
+
+# Text formats that shrink well, images, fonts and archives are already compressed and never touched
+COMPRESSIBLE_EXTENSIONS = {".html", ".css", ".js", ".mjs", ".json", ".xml", ".svg", ".txt", ".map", ".webmanifest", ".ico"}
+ALREADY_COMPRESSED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".woff", ".woff2", ".gz", ".br", ".zip", ".mp4", ".webm"}
+
+'''
+    Returns the compressed variant suffixes this machine can write, brotli only when the module is installed
+'''
+def available_formats():
+    return [".gz", ".br"] if brotli is not None else [".gz"]
+
+'''
+    Returns True for files that get precompressed variants
+'''
+def is_compressible(file_path: str):
+    extension = path.splitext(file_path)[1].lower()
+    return extension in COMPRESSIBLE_EXTENSIONS and extension not in ALREADY_COMPRESSED_EXTENSIONS
+
+'''
+    Returns the paths of every compressed variant a file may have
+'''
+def variant_paths(file_path: str):
+    return [file_path + suffix for suffix in (".gz", ".br")]
+
+'''
+    Writes the compressed variants of one file. A variant that isn't smaller than the original is
+    not worth serving, so it's removed instead.
+    Args:
+        task (tuple[str, list[str]]): REQUIRED - (file path, variant suffixes to write)
+    Returns:
+        list[str]: Suffixes of the variants that were written
+'''
+def compress_file(task: tuple[str, list[str]]):
+    file_path, formats = task
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    written = []
+
+    for suffix in formats:
+        if suffix == ".gz":
+            # mtime=0 keeps the output identical for identical input
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        else:
+            compressed = brotli.compress(data, quality=11)
+
+        variant = file_path + suffix
+        if len(compressed) >= len(data):
+            if path.exists(variant):
+                os.remove(variant)
+            continue
+
+        tmp_path = variant + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, variant)
+        written.append(suffix)
+
+    return written
+
+'''
+    Writes precompressed .gz (and .br when brotli is installed) siblings for every compressible file in the
+    docs directory. Files whose hash matches the last run, with their variants still in place, are skipped,
+    and variants of files that no longer exist are deleted.
+    Args:
+        docs_path (str): REQUIRED - Path to the output directory
+        state_path (str): REQUIRED - JSON file recording, per file, the hash it was last compressed from and the variants written
+        workers (int): OPTIONAL - Number of worker processes compressing files, default is 1
+    Returns:
+        tuple[int, int, int]: Number of files (compressed, skipped as unchanged, whose variants were removed)
+'''
+def precompress_tree(docs_path: str, state_path: str, workers: int = 1):
+    try:
+        with open(state_path, "r") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+
+    formats = available_formats()
+    state, tasks = {}, []
+
+    for rel_path in list_files(docs_path):
+        if not is_compressible(rel_path):
+            continue
+
+        file_path = path.join(docs_path, rel_path)
+        file_hash = hash_file(file_path)
+        entry = previous.get(rel_path)
+
+        unchanged = (
+            entry is not None
+            and entry["hash"] == file_hash
+            and entry["formats"] == formats
+            and all(path.exists(file_path + suffix) for suffix in entry["variants"])
+        )
+        if unchanged:
+            state[rel_path] = entry
+        else:
+            state[rel_path] = {"hash": file_hash, "formats": formats, "variants": []}
+            tasks.append((rel_path, (file_path, formats)))
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(compress_file, [task for _, task in tasks], chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        results = [compress_file(task) for _, task in tasks]
+
+    for (rel_path, _), written in zip(tasks, results):
+        state[rel_path]["variants"] = written
+
+    removed = 0
+    for rel_path in previous:
+        if rel_path not in state:
+            for variant in variant_paths(path.join(docs_path, rel_path)):
+                if path.exists(variant):
+                    os.remove(variant)
+            removed += 1
+
+    os.makedirs(path.dirname(state_path), exist_ok=True)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+    return len(tasks), len(state) - len(tasks), removed
@@ -1,36 +1,153 @@
-from os import path, listdir, mkdir
-from shutil import copy, rmtree
+from os import path, makedirs, remove
+from shutil import copy2, copystat
+from concurrent.futures import ThreadPoolExecutor
+from manifest import hash_file, list_files
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, reflinks are simply never attempted there
+    fcntl = None
 
 '''
-    Utility function to copy directory from source to destination
+    Utility function to copy directory from source to destination, now a sync: unchanged files already in dest
+    are skipped and files gone from src are removed, see sync_directory
     Args:
         src (str): REQUIRED - Source directory path
-        dst (str): REQUIRED - Destination directory path
+        dest (str): REQUIRED - Destination directory path, may already exist
+        link (str): OPTIONAL - "hardlink", "reflink" or "copy", see transfer_file. Default is "reflink".
+    Returns:
+        tuple[int, int, int]: Number of files (copied, skipped as unchanged, removed)
+'''
+def copy_directory(src: str, dest: str, link: str = "reflink"):
+    return sync_directory(src, dest, link=link)
+
+# Linux ioctl that makes dest share src's blocks copy-on-write (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+# Devices where a reflink attempt already failed, so the rest of the sync skips straight to copying
+_no_reflink_devices = set()
+
+'''
+    Copies one file into place as a hardlink, a reflink or a plain copy. The file is always staged under a
+    temporary name and renamed over dest, so an existing dest that is a hardlink to a source is replaced
+    rather than written through.
+    Args:
+        src (str): REQUIRED - Source file path
+        dest (str): REQUIRED - Destination file path
+        link (str): OPTIONAL - "hardlink", "reflink" or "copy", default is "reflink".
+            Hardlinks and reflinks fall back to a copy when the filesystem can't make them.
     Returns:
         None
+'''
+def transfer_file(src: str, dest: str, link: str = "reflink"):
+    dest_dir = path.dirname(dest)
+    makedirs(dest_dir, exist_ok=True)
+    tmp_path = dest + ".sync-tmp"
+    if path.lexists(tmp_path):
+        remove(tmp_path)
 
+    transferred = False
+    if link == "hardlink":
+        try:
+            os.link(src, tmp_path)
+            transferred = True
+        except OSError:
+            pass
+    elif link == "reflink" and fcntl is not None:
+        device = os.stat(dest_dir).st_dev
+        if device not in _no_reflink_devices:
+            try:
+                with open(src, "rb") as src_file, open(tmp_path, "wb") as tmp_file:
+                    fcntl.ioctl(tmp_file.fileno(), FICLONE, src_file.fileno())
+                copystat(src, tmp_path)
+                transferred = True
+            except OSError:
+                _no_reflink_devices.add(device)
+
+    if not transferred:
+        copy2(src, tmp_path)
+
+    os.replace(tmp_path, dest)
+
+'''
+    Decides whether dest already holds the same file as src
+    Args:
+        src (str): REQUIRED - Source file path
+        dest (str): REQUIRED - Destination file path
+        compare (str): OPTIONAL - "mtime" compares size and modification time, "hash" compares contents. Default is "mtime".
+    Returns:
+        bool
 '''
-def copy_directory(src: str, dest: str):
+def is_unchanged(src: str, dest: str, compare: str = "mtime"):
+    try:
+        dest_stat = os.stat(dest)
+    except FileNotFoundError:
+        return False
+
+    src_stat = os.stat(src)
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+
+    if compare == "hash":
+        return hash_file(src) == hash_file(dest)
+
+    # transfer_file preserves the modification time, so an untouched source still matches its copy
+    return src_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+'''
+    Makes dest mirror src: copies new and modified files, skips unchanged ones, and removes files in
+    dest that no longer exist in src. dest may already exist.
+    Args:
+        src (str): REQUIRED - Source directory path
+        dest (str): REQUIRED - Destination directory path
+        compare (str): OPTIONAL - "mtime" or "hash", see is_unchanged. Default is "mtime".
+        link (str): OPTIONAL - "hardlink", "reflink" or "copy", see transfer_file. Default is "reflink".
+        workers (int): OPTIONAL - Number of threads copying files, default is 8
+        keep (set[str] | None): OPTIONAL - Paths relative to dest that are never removed, e.g. generated pages. Defaults to None.
+        exclude (set[str] | None): OPTIONAL - Paths relative to src that are neither copied nor removed from dest,
+            another stage writes them (e.g. optimized images). Defaults to None.
+    Returns:
+        tuple[int, int, int]: Number of files (copied, skipped as unchanged, removed)
+'''
+def sync_directory(src: str, dest: str, compare: str = "mtime", link: str = "reflink", workers: int = 8, keep: set[str] | None = None, exclude: set[str] | None = None):
     if not path.exists(src):
         raise ValueError("Source directory does not exist")
-    
-    if path.exists(dest):
-        raise ValueError("Destination directory already exists, should've been removed")
-    
-    # Create destination directory
-    mkdir(dest)
-    # print(f"Created destination directory {dest}")
-
-    for direntry in listdir(src):
-        src_entry = path.join(src, direntry)
-        dest_entry = path.join(dest, direntry)
-
-        # print(f"Copying {src_entry} to {dest_entry}")
-
-        if path.isfile(src_entry):
-            # print(f"{src_entry} is a file, copying...\n")
-            copy(src_entry, dest_entry)
-        else:
-            # print(f"{src_entry} is a directory, copying recursively...\n")
-            copy_directory(src_entry, dest_entry)
-    
+
+    exclude = exclude if exclude is not None else set()
+    all_src_files = list_files(src)
+    src_files = [rel_path for rel_path in all_src_files if rel_path not in exclude]
+    makedirs(dest, exist_ok=True)
+
+    def sync_one(rel_path: str):
+        src_entry = path.join(src, rel_path)
+        dest_entry = path.join(dest, rel_path)
+        if is_unchanged(src_entry, dest_entry, compare):
+            return False
+        transfer_file(src_entry, dest_entry, link)
+        return True
+
+    # Copying is I/O bound, threads overlap the waiting
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        copied = sum(executor.map(sync_one, src_files))
+
+    keep = keep if keep is not None else set()
+    src_set = set(all_src_files)
+    removed = 0
+    for rel_path in list_files(dest):
+        if rel_path not in src_set and rel_path not in keep:
+            remove(path.join(dest, rel_path))
+            removed += 1
+
+    remove_empty_dirs(dest)
+
+    return copied, len(src_files) - copied, removed
+
+'''
+    Removes every empty directory below root (but never root itself)
+'''
+def remove_empty_dirs(root: str):
+    for dir_path, dir_names, file_names in os.walk(root, topdown=False):
+        if dir_path != root and not os.listdir(dir_path):
+            os.rmdir(dir_path)
@@ -0,0 +1,203 @@
+from os import path
+from build import incremental_build, prune_render_cache
+from client import request
+from generatepage import PageBuildError
+from rendercache import RenderCache
+from watch import SiteWatcher
+import json
+import os
+import socketserver
+import threading
+import time
+
+# Seconds a connected client may stay silent before the daemon hangs up, so one stuck client can't block the rest
+CLIENT_TIMEOUT = 30
+
+class BuildDaemon:
+
+    '''
+    BuildDaemon class, answers build requests from state kept warm between them: the page list, the compiled
+    templates, the render cache and the (mtime, size) snapshot of every source, held by a SiteWatcher. A request
+    is a dict with a "command":
+        {"command": "build"}: regenerates the outputs affected by every file changed since the last request
+        {"command": "page", "path": "content/blog/post.md"}: regenerates one page, without scanning anything else
+        {"command": "status"}: reports the daemon's process id, pages, builds served and uptime
+    Responses are dicts with "ok", and "error" when a request failed. Requests are handled one at a time. When the
+    watcher rebuilds with build options (see SiteWatcher), build and page requests both run an incremental build.
+    Args:
+        watcher (SiteWatcher): REQUIRED - Watcher of the site, its snapshot is taken as up to date
+        root (str): OPTIONAL - Directory relative page paths are resolved against, default is the current directory
+    '''
+    def __init__(self, watcher: SiteWatcher, root: str = "."):
+        self.watcher = watcher
+        self.root = root
+        self.started = time.time()
+        self.builds = 0
+
+    '''
+    Handles one request, never raises: failures are reported in the response
+    '''
+    def handle(self, message: dict):
+        command = message.get("command")
+        start = time.perf_counter()
+        try:
+            if command == "status":
+                return {"ok": True, "pid": os.getpid(), "pages": len(self.watcher.pages), "builds": self.builds, "uptime": time.time() - self.started}
+            if command == "build":
+                changed, removed = self.watcher.poll()
+                outputs = self.watcher.rebuild(changed, removed) if changed or removed else 0
+                errors = self.watcher.errors if changed or removed else []
+            elif command == "page":
+                outputs, errors = self.build_page(message.get("path"))
+            else:
+                return {"ok": False, "error": f"Unknown command {command!r}, expected build, page, status or stop"}
+        except Exception as error:
+            return {"ok": False, "error": f"{type(error).__name__}: {error}"}
+
+        self.builds += 1
+        response = {"ok": not errors, "outputs": outputs, "ms": (time.perf_counter() - start) * 1000}
+        if errors:
+            response["error"] = str(PageBuildError(errors)).split("\n")[0]
+            response["errors"] = [f"{from_path}: {error}" for from_path, error in errors]
+        return response
+
+    '''
+    Regenerates one page, returns (outputs written, [(source MD path, error)])
+    Args:
+        page_path (str | None): REQUIRED - Markdown file of the page, relative to root or absolute
+    '''
+    def build_page(self, page_path: str | None):
+        if not page_path:
+            raise ValueError("page needs a \"path\"")
+
+        from_path = path.abspath(path.join(self.root, page_path))
+        if from_path not in self.watcher.pages:
+            # Maybe added since the page list was made
+            self.watcher.pages = self.watcher.find_pages()
+        if from_path not in self.watcher.pages:
+            raise ValueError(f"{page_path} isn't a page of the site")
+
+        if self.watcher.incremental:
+            # Fingerprinted assets, feeds, listings, ... depend on more than the one page
+            self.watcher.poll()
+            return self.watcher.build_incremental(), self.watcher.errors
+
+        dest_path, template_path = self.watcher.pages[from_path]
+        # Recorded in the dependency graph and metadata index like a rebuild's pages
+        errors = self.watcher.render_pages([(from_path, dest_path, template_path)])
+        if errors:
+            return 0, errors
+
+        # Up to date now, the next build request leaves it alone
+        stat = os.stat(from_path)
+        self.watcher.snapshot[from_path] = (stat.st_mtime_ns, stat.st_size)
+        return 1, errors
+
+    def __repr__(self):
+        return f"BuildDaemon(root={self.root}, pages={len(self.watcher.pages)}, builds={self.builds})"
+
+'''
+    Returns a request handler class reading JSON requests, one per line, and writing one JSON response line
+    for each. {"command": "stop"} shuts the server down after answering.
+'''
+def make_handler(daemon: BuildDaemon):
+    class DaemonHandler(socketserver.StreamRequestHandler):
+        timeout = CLIENT_TIMEOUT
+
+        def handle(self):
+            try:
+                for line in self.rfile:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        message = None
+                    if not isinstance(message, dict):
+                        response = {"ok": False, "error": "Invalid request, expected one JSON object per line"}
+                    elif message.get("command") == "stop":
+                        response = {"ok": True}
+                    else:
+                        response = daemon.handle(message)
+
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+                    self.wfile.flush()
+                    if response["ok"] and message.get("command") == "stop":
+                        # shutdown waits for serve_forever, which is running this handler
+                        threading.Thread(target=self.server.shutdown).start()
+                        return
+            except (TimeoutError, BrokenPipeError, ConnectionResetError):
+                pass
+
+    return DaemonHandler
+
+'''
+    Serves a BuildDaemon on a Unix socket until a stop request. A socket left behind by a daemon that died (nothing
+    accepts connections on it) is replaced, one a daemon is still listening on is an error, even if that daemon is
+    too busy building to answer.
+    Args:
+        daemon (BuildDaemon): REQUIRED - Daemon answering the requests
+        socket_path (str): REQUIRED - Unix socket to listen on
+        ready (threading.Event | None): OPTIONAL - Set once the socket accepts connections. Defaults to None.
+    Returns:
+        None
+'''
+def serve(daemon: BuildDaemon, socket_path: str, ready: threading.Event | None = None):
+    if path.exists(socket_path):
+        running = True
+        try:
+            request(socket_path, {"command": "status"}, timeout=1)
+        except (ConnectionRefusedError, FileNotFoundError):
+            running = False
+        except OSError:
+            # Connected but no answer in time, a daemon in the middle of a build
+            pass
+        if running:
+            raise RuntimeError(f"A build daemon is already listening on {socket_path}")
+        if path.exists(socket_path):
+            os.remove(socket_path)
+
+    os.makedirs(path.dirname(socket_path) or ".", exist_ok=True)
+    with socketserver.UnixStreamServer(socket_path, make_handler(daemon)) as server:
+        try:
+            if ready is not None:
+                ready.set()
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+
+'''
+    Builds the site incrementally, then keeps its state in memory and serves build requests on a Unix socket until
+    stopped (python3 src/client.py stop) or interrupted. See BuildDaemon for the requests.
+    Args:
+        static_path (str): REQUIRED - Path to the static assets directory
+        content_path (str): REQUIRED - Path to the markdown content directory
+        template_path (str): REQUIRED - Path to the default HTML template file
+        docs_path (str): REQUIRED - Path to the output directory
+        manifest_path (str): REQUIRED - Path to the build manifest file
+        socket_path (str): REQUIRED - Unix socket to listen on
+        basepath (str): OPTIONAL - Base path to use for generated links, default is "/"
+        workers (int): OPTIONAL - Number of worker processes for large rebuilds, default is 1
+        render_cache (RenderCache | None): OPTIONAL - Cache of rendered page bodies, pruned when the daemon stops. Defaults to None.
+        depgraph_path (str | None): OPTIONAL - File the initial build saves its DependencyGraph to. Defaults to None.
+        build_options (dict | None): OPTIONAL - Other keyword arguments of incremental_build, used by the initial build
+            and, see SiteWatcher, by the builds requested. Defaults to None.
+    Returns:
+        None
+'''
+def serve_daemon(static_path: str, content_path: str, template_path: str, docs_path: str, manifest_path: str, socket_path: str, basepath: str = "/", workers: int = 1, render_cache: RenderCache | None = None, depgraph_path: str | None = None, build_options: dict | None = None):
+    build_options = {"depgraph_path": depgraph_path, **(build_options or {})}
+    try:
+        incremental_build(static_path, content_path, template_path, docs_path, manifest_path, basepath, workers, render_cache=render_cache, **build_options)
+    except PageBuildError as error:
+        print(error)
+
+    watcher = SiteWatcher(static_path, content_path, template_path, docs_path, basepath, workers, render_cache, manifest_path, build_options)
+    daemon = BuildDaemon(watcher, path.dirname(content_path))
+    print(f"Build daemon {os.getpid()} listening on {socket_path} (python3 src/client.py stop to stop)")
+    try:
+        serve(daemon, socket_path)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("Stopping build daemon")
+        if render_cache is not None:
+            prune_render_cache(render_cache)
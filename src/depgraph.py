@@ -0,0 +1,224 @@
+from generatepage import PageRecord
+from images import is_image
+from typing import Iterable
+import json
+import os
+import posixpath
+import sys
+
+DEPGRAPH_VERSION = 2
+
+'''
+    Returns the output path an href/src URL of a page points to, without checking that it exists
+    Args:
+        url (str): REQUIRED - The link as written in the page
+        page_output (str): REQUIRED - Output path of the page holding the link, relative to the docs directory
+    Returns:
+        str | None: Target path relative to the docs directory ("" for the site root),
+            None for external URLs and links within the page
+'''
+def link_target(url: str, page_output: str):
+    url = url.split("#", 1)[0].split("?", 1)[0]
+    if url == "" or url.startswith("//") or ":" in url.split("/", 1)[0]:
+        return None
+
+    if url.startswith("/"):
+        target = posixpath.normpath(url[1:]) if url != "/" else ""
+    else:
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(page_output), url))
+        # Like browsers, ".." never climbs above the site root
+        while target == ".." or target.startswith("../"):
+            target = target[3:]
+    return "" if target == "." else target
+
+'''
+    Returns the output a link target is served from: the file itself, an index.html inside it or the
+    target with .html appended, or None if none of them exist
+    Args:
+        target (str): REQUIRED - Target path from link_target
+        outputs (dict[str, str] | set[str]): REQUIRED - Existing output paths
+    Returns:
+        str | None
+'''
+def find_output(target: str, outputs: dict[str, str] | set[str]):
+    for candidate in [target, posixpath.join(target, "index.html"), target + ".html"]:
+        if candidate in outputs:
+            return candidate
+    return None
+
+class DependencyGraph:
+
+    '''
+    DependencyGraph class, records which inputs every output of the last build was made from: the markdown
+    source, template and template partials of each page, the source of each static file, and the internal pages
+    and static files each page links to or embeds. Paths of inputs are stored as the build was given them,
+    outputs relative to the docs directory.
+    Args:
+        docs_path (str): REQUIRED - Output directory the build wrote to
+        pages (dict[str, dict] | None): Source MD path -> {"output", "template", "links"}, links are the
+            [URL, line number] pairs of the page body, see PageRecord
+        templates (dict[str, list[str]] | None): Template path -> partial paths it includes
+        static (dict[str, str] | None): Static file path -> output path
+    '''
+    def __init__(self, docs_path: str, pages: dict[str, dict] | None = None, templates: dict[str, list[str]] | None = None, static: dict[str, str] | None = None):
+        self.docs_path = docs_path
+        self.pages = pages if pages is not None else {}
+        self.templates = templates if templates is not None else {}
+        self.static = static if static is not None else {}
+
+    '''
+    Loads a graph from disk. A missing, unreadable or outdated graph yields an empty one for docs_path.
+    '''
+    @classmethod
+    def load(cls, depgraph_path: str, docs_path: str):
+        try:
+            with open(depgraph_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(docs_path)
+
+        if data.get("version") != DEPGRAPH_VERSION:
+            return cls(docs_path)
+
+        pages = data.get("pages", {})
+        for page in pages.values():
+            page["links"] = [[sys.intern(url), line] for url, line in page["links"]]
+
+        return cls(
+            docs_path=data.get("docs", docs_path),
+            pages=pages,
+            templates=data.get("templates", {}),
+            static=data.get("static", {}),
+        )
+
+    '''
+    Writes the graph to disk, replacing the old one atomically
+    '''
+    def save(self, depgraph_path: str):
+        os.makedirs(os.path.dirname(depgraph_path), exist_ok=True)
+
+        data = {
+            "version": DEPGRAPH_VERSION,
+            "docs": self.docs_path,
+            "pages": self.pages,
+            "templates": self.templates,
+            "static": self.static,
+        }
+
+        tmp_path = depgraph_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, depgraph_path)
+
+    '''
+    Records the inputs of a rendered page
+    '''
+    def add_page(self, record: PageRecord):
+        self.pages[record.source] = {
+            "output": os.path.relpath(record.output, self.docs_path).replace(os.sep, "/"),
+            "template": record.template,
+            # Lists like they are after a save and load. Pages link the same few URLs over and over,
+            # interned they're stored once rather than once per link.
+            "links": [[sys.intern(url), line] for url, line in record.links],
+        }
+
+    '''
+    Returns the input file an href/src URL of a page points to, or None for external and unknown targets
+    Args:
+        source (str): REQUIRED - Source MD path of the page holding the link
+        url (str): REQUIRED - The link as written in the page
+        inputs (dict[str, str] | None): OPTIONAL - Result of inputs_by_output, to reuse it across many links. Defaults to None.
+    Returns:
+        str | None: Source MD path of the linked page or path of the linked static file
+    '''
+    def resolve_link(self, source: str, url: str, inputs: dict[str, str] | None = None):
+        target = link_target(url, self.pages[source]["output"])
+        if target is None:
+            return None
+
+        if inputs is None:
+            inputs = self.inputs_by_output()
+        output = find_output(target, inputs)
+        return inputs[output] if output is not None else None
+
+    '''
+    Returns output path -> input file for every page and static file
+    '''
+    def inputs_by_output(self):
+        inputs = {output: static_path for static_path, output in self.static.items()}
+        inputs.update((entry["output"], source) for source, entry in self.pages.items())
+        return inputs
+
+    '''
+    Returns the outputs that have to be regenerated when some input files change: the page built from a changed
+    markdown file, every page using a changed template or a template including a changed partial, and the copy
+    of a changed static file. Pages linking to a changed file keep their output (see linking_pages), unless the
+    build rewrites the link: incremental_build re-renders every page when a fingerprinted asset or, with image
+    optimization, an image changes.
+    Args:
+        changed (Iterable[str]): REQUIRED - Paths of the changed input files
+        fingerprint (bool): OPTIONAL - Whether the build fingerprints assets. Default is False.
+        optimize_images (bool): OPTIONAL - Whether the build optimizes images. Default is False.
+    Returns:
+        set[str]: Output paths, relative to the docs directory
+    '''
+    def affected_outputs(self, changed: Iterable[str], fingerprint: bool = False, optimize_images: bool = False):
+        changed = {os.path.abspath(file_path) for file_path in changed}
+        changed_templates = {
+            template for template, partials in self.templates.items()
+            if os.path.abspath(template) in changed or any(os.path.abspath(partial) in changed for partial in partials)
+        }
+
+        changed_static = [output for static_path, output in self.static.items() if os.path.abspath(static_path) in changed]
+        rewrites_pages = any(fingerprint or (optimize_images and is_image(output)) for output in changed_static)
+        outputs = set(changed_static)
+        for source, entry in self.pages.items():
+            if rewrites_pages or os.path.abspath(source) in changed or entry["template"] in changed_templates:
+                outputs.add(entry["output"])
+
+        return outputs
+
+    '''
+    Returns the source MD path of every page linking to or embedding one of the given files
+    Args:
+        targets (Iterable[str]): REQUIRED - Paths of pages' markdown sources or static files
+    Returns:
+        list[str]: Sorted source MD paths
+    '''
+    def linking_pages(self, targets: Iterable[str]):
+        targets = {os.path.abspath(file_path) for file_path in targets}
+        inputs = self.inputs_by_output()
+        linking = set()
+
+        for source, entry in self.pages.items():
+            for url, _ in entry["links"]:
+                target = self.resolve_link(source, url, inputs)
+                if target is not None and os.path.abspath(target) in targets:
+                    linking.add(source)
+                    break
+
+        return sorted(linking)
+
+    def __repr__(self):
+        return f"DependencyGraph(docs_path={self.docs_path}, pages={len(self.pages)}, templates={len(self.templates)}, static={len(self.static)})"
+
+'''
+    Describes what rebuilding after some files change involves, for the --what-rebuilds query
+    Args:
+        graph (DependencyGraph): REQUIRED - Graph of the last build
+        changed (list[str]): REQUIRED - Paths of the files to ask about
+        fingerprint (bool): OPTIONAL - Whether the build fingerprints assets, see affected_outputs. Default is False.
+        optimize_images (bool): OPTIONAL - Whether the build optimizes images, see affected_outputs. Default is False.
+    Returns:
+        str: Outputs to regenerate and the other pages linking to the files
+'''
+def rebuild_report(graph: DependencyGraph, changed: list[str], fingerprint: bool = False, optimize_images: bool = False):
+    outputs = sorted(graph.affected_outputs(changed, fingerprint, optimize_images))
+    linking = [source for source in graph.linking_pages(changed) if graph.pages[source]["output"] not in outputs]
+
+    lines = [f"Touching {', '.join(changed)} regenerates {len(outputs)} output(s):"]
+    lines.extend(f"  {output}" for output in outputs)
+    if linking:
+        lines.append(f"Linked to or embedded by {len(linking)} other page(s), their outputs are unaffected:")
+        lines.extend(f"  {source}" for source in linking)
+    return "\n".join(lines)
@@ -0,0 +1,214 @@
+from searchindex import page_url
+from manifest import write_if_changed
+from datetime import datetime, timezone
+from email.utils import formatdate
+from xml.sax.saxutils import escape, quoteattr
+import hashlib
+import json
+import os
+
+FEEDS_STATE_VERSION = 1
+
+SITEMAP_NAME = "sitemap.xml"
+ATOM_NAME = "atom.xml"
+RSS_NAME = "rss.xml"
+
+# Most URLs a sitemap may list (sitemaps.org protocol), bigger sites get a sitemap index of shards
+MAX_SITEMAP_URLS = 50000
+# Most recently modified pages listed in the feeds
+FEED_ENTRIES = 20
+
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+'''
+    Formats a timestamp as a W3C datetime in UTC, as sitemaps and Atom feeds expect
+'''
+def w3c_datetime(timestamp: float):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
+
+'''
+    Returns the name of a sitemap shard file
+'''
+def shard_name(shard: int):
+    return f"sitemap-{shard}.xml"
+
+'''
+    Loads the feeds state, an empty one when missing, unreadable or outdated
+'''
+def load_feeds_state(state_path: str):
+    try:
+        with open(state_path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"pages": {}, "files": {}}
+
+    if state.get("version") != FEEDS_STATE_VERSION:
+        return {"pages": {}, "files": {}}
+    return state
+
+'''
+    Returns the paths (relative to docs) of the files written by the last update_feeds
+'''
+def feed_outputs(state_path: str):
+    return list(load_feeds_state(state_path)["files"])
+
+'''
+    Renders one sitemap: a <urlset> of (URL, lastmod timestamp) entries
+'''
+def render_sitemap(entries: list[tuple[str, float]]):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<urlset xmlns="{SITEMAP_NAMESPACE}">']
+    for url, lastmod in entries:
+        lines.append(f"<url><loc>{escape(url)}</loc><lastmod>{w3c_datetime(lastmod)}</lastmod></url>")
+    lines.append("</urlset>\n")
+    return "\n".join(lines)
+
+'''
+    Renders a sitemap index: a <sitemapindex> of (shard URL, lastmod timestamp) entries
+'''
+def render_sitemap_index(shards: list[tuple[str, float]]):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<sitemapindex xmlns="{SITEMAP_NAMESPACE}">']
+    for url, lastmod in shards:
+        lines.append(f"<sitemap><loc>{escape(url)}</loc><lastmod>{w3c_datetime(lastmod)}</lastmod></sitemap>")
+    lines.append("</sitemapindex>\n")
+    return "\n".join(lines)
+
+'''
+    Renders an Atom feed of (URL, title, updated timestamp) entries, newest first
+'''
+def render_atom(title: str, site: str, entries: list[tuple[str, str, float]]):
+    updated = max((modified for _, _, modified in entries), default=0)
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"<title>{escape(title)}</title>",
+        f"<id>{escape(site)}</id>",
+        f"<link href={quoteattr(site)}/>",
+        f'<link rel="self" href={quoteattr(site + ATOM_NAME)}/>',
+        f"<updated>{w3c_datetime(updated)}</updated>",
+    ]
+    for url, entry_title, modified in entries:
+        lines.append(f"<entry><title>{escape(entry_title)}</title><id>{escape(url)}</id><link href={quoteattr(url)}/><updated>{w3c_datetime(modified)}</updated></entry>")
+    lines.append("</feed>\n")
+    return "\n".join(lines)
+
+'''
+    Renders an RSS 2.0 feed of (URL, title, updated timestamp) entries, newest first
+'''
+def render_rss(title: str, site: str, entries: list[tuple[str, str, float]]):
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<rss version="2.0"><channel>',
+        f"<title>{escape(title)}</title>",
+        f"<link>{escape(site)}</link>",
+        f"<description>{escape(title)}</description>",
+    ]
+    for url, entry_title, modified in entries:
+        lines.append(f"<item><title>{escape(entry_title)}</title><link>{escape(url)}</link><guid>{escape(url)}</guid><pubDate>{formatdate(modified, usegmt=True)}</pubDate></item>")
+    lines.append("</channel></rss>\n")
+    return "\n".join(lines)
+
+'''
+    Writes sitemap.xml and the atom.xml and rss.xml feeds of a site from its pages' records. Pages keep the
+    sitemap shard they were first put in, so only shards holding a page that was added, removed, moved or
+    changed are rewritten. Up to max_urls pages sitemap.xml lists them directly, past that it's an index of
+    sitemap-<n>.xml shards. A page's lastmod only moves when its source hash changes, not on a mere touch.
+    Args:
+        docs_path (str): REQUIRED - Path to the output directory
+        state_path (str): REQUIRED - File keeping the pages' entries, shards and written files between builds
+        pages (dict[str, tuple[str, str, float, str]]): REQUIRED - Source MD path -> (output path relative to
+            docs, title, source modification time, source hash) for every page of the site
+        site_url (str): REQUIRED - Scheme and host the site is served from, e.g. "https://example.com"
+        basepath (str): OPTIONAL - Base path the site is served from, default is "/"
+        max_urls (int): OPTIONAL - Most URLs per sitemap, default is MAX_SITEMAP_URLS
+    Returns:
+        tuple[int, int]: Number of (files written, files unchanged)
+'''
+def update_feeds(docs_path: str, state_path: str, pages: dict[str, tuple[str, str, float, str]], site_url: str, basepath: str = "/", max_urls: int = MAX_SITEMAP_URLS):
+    state = load_feeds_state(state_path)
+    origin = site_url.rstrip("/")
+    site = origin + basepath
+    # Every URL changes with the site URL or basepath, and shards with their size
+    same_site = state.get("site") == site and state.get("max_urls") == max_urls
+    old_pages = state["pages"] if same_site else {}
+    old_files = state["files"]
+
+    entries = {}
+    sizes = {}
+    changed = set()
+    for source in sorted(pages):
+        output, title, modified, file_hash = pages[source]
+        old_entry = old_pages.get(source)
+        lastmod = old_entry["lastmod"] if old_entry is not None and old_entry["hash"] == file_hash else modified
+        entry = entries[source] = {"output": output, "title": title, "modified": modified, "hash": file_hash, "lastmod": lastmod, "shard": None}
+        if old_entry is not None:
+            entry["shard"] = old_entry["shard"]
+            sizes[entry["shard"]] = sizes.get(entry["shard"], 0) + 1
+            if old_entry["output"] != output or old_entry["lastmod"] != lastmod:
+                changed.add(entry["shard"])
+
+    # New pages fill the first shards with room, the slots of removed pages included
+    shard = 0
+    for entry in entries.values():
+        if entry["shard"] is None:
+            while sizes.get(shard, 0) >= max_urls:
+                shard += 1
+            entry["shard"] = shard
+            sizes[shard] = sizes.get(shard, 0) + 1
+            changed.add(shard)
+    changed.update(old_entry["shard"] for source, old_entry in old_pages.items() if source not in entries)
+
+    shard_urls = {}
+    for entry in entries.values():
+        shard_urls.setdefault(entry["shard"], []).append((origin + page_url(entry["output"], basepath), entry["lastmod"]))
+
+    os.makedirs(docs_path, exist_ok=True)
+    files = {}
+    written, unchanged = 0, 0
+    # File name -> (shard it lists or None, renderer). Shard files are only rendered when their shard changed,
+    # the sitemap index and the feeds are small and always rendered.
+    rendered = {}
+    single = set(shard_urls) <= {0}
+    if single == any(name.startswith("sitemap-") for name in old_files):
+        # sitemap.xml switches between listing the pages and being an index
+        changed.update(shard_urls)
+    if single:
+        rendered[SITEMAP_NAME] = (0, lambda: render_sitemap(shard_urls.get(0, [])))
+    else:
+        for shard, urls in shard_urls.items():
+            rendered[shard_name(shard)] = (shard, lambda urls=urls: render_sitemap(urls))
+        index = [(site + shard_name(shard), max(lastmod for _, lastmod in shard_urls[shard])) for shard in sorted(shard_urls)]
+        rendered[SITEMAP_NAME] = (None, lambda: render_sitemap_index(index))
+
+    title = next((entry["title"] for entry in entries.values() if entry["output"] == "index.html"), site)
+    newest = sorted(entries.values(), key=lambda entry: (-entry["lastmod"], entry["output"]))[:FEED_ENTRIES]
+    feed_entries = [(origin + page_url(entry["output"], basepath), entry["title"], entry["lastmod"]) for entry in newest]
+    rendered[ATOM_NAME] = (None, lambda: render_atom(title, site, feed_entries))
+    rendered[RSS_NAME] = (None, lambda: render_rss(title, site, feed_entries))
+
+    for name, (shard, render) in rendered.items():
+        file_path = os.path.join(docs_path, name)
+        if shard is not None and shard not in changed and name in old_files and os.path.exists(file_path):
+            files[name] = old_files[name]
+            unchanged += 1
+            continue
+
+        text = render()
+        files[name] = hashlib.sha256(text.encode()).hexdigest()
+        if old_files.get(name) == files[name] and os.path.exists(file_path):
+            unchanged += 1
+        else:
+            write_if_changed(file_path, text)
+            written += 1
+
+    for name in old_files.keys() - files.keys():
+        if os.path.exists(os.path.join(docs_path, name)):
+            os.remove(os.path.join(docs_path, name))
+
+    state = {"version": FEEDS_STATE_VERSION, "site": site, "max_urls": max_urls, "pages": entries, "files": files}
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+    return written, unchanged
@@ -0,0 +1,80 @@
+from datetime import date
+import re
+
+# Opens and closes a front matter block, which must start on the first line of the page
+FRONT_MATTER_FENCE = "---"
+FRONT_MATTER_LINE_PATTERN = re.compile(r"([A-Za-z][\w-]*)\s*:\s*(.*)")
+# Keys whose value is always a list, "tags: a, b" and "tags: [a, b]" are the same
+LIST_KEYS = {"tags"}
+
+'''
+    Parses one front matter value: quotes around it are removed, [a, b] is a list
+'''
+def _parse_value(value: str):
+    if value.startswith("[") and value.endswith("]"):
+        return [_parse_value(item.strip()) for item in value[1:-1].split(",") if item.strip()]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+'''
+    Splits the front matter off a page's markdown. Front matter is a block of "key: value" lines between two
+    "---" lines at the very top of the file, lines starting with # are comments. A page whose first "---" isn't
+    followed by such lines and a closing "---" has no front matter, and its markdown is left untouched:
+        ---
+        title: Rivendell
+        date: 2024-05-01
+        tags: [elves, places]
+        ---
+    Args:
+        markdown (str): REQUIRED - Raw markdown of the page
+    Returns:
+        tuple[dict[str, str | list[str]], str]: (metadata with lowercased keys, markdown with the front matter
+            lines blanked out). The lines are blanked rather than removed so line numbers stay those of the file.
+'''
+def parse_front_matter(markdown: str):
+    if not markdown.startswith(FRONT_MATTER_FENCE):
+        return {}, markdown
+
+    lines = markdown.split("\n")
+    if lines[0].rstrip() != FRONT_MATTER_FENCE:
+        return {}, markdown
+
+    metadata = {}
+    for line_number, line in enumerate(lines[1:], 2):
+        line = line.strip()
+        if line == FRONT_MATTER_FENCE:
+            body = "\n" * line_number + "\n".join(lines[line_number:])
+            return metadata, body
+        if not line or line.startswith("#"):
+            continue
+
+        match = FRONT_MATTER_LINE_PATTERN.fullmatch(line)
+        if match is None:
+            # Not front matter after all, e.g. a page starting with a thematic break
+            return {}, markdown
+
+        key, value = match.group(1).lower(), _parse_value(match.group(2).strip())
+        if key in LIST_KEYS and isinstance(value, str):
+            value = _parse_value(f"[{value}]")
+        metadata[key] = value
+
+    return {}, markdown
+
+'''
+    Returns the date of a page in ISO format (YYYY-MM-DD): its front matter date, or the day its source was modified
+    Args:
+        metadata (dict[str, str | list[str]]): REQUIRED - Front matter of the page, see parse_front_matter
+        modified (float): REQUIRED - Modification time of the page's source
+    Returns:
+        str
+'''
+def page_date(metadata: dict[str, str | list[str]], modified: float):
+    value = metadata.get("date")
+    if value is None:
+        return date.fromtimestamp(modified).isoformat()
+
+    try:
+        return date.fromisoformat(str(value)[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid front matter date {value!r}, expected YYYY-MM-DD") from None
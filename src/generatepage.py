@@ -1,6 +1,91 @@
-from block_split import markdown_to_html_node
+from block_split import URL_PROPS, markdown_to_html_node
+from htmlnode import HTMLNode
+from template import Template, load_template, prefix_basepath
+from rendercache import URL_MARKER, CachedRender, RenderCache
+from assets import AssetManifest
+from images import ImageInfo, apply_images
+from minify import minify_html
+from frontmatter import page_date, parse_front_matter
+from searchindex import page_terms
+from profiling import current_rss, stage
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, NamedTuple, Sized
+import gc
+import hashlib
 import os
 
+# A content directory holding a file with this name uses it as the template for every page beneath it
+TEMPLATE_OVERRIDE_NAME = "template.html"
+
+# Most pages handed to a worker process in one round trip, and chunks in flight per worker. Bounds how many
+# rendered pages' records wait in memory for the pages before them.
+MAX_CHUNK_PAGES = 32
+CHUNKS_PER_WORKER = 2
+# Pages per chunk when the number of pages isn't known up front (pages streamed from iter_pages)
+STREAM_CHUNK_PAGES = 8
+
+class PageRecord(NamedTuple):
+    '''
+        What rendering a page produced and used, recorded for the dependency graph
+        Args:
+            source (str): Source MD path
+            output (str): Destination HTML path
+            template (str): Template path the page was rendered with
+            title (str): Page title
+            links (list[tuple[str, int]]): (URL, source line number) of every link and image in the page body,
+                URLs as written (before the basepath is applied)
+            terms (dict[str, int] | None): Search terms of the page, see page_terms. None unless the page was
+                rendered for the search index.
+            sizes (tuple[int, int] | None): Page size in bytes before and after minification, None unless the page
+                was minified
+            modified (float | None): Modification time of the source MD file
+            source_hash (str | None): Hex digest (sha256) of the markdown the page was rendered from
+            metadata (dict[str, str | list[str]] | None): Front matter of the page, see parse_front_matter
+    '''
+    source: str
+    output: str
+    template: str
+    title: str
+    links: list[tuple[str, int]]
+    terms: dict[str, int] | None = None
+    sizes: tuple[int, int] | None = None
+    modified: float | None = None
+    source_hash: str | None = None
+    metadata: dict[str, str | list[str]] | None = None
+
+class PendingPage(NamedTuple):
+    '''
+        A rendered page that hasn't been turned into one string, streamed into its file by write_page
+        Args:
+            template (Template): Template of the page
+            values (dict[str, str | HTMLNode]): Slot name -> value, see Template.write
+            basepath (str): Base path for the template's root links
+            assets (AssetManifest | None): Fingerprinted assets the template's links are pointed at
+    '''
+    template: Template
+    values: dict
+    basepath: str = "/"
+    assets: AssetManifest | None = None
+
+    def write(self, sink):
+        self.template.write(sink, self.values, self.basepath, self.assets)
+
+    def render(self):
+        return self.template.render(self.values, self.basepath, self.assets)
+
+class PageBuildError(Exception):
+    '''
+        Raised once a build has attempted every page and at least one of them failed.
+        Args:
+            errors (list[tuple[str, Exception]]): REQUIRED - (source MD path, error) for every failed page, in page order
+    '''
+    def __init__(self, errors: list[tuple[str, Exception]]):
+        self.errors = errors
+        details = "\n".join(f"  {from_path}: {error}" for from_path, error in errors)
+        super().__init__(f"{len(errors)} page(s) failed to generate:\n{details}")
+
 '''
     Extracts title, an <h1> header from the markdown file, and returns it 
     Args:
@@ -25,65 +110,367 @@ def extract_title(markdown: str):
         template_path (str): REQUIRED - Path to HTML template file
         dest_path (str): REQUIRED - Path to destination HTML file
         basepath (str): OPTIONAL - Base path to use for generated links in HTML page, default is "/"
+        slots (dict[str, str] | None): OPTIONAL - Extra template slot values, override the defaults. Defaults to None.
+        render_cache (RenderCache | None): OPTIONAL - Cache of rendered page bodies, unchanged markdown skips
+            parsing when given. Defaults to None.
+        index_terms (bool): OPTIONAL - Whether to collect the page's search terms into its PageRecord. Defaults to False.
+        assets (AssetManifest | None): OPTIONAL - Fingerprinted assets, root links to them in the page body and
+            template point at the fingerprinted copies when given. Defaults to None.
+        images (dict[str, ImageInfo] | None): OPTIONAL - Processed images, see optimize_images. Images of the page
+            body get their size, lazy loading and a srcset of their variants when given. The render cache must be
+            salted with images_digest. Defaults to None.
+        minify (bool): OPTIONAL - Whether to minify the page's HTML, see minify_html. Defaults to False.
     Returns:
-        None - Should write page to dest_path
+        PageRecord - Should write page to dest_path
 '''
-def generate_page(from_path: str, template_path: str, dest_path: str, basepath: str = "/"): 
+def generate_page(from_path: str, template_path: str, dest_path: str, basepath: str = "/", slots: dict[str, str] | None = None, render_cache: RenderCache | None = None, index_terms: bool = False, assets: AssetManifest | None = None, images: dict[str, ImageInfo] | None = None, minify: bool = False): 
     print(f"Generating page from {from_path} to {dest_path} using template {template_path}")
+    return render_page(from_path, template_path, dest_path, basepath, slots, render_cache, index_terms, assets, images, minify)
+
+'''
+    Does the work of generate_page without logging, so it can run inside worker processes
+    Args:
+        from_path (str): REQUIRED - Path to source MD file to convert into HTML page
+        template_path (str): REQUIRED - Path to HTML template file
+        dest_path (str): REQUIRED - Path to destination HTML file
+        basepath (str): OPTIONAL - Base path to use for generated links in HTML page, default is "/"
+        slots (dict[str, str] | None): OPTIONAL - Extra template slot values, override the defaults. Defaults to None.
+        render_cache (RenderCache | None): OPTIONAL - Cache of rendered page bodies, see generate_page. Defaults to None.
+        index_terms (bool): OPTIONAL - Whether to collect the page's search terms, see generate_page. Defaults to False.
+        assets (AssetManifest | None): OPTIONAL - Fingerprinted assets, see generate_page. Defaults to None.
+        images (dict[str, ImageInfo] | None): OPTIONAL - Processed images, see generate_page. Defaults to None.
+        minify (bool): OPTIONAL - Whether to minify the page's HTML, see generate_page. Defaults to False.
+    Returns:
+        PageRecord - Should write page to dest_path
+'''
+def render_page(from_path: str, template_path: str, dest_path: str, basepath: str = "/", slots: dict[str, str] | None = None, render_cache: RenderCache | None = None, index_terms: bool = False, assets: AssetManifest | None = None, images: dict[str, ImageInfo] | None = None, minify: bool = False):
+    with stage("page", page=from_path):
+        with stage("read"):
+            markdown, modified = read_source(from_path)
+        record, html = render_source(from_path, markdown, modified, template_path, dest_path, basepath, slots, render_cache, index_terms, assets, images, minify)
+        # Only the page's tree is needed from here on
+        del markdown
+        with stage("write"):
+            write_page(dest_path, html)
 
-    markdown, template = None, None
+    return record
 
-    # Read markdown file from from_path
+'''
+    Reads a page's markdown, returns (markdown, modification time of the file)
+'''
+def read_source(from_path: str):
     with open(from_path, "r") as f:
-        markdown = f.read() 
+        return f.read(), os.fstat(f.fileno()).st_mtime
 
-    # Read template file from template_path
-    with open(template_path, "r") as f:
-        template = f.read()
+'''
+    Writes a page's HTML to dest_path, through a temporary file so a failed write never leaves a truncated page behind
+    Args:
+        dest_path (str): REQUIRED - Path to destination HTML file
+        html (str | PendingPage): REQUIRED - The page, a PendingPage is streamed into the file without building the whole string
+        make_dirs (bool): OPTIONAL - Create the page's directory first. Default is True.
+'''
+def write_page(dest_path: str, html: str | PendingPage, make_dirs: bool = True):
+    if make_dirs:
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+    tmp_path = dest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        if isinstance(html, PendingPage):
+            html.write(f)
+        else:
+            f.write(html)
+    os.replace(tmp_path, dest_path)
+
+'''
+    Renders a page from its already read markdown, the CPU part of render_page. Nothing is read or written
+    but the template (compiled once per process) and the render cache.
+    Args:
+        from_path (str): REQUIRED - Path to source MD file, recorded in the PageRecord
+        markdown (str): REQUIRED - Markdown of the page, front matter included
+        modified (float): REQUIRED - Modification time of the source MD file
+        template_path (str): REQUIRED - Path to HTML template file
+        dest_path (str): REQUIRED - Path to destination HTML file, recorded in the PageRecord
+        The other arguments are those of render_page.
+    Returns:
+        tuple[PageRecord, str | PendingPage]: (record of the page, page HTML). The HTML is only built as one string
+            when the page is minified, otherwise it's left to write_page to stream.
+'''
+def render_source(from_path: str, markdown: str, modified: float, template_path: str, dest_path: str, basepath: str = "/", slots: dict[str, str] | None = None, render_cache: RenderCache | None = None, index_terms: bool = False, assets: AssetManifest | None = None, images: dict[str, ImageInfo] | None = None, minify: bool = False):
+    source_hash = hashlib.sha256(markdown.encode()).hexdigest()
+    metadata, markdown = parse_front_matter(markdown)
+
+    # Compiled once per process, not re-read for every page
+    template = load_template(template_path)
     
-    html_string = markdown_to_html_node(markdown).to_html()
+    if render_cache is not None and URL_MARKER not in markdown:
+        with stage("render_cache"):
+            cached = render_cache.get(markdown)
+        # Entries written by builds without the search index have no terms
+        if cached is None or (index_terms and cached.terms is None):
+            cached = render_body(markdown, index_terms, images)
+            with stage("render_cache"):
+                render_cache.put(markdown, cached)
+        title, content, links, terms = metadata.get("title") or cached.title, cached.html_for(basepath, assets), cached.links, cached.terms
+    else:
+        links = []
+        content = markdown_to_html_node(markdown, links)
+        terms = page_terms(content) if index_terms else None
+        if images:
+            apply_images(content, images)
+        apply_basepath(content, basepath, assets)
+        title = metadata.get("title")
+    if not title:
+        # Raises for pages without a title in either place
+        title = extract_title(markdown)
 
-    title = extract_title(markdown) 
+    values = {
+        "Title": title,
+        "Content": content,
+        "Date": page_date(metadata, modified),
+        "Description": str(metadata.get("description", "")),
+    }
+    if slots:
+        values.update(slots)
 
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html_string)
+    sizes = None
+    html = PendingPage(template, values, basepath, assets)
+    if minify:
+        # Minified as one string, whitespace runs can span template literals and slot values
+        with stage("template"):
+            html = html.render()
+        with stage("minify"):
+            minified = minify_html(html)
+        sizes = (len(html.encode()), len(minified.encode()))
+        html = minified
 
-    # Replace links that start from root with the basepath+link
-    template = template.replace(f'href="/', f'href="{basepath}')
-    template = template.replace(f'src="/', f'src="{basepath}')
+    return PageRecord(from_path, dest_path, template_path, title, links, terms if index_terms else None, sizes, modified, source_hash, metadata), html
 
-    # Write the new HTML page to dest_path 
-    dest_dir_path = os.path.dirname(dest_path)
-    if not os.path.exists(dest_dir_path):
-        os.makedirs(dest_dir_path)
-    
-    with open(dest_path, "w") as f:
-        f.write(template)
+'''
+    Renders a page body for the render cache, independent of the basepath
+    Args:
+        markdown (str): REQUIRED - Markdown source of the page
+        index_terms (bool): OPTIONAL - Whether to collect the page's search terms too. Defaults to False.
+        images (dict[str, ImageInfo] | None): OPTIONAL - Processed images, see generate_page. Defaults to None.
+    Returns:
+        CachedRender: Title, body HTML with root links marked with URL_MARKER, the body's links and search terms
+'''
+def render_body(markdown: str, index_terms: bool = False, images: dict[str, ImageInfo] | None = None):
+    links = []
+    html_node = markdown_to_html_node(markdown, links)
+    terms = page_terms(html_node) if index_terms else None
+    if images:
+        apply_images(html_node, images)
+    apply_basepath(html_node, URL_MARKER)
+    try:
+        title = extract_title(markdown)
+    except ValueError:
+        # The page may have its title in front matter, checked when the page is rendered
+        title = None
+    return CachedRender(title, html_node.to_html(), links, terms)
 
 '''
-    Generates static HTML pages for all MD files in a directory, writing results to destination directory
+    Points every root-relative href/src attribute (and srcset candidate) in an HTMLNode tree under basepath. Working
+    on the tree means only real link and image attributes change, never text that happens to look like one.
     Args:
-        dir_path_content (str): REQUIRED - Path to source directory containing MD files to convert into HTML pages
-        template_path (str): REQUIRED - Path to HTML template file
-        dest_dir (str): REQUIRED - Path to destination directory to write generated HTML pages to
-        basepath (str): OPTIONAL - Base path to use for generated links in HTML pages, default is "/"
+        node (HTMLNode): REQUIRED - Root of the tree, modified in place
+        basepath (str): REQUIRED - Base path to prefix root links with
+        assets (AssetManifest | None): OPTIONAL - Fingerprinted assets, links to them are pointed at the
+            fingerprinted copies. Defaults to None.
     Returns:
-        None - Should write pages to dest_dir
+        None
+'''
+def apply_basepath(node: HTMLNode, basepath: str, assets: AssetManifest | None = None):
+    if basepath == "/" and assets is None:
+        return
+
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.props:
+            for prop in URL_PROPS:
+                if prop in current.props:
+                    url = assets.url_for(current.props[prop]) if assets is not None else current.props[prop]
+                    current.props[prop] = prefix_basepath(url, basepath)
+            if "srcset" in current.props:
+                candidates = []
+                for candidate in current.props["srcset"].split(", "):
+                    url, _, descriptor = candidate.partition(" ")
+                    url = assets.url_for(url) if assets is not None else url
+                    candidates.append(f"{prefix_basepath(url, basepath)} {descriptor}" if descriptor else prefix_basepath(url, basepath))
+                current.props["srcset"] = ", ".join(candidates)
+        if current.children:
+            stack.extend(current.children)
+
+'''
+    Finds every MD file under a content directory and pairs it with the HTML page it generates and the
+    template it's rendered with. A template.html inside a content directory overrides the template for
+    every page in that directory and below it. Full and incremental builds need the whole list (the static
+    sync and the later stages look at every output), iter_pages streams the same pages.
+    Args:
+        dir_path_content (str): REQUIRED - Path to source directory containing MD files
+        dest_dir (str): REQUIRED - Path to destination directory the HTML pages will be written to
+        template_path (str): REQUIRED - Path to HTML template file used unless a directory overrides it
+    Returns:
+        list[tuple[str, str, str]]: (source MD path, destination HTML path, template path) for every page, in sorted order
+'''
+def find_pages(dir_path_content: str, dest_dir: str, template_path: str):
+    return list(iter_pages(dir_path_content, dest_dir, template_path))
 
 '''
-def generate_pages_recursive(dir_path_content: str, template_path: str, dest_dir: str, basepath: str = "/"):
+    Yields the pages find_pages returns one at a time, in the same order. Directories are walked iteratively
+    with os.scandir, so only the entries of the directories on the current path are held.
+'''
+def iter_pages(dir_path_content: str, dest_dir: str, template_path: str):
+    stack = [_scan_content_dir(dir_path_content, dest_dir, template_path)]
 
-    # Crawl every entry within content directory 
-    for direntry in os.listdir(dir_path_content):
+    while stack:
+        entries, dir_dest, dir_template = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
 
-        # Construct full path for content entry and destination entry
-        content_entry = os.path.join(dir_path_content, direntry)
-        dest_entry = os.path.join(dest_dir, direntry)
+        dest_entry = os.path.join(dir_dest, entry.name)
+        if entry.is_dir():
+            stack.append(_scan_content_dir(entry.path, dest_entry, dir_template))
+        # Only markdown files become pages, anything else in content is ignored
+        elif entry.name.endswith(".md"):
+            yield entry.path, dest_entry[:-3] + ".html", dir_template
 
-        # If entry is a markdown file, generate it's HTML page
-        if os.path.isfile(content_entry) and content_entry.endswith(".md"):
-            dest_entry = dest_entry[:-3] + ".html"
-            generate_page(content_entry, template_path, dest_entry, basepath)
-        else:
-            generate_pages_recursive(content_entry, template_path, dest_entry, basepath)
+'''
+    Lists a content directory for iter_pages, returns (iterator over its entries, destination directory, template path)
+'''
+def _scan_content_dir(dir_path: str, dest_dir: str, template_path: str):
+    with os.scandir(dir_path) as scanner:
+        # Sorted so builds always visit pages in the same order
+        entries = sorted(scanner, key=lambda entry: entry.name)
+
+    if any(entry.name == TEMPLATE_OVERRIDE_NAME and entry.is_file() for entry in entries):
+        template_path = os.path.join(dir_path, TEMPLATE_OVERRIDE_NAME)
+    return iter(entries), dest_dir, template_path
+
+'''
+    Worker entry point for the process pool, returns (record, None) or (None, error) instead of raising
+    so one bad page doesn't abort the rest of the build
+'''
+def _render_page_task(task: tuple[str, str, str, str, RenderCache | None, bool, AssetManifest | None, dict[str, ImageInfo] | None, bool]):
+    from_path, dest_path, template_path, basepath, render_cache, index_terms, assets, images, minify = task
+    try:
+        return render_page(from_path, template_path, dest_path, basepath, render_cache=render_cache, index_terms=index_terms, assets=assets, images=images, minify=minify), None
+    except Exception as error:
+        return None, error
+
+'''
+    Worker entry point rendering a chunk of pages, see _render_page_task
+'''
+def _render_pages_task(tasks: list[tuple]):
+    return [_render_page_task(task) for task in tasks]
+
+class BudgetCollector:
+    '''
+        Tracks the build process against a memory budget. Over it, reference cycles (the only per-page memory
+        not freed as soon as a page is done) are collected, but only once the process grew by another
+        sixteenth of the budget since the last collection: a full collection walks every live object. Shared by
+        generate_pages and generate_pipelined.
+    '''
+    def __init__(self, max_rss: int):
+        self.max_rss = max_rss
+        self.collected_at = 0
+
+    '''
+    Returns whether the process is over the budget
+    '''
+    def check(self):
+        rss = current_rss() or 0
+        if rss < self.max_rss:
+            return False
+        if rss >= self.collected_at + self.max_rss // 16:
+            gc.collect()
+            rss = current_rss() or 0
+            self.collected_at = rss
+        return rss >= self.max_rss
+
+'''
+    Generates a list of pages, either one at a time or spread across a pool of worker processes.
+    Every page is attempted, and log lines are printed in page order regardless of which worker finishes first.
+    Pages are taken from pages as they're handed out and only a few chunks of them are with the workers at a
+    time, and the records of finished pages are passed on as soon as the pages before them are done. Given an
+    iterator such as iter_pages, memory doesn't grow with the number of pages beyond what on_record keeps.
+    Args:
+        pages (Iterable[tuple[str, str, str]]): REQUIRED - (source MD path, destination HTML path, template path) triples,
+            see find_pages and iter_pages
+        basepath (str): OPTIONAL - Base path to use for generated links in HTML pages, default is "/"
+        workers (int): OPTIONAL - Number of worker processes, 1 (the default) renders in this process
+        render_cache (RenderCache | None): OPTIONAL - Cache of rendered page bodies, see generate_page. Defaults to None.
+        index_terms (bool): OPTIONAL - Whether the records hold the pages' search terms, see generate_page. Defaults to False.
+        assets (AssetManifest | None): OPTIONAL - Fingerprinted assets, see generate_page. Defaults to None.
+        images (dict[str, ImageInfo] | None): OPTIONAL - Processed images, see generate_page. Defaults to None.
+        minify (bool): OPTIONAL - Whether to minify the pages' HTML, see generate_page. Defaults to False.
+        on_record (Callable[[PageRecord], None] | None): OPTIONAL - Called with the record of every page rendered
+            successfully, in page order, so callers can keep what they need of it instead of every record. Defaults to None.
+        max_rss (int | None): OPTIONAL - Memory budget in bytes for this process. While its resident set size is
+            over it, no more pages are handed out until the ones in flight are done, then one chunk at a time.
+            Defaults to None.
+    Returns:
+        list[tuple[str, Exception]]: (source MD path, error) for every page that failed, in page order
+'''
+def generate_pages(pages: Iterable[tuple[str, str, str]], basepath: str = "/", workers: int = 1, render_cache: RenderCache | None = None, index_terms: bool = False, assets: AssetManifest | None = None, images: dict[str, ImageInfo] | None = None, minify: bool = False, on_record: Callable[[PageRecord], None] | None = None, max_rss: int | None = None):
+    errors = []
+
+    def finished(from_path: str, record: PageRecord | None, error: Exception | None):
+        if error is not None:
+            errors.append((from_path, error))
+            return
+        if on_record is not None:
+            on_record(record)
+
+    collector = BudgetCollector(max_rss) if max_rss is not None else None
+
+    total = len(pages) if isinstance(pages, Sized) else None
+    if workers <= 1 or (total is not None and total <= 1):
+        for from_path, dest_path, template_path in pages:
+            try:
+                record = generate_page(from_path, template_path, dest_path, basepath, render_cache=render_cache, index_terms=index_terms, assets=assets, images=images, minify=minify)
+            except Exception as error:
+                finished(from_path, None, error)
+                continue
+            finished(from_path, record, None)
+            if max_rss is not None:
+                collector.check()
+        return errors
+
+    # Hand out several pages per round trip, small pages are cheaper to render than to dispatch
+    chunksize = max(1, min(total // (workers * 4), MAX_CHUNK_PAGES)) if total is not None else STREAM_CHUNK_PAGES
+    window = workers * CHUNKS_PER_WORKER
+    upcoming = iter(pages)
+    in_flight = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def submit():
+            chunk = list(islice(upcoming, chunksize))
+            if not chunk:
+                return False
+            tasks = [(from_path, dest_path, template_path, basepath, render_cache, index_terms, assets, images, minify) for from_path, dest_path, template_path in chunk]
+            in_flight.append((chunk, executor.submit(_render_pages_task, tasks)))
+            return True
+
+        def limit():
+            if max_rss is not None and collector.check():
+                # Over budget: let the chunks in flight drain, then go on one chunk at a time
+                return 0 if in_flight else 1
+            return window
+
+        while len(in_flight) < limit() and submit():
+            pass
+
+        # Chunks are collected in submission order, which keeps the log deterministic
+        while in_flight:
+            chunk, future = in_flight.popleft()
+            for (from_path, dest_path, template_path), (record, error) in zip(chunk, future.result()):
+                print(f"Generating page from {from_path} to {dest_path} using template {template_path}")
+                finished(from_path, record, error)
+            del chunk, future
+            while len(in_flight) < limit() and submit():
+                pass
 
+    return errors
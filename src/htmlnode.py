@@ -1,3 +1,8 @@
+from types import MappingProxyType
+
+# Read-only props shared by every node without attributes, instead of a None check or a dict per node
+EMPTY_PROPS = MappingProxyType({})
+
 class HTMLNode:
 
     '''
@@ -6,30 +11,46 @@ class HTMLNode:
         tag (str | None): The HTML tag of the node
         value (str | None): The value of the HTML tag
         children (list[HTMLNode] | None): List of child HTMLNode objects. Defaults to None.
-        props (dict[str, str] | None): Dictionary of HTML properties/attributes. Defaults to None.
+        props (dict[str, str] | None): Dictionary of HTML properties/attributes. Defaults to None,
+            which (like an empty dict) is stored as the shared EMPTY_PROPS.
     '''
+    # Slots instead of a per-instance __dict__, pages create a lot of nodes
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag: str | None = None, value: str | None = None, children: list["HTMLNode"] | None = None, props: dict[str, str] | None = None):
         self.tag = tag 
         self.value = value 
         self.children = children 
-        self.props = props
+        self.props = props if props else EMPTY_PROPS
     
+    '''
+    Returns the node's HTML as a single string, built from the chunks of iter_html
+    '''
     def to_html(self):
-        raise NotImplementedError("to_html method not implemented yet")
+        return "".join(self.iter_html())
+
+    '''
+    Yields the node's HTML as a sequence of string chunks, so callers can stream a page
+    without building the whole string in memory
+    '''
+    def iter_html(self):
+        raise NotImplementedError("iter_html method not implemented yet")
+
+    '''
+    Writes the node's HTML to a file-like sink (anything with a write method), chunk by chunk
+    '''
+    def write_html(self, sink):
+        for chunk in self.iter_html():
+            sink.write(chunk)
 
     '''
     Returns a formatted string representing the HTML node's attributes
     '''
     def props_to_html(self): 
-        if self.props is None:
+        if not self.props:
             return ""
         
-        attr_string = ""
-
-        for prop in self.props:
-            attr_string += f' {prop}="{self.props[prop]}"'
-    
-        return attr_string
+        return "".join(f' {prop}="{value}"' for prop, value in self.props.items())
     
     def __repr__(self):
         return f"HTMLNode(tag={self.tag}, value={self.value}, children={self.children}, props={self.props})"
@@ -42,6 +63,8 @@ class LeafNode(HTMLNode):
             value (str): REQUIRED - The value of the HTML tag 
             props (dict[str, str] | None): OPTIONAL - Dictionary of HTML properties/attributes. Defaults to None.
     '''
+    __slots__ = ()
+
     def __init__(self, tag: str | None, value: str, props: dict[str, str] | None = None):
         super().__init__(tag=tag, value=value, children=None, props=props)
     
@@ -53,6 +76,10 @@ class LeafNode(HTMLNode):
             return self.value
         
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+
+    # A leaf is always a single chunk
+    def iter_html(self):
+        yield self.to_html()
     
     def __repr__(self):
         return f"LeafNode(tag={self.tag}, value={self.value}, props={self.props})"
@@ -65,23 +92,28 @@ class ParentNode(HTMLNode):
             children (list[HTMLNode]): REQUIRED - List of child HTMLNode objects
             props (dict[str, str] | None): OPTIONAL - Dictionary of HTML properties/attributes. Defaults to None.
     '''
+    __slots__ = ()
+
     def __init__(self, tag: str, children: list[HTMLNode], props: dict[str, str] | None = None):
         super().__init__(tag=tag, value=None, children=children, props=props)
     
-    def to_html(self):
+    def iter_html(self):
         if self.tag is None:
             raise ValueError("ParentNode objects must have a tag")
         
         if self.children is None:
             raise ValueError("ParentNode objects must have children")
         
-        html_string = f"<{self.tag}{self.props_to_html()}>"
+        yield f"<{self.tag}{self.props_to_html()}>"
 
         for child in self.children:
-            html_string += child.to_html()
+            # Leaves are inlined here rather than going through another generator
+            if isinstance(child, LeafNode):
+                yield child.to_html()
+            else:
+                yield from child.iter_html()
         
-        html_string += f"</{self.tag}>" 
-        return html_string
+        yield f"</{self.tag}>"
     
     def __repr__(self):
-        return f"ParentNode(tag={self.tag}, children={self.children}, props={self.props})"
\ No newline at end of file
+        return f"ParentNode(tag={self.tag}, children={self.children}, props={self.props})"
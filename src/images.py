@@ -0,0 +1,336 @@
+from os import path
+from concurrent.futures import ProcessPoolExecutor
+from copystatic import transfer_file
+from htmlnode import HTMLNode
+from manifest import hash_file, list_files
+from typing import NamedTuple
+import hashlib
+import json
+import os
+import shutil
+import struct
+import zlib
+
+try:
+    from PIL import Image
+except ImportError:
+    # Optional dependency, without it images are only recompressed losslessly (PNG) and never resized
+    Image = None
+
+# Bump whenever processing changes, cached results of older versions are ignored
+IMAGE_PIPELINE_VERSION = 1
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+# Widths of the resized variants written for every image wider than them
+DEFAULT_WIDTHS = (480, 960, 1600)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Chunks that affect how the pixels are shown, the rest (text, timestamps, ...) is dropped when recompressing
+PNG_KEPT_CHUNKS = {b"IHDR", b"PLTE", b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT", b"pHYs", b"IEND"}
+
+# JPEG start-of-frame markers, they hold the image size (C4, C8 and CC are other segments)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+class ImageInfo(NamedTuple):
+    '''
+        What pages need to know to embed a processed image
+        Args:
+            width (int): Width of the image in pixels
+            height (int): Height of the image in pixels
+            variants (list[tuple[int, str]]): (width, output path relative to docs) of every resized variant, narrowest first
+    '''
+    width: int
+    height: int
+    variants: list[tuple[int, str]]
+
+'''
+    Returns True for static files the image stage processes
+'''
+def is_image(file_path: str):
+    return path.splitext(file_path)[1].lower() in IMAGE_EXTENSIONS
+
+'''
+    Returns the output path of a resized variant, e.g. "images/logo.480w.png"
+'''
+def variant_path(rel_path: str, width: int):
+    stem, extension = path.splitext(rel_path)
+    return f"{stem}.{width}w{extension}"
+
+'''
+    Reads the pixel size of a PNG, GIF or JPEG from its header, or of any format Pillow opens
+    Args:
+        data (bytes): REQUIRED - The image file's contents
+    Returns:
+        tuple[int, int] | None: (width, height), None if the format isn't recognized
+'''
+def image_size(data: bytes):
+    if data.startswith(PNG_SIGNATURE) and data[12:16] == b"IHDR":
+        return struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", data[6:10])
+    if data.startswith(b"\xff\xd8"):
+        position = 2
+        while position + 9 <= len(data) and data[position] == 0xFF:
+            marker = data[position + 1]
+            length = struct.unpack(">H", data[position + 2:position + 4])[0]
+            if marker in JPEG_SOF_MARKERS:
+                height, width = struct.unpack(">HH", data[position + 5:position + 9])
+                return width, height
+            position += 2 + length
+    if Image is not None:
+        from io import BytesIO
+        try:
+            with Image.open(BytesIO(data)) as image:
+                return image.size
+        except OSError:
+            return None
+    return None
+
+'''
+    Recompresses a PNG losslessly: the pixel data is deflated again at the highest level into a single IDAT
+    chunk and metadata chunks that don't affect the pixels are dropped. Animated PNGs are left alone.
+    Args:
+        data (bytes): REQUIRED - The PNG file's contents
+    Returns:
+        bytes: The smaller of the recompressed and the original PNG
+'''
+def optimize_png(data: bytes):
+    if not data.startswith(PNG_SIGNATURE):
+        return data
+
+    chunks, idat = [], []
+    position = len(PNG_SIGNATURE)
+    while position + 8 <= len(data):
+        length = struct.unpack(">I", data[position:position + 4])[0]
+        chunk_type = data[position + 4:position + 8]
+        body = data[position + 8:position + 8 + length]
+        position += 12 + length
+
+        if chunk_type == b"acTL":
+            return data
+        if chunk_type == b"IDAT":
+            if not idat:
+                chunks.append((b"IDAT", None))
+            idat.append(body)
+        elif chunk_type in PNG_KEPT_CHUNKS:
+            chunks.append((chunk_type, body))
+
+    try:
+        pixels = zlib.decompress(b"".join(idat))
+    except zlib.error:
+        return data
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9)
+    deflated = compressor.compress(pixels) + compressor.flush()
+
+    parts = [PNG_SIGNATURE]
+    for chunk_type, body in chunks:
+        body = deflated if body is None else body
+        parts.append(struct.pack(">I", len(body)) + chunk_type + body + struct.pack(">I", zlib.crc32(chunk_type + body)))
+    optimized = b"".join(parts)
+
+    return optimized if len(optimized) < len(data) else data
+
+'''
+    Writes a resized copy of an image with Pillow
+    Args:
+        source (str): REQUIRED - Path of the full size image
+        dest (str): REQUIRED - Path to write the variant to, its extension picks the format
+        width (int): REQUIRED - Width of the variant, the height keeps the aspect ratio
+    Returns:
+        None
+'''
+def write_variant(source: str, dest: str, width: int):
+    with Image.open(source) as image:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        if path.splitext(dest)[1].lower() in (".jpg", ".jpeg"):
+            resized.convert("RGB").save(dest, quality=85, optimize=True, progressive=True)
+        else:
+            resized.save(dest, optimize=True)
+
+'''
+    Processes one image into a cache entry directory: the losslessly recompressed image, one resized file per
+    width narrower than the image (when Pillow is installed) and a meta.json describing them
+    Args:
+        task (tuple[str, str, list[int]]): REQUIRED - (source image path, cache entry directory, variant widths)
+    Returns:
+        dict: The entry's meta.json, {"width", "height", "variants": [width, ...]}
+'''
+def process_image(task: tuple[str, str, list[int]]):
+    source, entry_dir, widths = task
+    extension = path.splitext(source)[1].lower()
+    with open(source, "rb") as f:
+        data = f.read()
+
+    # Staged in a temporary directory and renamed into place, so a cache entry is either complete or missing
+    tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    optimized = optimize_png(data) if extension == ".png" else data
+    image_path = path.join(tmp_dir, "image" + extension)
+    with open(image_path, "wb") as f:
+        f.write(optimized)
+
+    width, height = image_size(data) or (0, 0)
+    variants = []
+    if Image is not None and width:
+        for variant_width in sorted(widths):
+            if variant_width < width:
+                write_variant(image_path, path.join(tmp_dir, f"{variant_width}w{extension}"), variant_width)
+                variants.append(variant_width)
+
+    meta = {"width": width, "height": height, "variants": variants}
+    with open(path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+    return meta
+
+'''
+    Returns the cache entry key of an image: its hash plus everything else that changes the processed result
+'''
+def cache_key(file_hash: str, widths: list[int]):
+    settings = [IMAGE_PIPELINE_VERSION, file_hash, sorted(widths), Image is not None]
+    return hashlib.sha256(json.dumps(settings).encode()).hexdigest()
+
+'''
+    Loads the images of the last run of optimize_images, see ImageInfo
+    Returns:
+        dict[str, ImageInfo]: Image path relative to static -> ImageInfo, empty when there's no readable state
+'''
+def load_images(state_path: str):
+    try:
+        with open(state_path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    return {
+        rel_path: ImageInfo(entry["width"], entry["height"], [(width, output) for width, output in entry["variants"]])
+        for rel_path, entry in state.get("images", {}).items()
+    }
+
+'''
+    Returns a digest of a set of images, changes whenever an image is added, removed, resized or gets other variants
+'''
+def images_digest(images: dict[str, ImageInfo]):
+    return hashlib.sha256(json.dumps(sorted(images.items())).encode()).hexdigest()[:16]
+
+'''
+    Writes optimized copies of every image in static (and their resized variants) to the same paths in docs.
+    Processing results are cached by source hash in cache_dir, so an image is only ever processed once, and
+    images whose outputs from the last run are still in place aren't touched at all. Outputs of images that
+    were removed or changed are deleted.
+    Args:
+        static_path (str): REQUIRED - Path to the static assets directory
+        docs_path (str): REQUIRED - Path to the output directory
+        state_path (str): REQUIRED - JSON file recording, per image, the cache key and outputs of the last run
+        cache_dir (str): REQUIRED - Directory holding processed images by cache key
+        workers (int): OPTIONAL - Number of worker processes, default is 1
+        widths (list[int]): OPTIONAL - Variant widths, default is DEFAULT_WIDTHS
+        link (str): OPTIONAL - How cached results are placed in docs, see transfer_file. Default is "reflink".
+        hashes (dict[str, str] | None): OPTIONAL - Already known hashes by path relative to static. Defaults to None.
+    Returns:
+        tuple[dict[str, ImageInfo], int, int]: (image path relative to static -> ImageInfo, images processed,
+            images taken from the cache or left in place)
+'''
+def optimize_images(static_path: str, docs_path: str, state_path: str, cache_dir: str, workers: int = 1, widths: list[int] = DEFAULT_WIDTHS, link: str = "reflink", hashes: dict[str, str] | None = None):
+    try:
+        with open(state_path, "r") as f:
+            previous = json.load(f).get("images", {})
+    except (OSError, ValueError):
+        previous = {}
+
+    hashes = hashes if hashes is not None else {}
+    keys, tasks = {}, {}
+    for rel_path in list_files(static_path):
+        if not is_image(rel_path):
+            continue
+        source = path.join(static_path, rel_path)
+        key = cache_key(hashes.get(rel_path) or hash_file(source), widths)
+        keys[rel_path] = key
+
+        entry_dir = path.join(cache_dir, key[:2], key)
+        if not path.exists(path.join(entry_dir, "meta.json")) and key not in tasks:
+            tasks[key] = (source, entry_dir, list(widths))
+
+    task_list = list(tasks.values())
+    if workers > 1 and len(task_list) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(process_image, task_list))
+    else:
+        for task in task_list:
+            process_image(task)
+
+    state, images = {}, {}
+    for rel_path, key in keys.items():
+        entry_dir = path.join(cache_dir, key[:2], key)
+        with open(path.join(entry_dir, "meta.json"), "r") as f:
+            meta = json.load(f)
+
+        extension = path.splitext(rel_path)[1].lower()
+        outputs = {rel_path: "image" + extension}
+        variants = []
+        for width in meta["variants"]:
+            outputs[variant_path(rel_path, width)] = f"{width}w{extension}"
+            variants.append((width, variant_path(rel_path, width)))
+
+        entry = previous.get(rel_path)
+        in_place = entry is not None and entry["key"] == key and all(path.exists(path.join(docs_path, output)) for output in outputs)
+        if not in_place:
+            for output, cached_name in outputs.items():
+                transfer_file(path.join(entry_dir, cached_name), path.join(docs_path, output), link)
+
+        state[rel_path] = {"key": key, "width": meta["width"], "height": meta["height"], "variants": variants}
+        images[rel_path] = ImageInfo(meta["width"], meta["height"], variants)
+
+    # Variants of images that are gone or were resized differently
+    current_outputs = {output for info in images.values() for _, output in info.variants}
+    for rel_path, entry in previous.items():
+        for _, output in entry["variants"]:
+            if output not in current_outputs and path.exists(path.join(docs_path, output)):
+                os.remove(path.join(docs_path, output))
+
+    os.makedirs(path.dirname(state_path), exist_ok=True)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"images": state}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+    return images, len(task_list), len(keys) - len(task_list)
+
+'''
+    Returns the outputs the image stage writes besides the images themselves, the resized variants
+'''
+def image_outputs(images: dict[str, ImageInfo]):
+    return [output for info in images.values() for _, output in info.variants]
+
+'''
+    Gives every <img> of an HTMLNode tree showing a processed image its width and height, lazy loading,
+    and a srcset of its resized variants. Only root-relative src URLs are matched, before the basepath is applied.
+    Args:
+        node (HTMLNode): REQUIRED - Root of the tree, modified in place
+        images (dict[str, ImageInfo]): REQUIRED - Result of optimize_images
+    Returns:
+        None
+'''
+def apply_images(node: HTMLNode, images: dict[str, ImageInfo]):
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.tag == "img":
+            src = current.props.get("src", "")
+            info = images.get(src[1:]) if src.startswith("/") and not src.startswith("//") else None
+            if info is not None and info.width:
+                if info.variants:
+                    candidates = [f"/{output} {width}w" for width, output in info.variants]
+                    current.props["srcset"] = ", ".join(candidates + [f"{src} {info.width}w"])
+                    current.props["sizes"] = f"(max-width: {info.width}px) 100vw, {info.width}px"
+                current.props["width"] = str(info.width)
+                current.props["height"] = str(info.height)
+                current.props["loading"] = "lazy"
+        elif current.children:
+            stack.extend(current.children)
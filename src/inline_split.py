@@ -16,7 +16,7 @@ import re
             List of TextNode objects created after splitting old nodes by the delimiter
 '''
 def split_nodes_delimiter(old_nodes: list[TextNode], delimiter: str, text_type: TextType):
-    #TODO: Support nested inline elements (e.g., bold text inside code blocks)
+    # Doesn't support nested inline elements, text_to_textnodes handles those
     new_nodes = []
 
     for old_node in old_nodes:
@@ -144,8 +144,129 @@ def split_nodes_link(old_nodes: list[TextNode]):
             new_nodes.append(TextNode(text, TextType.PLAIN_TEXT))
 
     return new_nodes
+# One alternative per inline element, text_to_textnodes searches the text left to right matching whole elements at a time.
+# The image and link alternatives mirror the extract_markdown_* patterns, a lone backtick is an unmatched code span.
+# The leading lookahead lets the regex engine skip runs of plain text instead of trying every alternative at each character.
+# An underscore between two letters or digits (snake_case) isn't a delimiter and stays in the plain text.
+INLINE_PATTERN = re.compile(
+    r"(?=[`!\[_*])(?:"
+    r"`([^`]*)`"
+    r"|!\[([^\[\]]*)\]\(([^\(\)]*)\)"
+    r"|(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
+    r"|(\*\*|(?<![^\W_])_|_(?![^\W_]))"
+    r"|(`))"
+)
+
+# match.lastindex of each INLINE_PATTERN alternative
+CODE_GROUP, IMAGE_GROUP, LINK_GROUP, EMPHASIS_GROUP, UNMATCHED_CODE_GROUP = 1, 3, 5, 6, 7
+
+EMPHASIS_DELIMITERS = {
+    "**": TextType.BOLD_TEXT,
+    "_": TextType.ITALIC_TEXT,
+}
+
+'''
+    Converts a raw Markdown string into a list of TextNode objects in a single left-to-right pass.
+    Code spans are taken literally, images and links are matched in place, and bold/italic spans may
+    nest inside each other (a span containing other formatting becomes a TextNode with children).
+    Underscores inside a word are literal, and so are delimiters left open when the span around them
+    closes. Otherwise, for un-nested text the result is identical to text_to_textnodes_reference.
+    Args:
+        text (str)
+            REQUIRED - Raw Markdown text to convert into TextNode objects
+    Returns:
+        list[TextNode]
+            List of TextNode objects created from the raw Markdown string
+'''
+def text_to_textnodes(text: str):
+    # Stack of open emphasis spans as (delimiter, nodes inside the span), the bottom entry is the whole text
+    stack = [(None, [])]
+    nodes = stack[0][1]
+    plain_start = 0
+
+    match = INLINE_PATTERN.search(text)
+    while match is not None:
+        group = match.lastindex
+        start = match.start()
+
+        if group in (CODE_GROUP, UNMATCHED_CODE_GROUP) and len(stack) > 1:
+            # Inside bold/italic, a lone backtick, an empty code span and a backtick whose code span would run past
+            # the delimiter closing the span are kept literally, like text_to_textnodes_reference does
+            if not match[1]:
+                match = INLINE_PATTERN.search(text, match.end())
+                continue
+            if any(delimiter in match[1] for delimiter, _ in stack[1:]):
+                match = INLINE_PATTERN.search(text, start + 1)
+                continue
+        if group == UNMATCHED_CODE_GROUP:
+            raise Exception(f"Unmatched delimiter '`' found in text: '{text}'")
+
+        if start > plain_start:
+            nodes.append(TextNode(text[plain_start:start], TextType.PLAIN_TEXT))
+        plain_start = match.end()
+
+        if group == LINK_GROUP:
+            nodes.append(TextNode(match[4], TextType.LINK, match[5]))
+        elif group == IMAGE_GROUP:
+            nodes.append(TextNode(match[2], TextType.IMAGE, match[3]))
+        elif group == CODE_GROUP:
+            if match[1]:
+                nodes.append(TextNode(match[1], TextType.CODE))
+        else:
+            # Emphasis delimiter, closes the innermost open span it matches, otherwise opens a new one
+            delimiter = match[EMPHASIS_GROUP]
+            if any(open_delimiter == delimiter for open_delimiter, _ in stack[1:]):
+                # Spans opened inside the one closing never closed themselves, their delimiters were literal text
+                while stack[-1][0] != delimiter:
+                    open_delimiter, span_nodes = stack.pop()
+                    nodes = stack[-1][1]
+                    _append_plain(nodes, open_delimiter)
+                    for node in span_nodes:
+                        if node.text_type == TextType.PLAIN_TEXT:
+                            _append_plain(nodes, node.text)
+                        else:
+                            nodes.append(node)
+                stack.pop()
+                span_node = _emphasis_node(nodes, EMPHASIS_DELIMITERS[delimiter])
+                nodes = stack[-1][1]
+                if span_node is not None:
+                    nodes.append(span_node)
+            else:
+                stack.append((delimiter, []))
+                nodes = stack[-1][1]
+        match = INLINE_PATTERN.search(text, plain_start)
+
+    if len(stack) > 1:
+        raise Exception(f"Unmatched delimiter '{stack[-1][0]}' found in text: '{text}'")
+
+    if len(text) > plain_start:
+        nodes.append(TextNode(text[plain_start:], TextType.PLAIN_TEXT))
+    return nodes
+
+'''
+    Appends plain text to nodes, merged into the last node when that is plain text too
+'''
+def _append_plain(nodes: list[TextNode], text: str):
+    if nodes and nodes[-1].text_type == TextType.PLAIN_TEXT:
+        nodes[-1] = TextNode(nodes[-1].text + text, TextType.PLAIN_TEXT)
+    else:
+        nodes.append(TextNode(text, TextType.PLAIN_TEXT))
+
+'''
+    Builds the TextNode for a closed bold/italic span, a flat node when the span only holds plain text
+'''
+def _emphasis_node(nodes: list[TextNode], text_type: TextType):
+    if not nodes:
+        return None
+
+    if len(nodes) == 1 and nodes[0].text_type == TextType.PLAIN_TEXT:
+        return TextNode(nodes[0].text, text_type)
+
+    return TextNode("".join(node.text for node in nodes), text_type, children=nodes)
+
 '''
-    Converts a raw Markdown string into a list of TextNode objects, applying appropriate splits
+    Original five pass implementation of text_to_textnodes, kept as a reference for testing and benchmarks.
+    Doesn't support nested inline elements.
     Args:
         text (str)
             REQUIRED - Raw Markdown text to convert into TextNode objects
@@ -153,7 +274,7 @@ def split_nodes_link(old_nodes: list[TextNode]):
         list[TextNode]
             List of TextNode objects created from the raw Markdown string
 '''
-def text_to_textnodes(text):
+def text_to_textnodes_reference(text):
     # Convert raw text to single TextNode object
     nodes = [TextNode(text, TextType.PLAIN_TEXT)]
     
@@ -0,0 +1,68 @@
+from depgraph import DependencyGraph, find_output, link_target
+from manifest import list_files
+from profiling import stage
+from typing import NamedTuple
+import os
+import posixpath
+
+class BrokenLink(NamedTuple):
+    '''
+        An internal link or image whose target isn't in the built site
+        Args:
+            source (str): Source MD path of the page holding the link
+            line (int): Line number (1-based) of the link in the source
+            url (str): The link as written in the page
+    '''
+    source: str
+    line: int
+    url: str
+
+'''
+    Checks every internal link and image of the last build against the generated docs tree. The links were
+    collected with their line numbers while the pages were parsed (in the render workers), so checking is
+    only a set lookup per link and no page is parsed again.
+    Args:
+        graph (DependencyGraph): REQUIRED - Dependency graph of the build, holds every page's links
+        docs_path (str): REQUIRED - Path to the output directory
+    Returns:
+        list[BrokenLink]: Broken links sorted by source file and line
+'''
+def check_links(graph: DependencyGraph, docs_path: str):
+    with stage("link_check"):
+        # Static files are copied into docs, listing them too keeps the check right for a half-synced tree
+        outputs = set(list_files(docs_path))
+        outputs.update(graph.static.values())
+
+        # Sites link to the same few targets over and over, each one is only resolved once.
+        # Root-relative URLs resolve the same from every page, relative ones per page directory.
+        resolved = {}
+        broken = []
+        for source, entry in sorted(graph.pages.items()):
+            page_dir = posixpath.dirname(entry["output"])
+            for url, line in entry["links"]:
+                key = url if url.startswith("/") else (page_dir, url)
+                ok = resolved.get(key)
+                if ok is None:
+                    target = link_target(url, entry["output"])
+                    ok = resolved[key] = target is None or find_output(target, outputs) is not None
+                if not ok:
+                    broken.append(BrokenLink(source, line, url))
+
+    return broken
+
+'''
+    Formats broken links as "file:line: url" lines under a summary line
+    Args:
+        broken (list[BrokenLink]): REQUIRED - Result of check_links
+        root_dir (str): REQUIRED - Directory source paths are shown relative to
+    Returns:
+        str
+'''
+def link_report(broken: list[BrokenLink], root_dir: str):
+    if not broken:
+        return "Link check: no broken links"
+
+    pages = len({link.source for link in broken})
+    lines = [f"Link check: {len(broken)} broken link(s) in {pages} page(s)"]
+    lines.extend(f"  {os.path.relpath(link.source, root_dir)}:{link.line}: {link.url}" for link in broken)
+    return "\n".join(lines)
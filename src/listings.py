@@ -0,0 +1,295 @@
+from metaindex import DIRECTORY_GROUP, MONTH_GROUP, TAG_GROUP, MetadataIndex
+from template import load_template
+from htmlnode import HTMLNode, LeafNode, ParentNode
+from searchindex import page_url
+from minify import minify_html
+from manifest import hash_file
+from assets import AssetManifest
+import hashlib
+import json
+import os
+import posixpath
+import re
+from typing import Iterable
+
+LISTINGS_STATE_VERSION = 1
+
+DEFAULT_PAGE_SIZE = 10
+
+# Where tag and archive listings go, docs/tags/<tag>/ and docs/archive/<YYYY-MM>/
+TAGS_DIR = "tags"
+ARCHIVE_DIR = "archive"
+# Groups listing every tag and every month, rebuilt whenever one tag or month is
+TAG_INDEX_GROUP = "tags"
+ARCHIVE_INDEX_GROUP = "archive"
+
+# Runs of anything but (Unicode) letters and digits
+SLUG_PATTERN = re.compile(r"[\W_]+")
+
+'''
+    Returns the URL-safe name of a tag's listing directory, e.g. "Middle Earth" -> "middle-earth". Different tags
+    can share one, see tag_slugs.
+'''
+def tag_slug(tag: str):
+    return SLUG_PATTERN.sub("-", tag.lower()).strip("-") or "tag"
+
+'''
+    Returns tag -> name of its listing directory, unique across tags. Tags whose tag_slug is shared with another
+    tag get a short hash of the tag appended ("C++" -> "c-<hash>"), unless the tag is spelled exactly like the slug.
+    Args:
+        tags (Iterable[str]): REQUIRED - Every tag of the site
+    Returns:
+        dict[str, str]: Tag -> slug
+'''
+def tag_slugs(tags: Iterable[str]):
+    by_slug = {}
+    for tag in tags:
+        by_slug.setdefault(tag_slug(tag), []).append(tag)
+
+    slugs = {}
+    for slug, shared in by_slug.items():
+        for tag in shared:
+            if len(shared) == 1 or tag == slug:
+                slugs[tag] = slug
+            else:
+                slugs[tag] = f"{slug}-{hashlib.sha256(tag.encode()).hexdigest()[:8]}"
+    return slugs
+
+'''
+    Returns the output path (relative to docs) of page number of a listing whose first page is in directory
+'''
+def listing_output(directory: str, number: int):
+    if number == 1:
+        return posixpath.join(directory, "index.html")
+    return posixpath.join(directory, "page", str(number), "index.html")
+
+'''
+    Loads the listings state, an empty one when missing, unreadable or outdated
+'''
+def load_listings_state(state_path: str):
+    try:
+        with open(state_path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"key": None, "groups": {}}
+
+    if state.get("version") != LISTINGS_STATE_VERSION:
+        return {"key": None, "groups": {}}
+    return state
+
+'''
+    Returns the paths (relative to docs) of the listing pages written by the last update_listings
+'''
+def listing_outputs(state_path: str):
+    return [output for outputs in load_listings_state(state_path)["groups"].values() for output in outputs]
+
+'''
+    Returns the template of a directory's listing: the one of the pages in the nearest directory (itself or
+    above it) in templates, template_path when there's none
+'''
+def _directory_template(directory: str, templates: dict[str, str], template_path: str):
+    while True:
+        if directory in templates:
+            return templates[directory]
+        if not directory:
+            return template_path
+        directory = posixpath.dirname(directory)
+
+'''
+    Returns a link to a page of the site
+'''
+def _link(text: str, output: str, basepath: str, props: dict[str, str] | None = None):
+    return LeafNode("a", text, {"href": page_url(output, basepath), **(props or {})})
+
+'''
+    Renders the Content of one listing page: a list of entries and the links to the previous and next pages
+    Args:
+        items (list[list[HTMLNode]]): REQUIRED - Children of every <li> on the page
+        directory (str): REQUIRED - Directory of the listing's first page
+        number (int): REQUIRED - Number of the page, from 1
+        count (int): REQUIRED - Number of pages of the listing
+        basepath (str): REQUIRED - Base path the site is served from
+    Returns:
+        HTMLNode
+'''
+def render_listing_page(items: list[list[HTMLNode]], directory: str, number: int, count: int, basepath: str):
+    children = [ParentNode("ul", [ParentNode("li", item) for item in items], {"class": "listing"})]
+    if count > 1:
+        navigation = []
+        if number > 1:
+            navigation.append(_link("Newer", listing_output(directory, number - 1), basepath, {"rel": "prev"}))
+        navigation.append(LeafNode("span", f"Page {number} of {count}"))
+        if number < count:
+            navigation.append(_link("Older", listing_output(directory, number + 1), basepath, {"rel": "next"}))
+        children.append(ParentNode("nav", navigation, {"class": "pagination"}))
+    return ParentNode("div", children)
+
+'''
+    Queries the index for a group: returns (directory of its first page, title, [(children of its <li>, date)]),
+    or None when it gets no listing. slugs is tag_slugs of every tag in the index.
+'''
+def _group_entries(index: MetadataIndex, kind: str, name: str, basepath: str, slugs: dict[str, str]):
+    if kind == TAG_INDEX_GROUP:
+        return TAGS_DIR, "Tags", [
+            ([_link(tag, listing_output(posixpath.join(TAGS_DIR, slugs[tag]), 1), basepath), LeafNode(None, f" ({count})")], "")
+            for tag, count in index.tags()
+        ]
+    if kind == ARCHIVE_INDEX_GROUP:
+        return ARCHIVE_DIR, "Archive", [
+            ([_link(month, listing_output(posixpath.join(ARCHIVE_DIR, month), 1), basepath), LeafNode(None, f" ({count})")], "")
+            for month, count in index.months()
+        ]
+
+    if kind == DIRECTORY_GROUP:
+        # Directories with an index page of their own aren't listed
+        if index.has_output(listing_output(name, 1)):
+            return None
+        directory, title, pages = name, posixpath.basename(name) or "Pages", index.pages(directory=name)
+    elif kind == TAG_GROUP:
+        directory, title, pages = posixpath.join(TAGS_DIR, slugs.get(name, tag_slug(name))), f"Tagged {name}", index.pages(tag=name)
+    else:
+        directory, title, pages = posixpath.join(ARCHIVE_DIR, name), f"Archive of {name}", index.pages(month=name)
+
+    entries = []
+    for page in pages:
+        item = [_link(page.title, page.output, basepath), LeafNode(None, " "), LeafNode("time", page.date, {"datetime": page.date})]
+        if page.description:
+            item.append(LeafNode("p", page.description))
+        entries.append((item, page.date))
+    return directory, title, entries
+
+'''
+    Returns the key the listings depend on besides the index: page size, basepath, assets, minification and
+    the contents of every template (and partial) used
+'''
+def _listings_key(templates: dict[str, str], template_path: str, page_size: int, basepath: str, assets: AssetManifest | None, minify: bool):
+    template_hashes = {}
+    for template_file in {template_path, *templates.values()}:
+        for file_path in [template_file, *load_template(template_file).partials]:
+            template_hashes[file_path] = hash_file(file_path)
+
+    key = [LISTINGS_STATE_VERSION, page_size, basepath, assets.digest if assets is not None else None, minify, sorted(templates.items()), sorted(template_hashes.items())]
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+'''
+    Writes the paginated listing pages of a site from its metadata index: one listing per directory without an
+    index page of its own (<dir>/index.html, <dir>/page/2/index.html, ...), per tag (tags/<tag>/) and per month
+    (archive/<YYYY-MM>/), plus tags/index.html and archive/index.html listing those. Entries are newest first.
+    Only the groups the index marked dirty are queried and rendered, every group when the templates, page size
+    or basepath changed, and listing pages whose HTML is the same as last time aren't rewritten.
+    Args:
+        docs_path (str): REQUIRED - Path to the output directory
+        state_path (str): REQUIRED - File keeping the digest of every listing page between builds
+        index (MetadataIndex): REQUIRED - Index of the site's pages, its dirty groups are cleared and committed
+        template_path (str): REQUIRED - Template of the tag and archive listings
+        templates (dict[str, str]): REQUIRED - Directory (relative to docs) -> template of the pages in it
+        page_size (int): OPTIONAL - Entries per listing page, default is DEFAULT_PAGE_SIZE
+        basepath (str): OPTIONAL - Base path the site is served from, default is "/"
+        assets (AssetManifest | None): OPTIONAL - Fingerprinted assets the template's links are pointed at. Defaults to None.
+        minify (bool): OPTIONAL - Minify the listing pages. Default is False.
+    Returns:
+        tuple[int, int, int, int]: Number of (groups queried, pages written, pages unchanged, pages removed)
+'''
+def update_listings(docs_path: str, state_path: str, index: MetadataIndex, template_path: str, templates: dict[str, str], page_size: int = DEFAULT_PAGE_SIZE, basepath: str = "/", assets: AssetManifest | None = None, minify: bool = False):
+    if page_size < 1:
+        raise ValueError(f"Listing page size must be at least 1, got {page_size}")
+
+    state = load_listings_state(state_path)
+    key = _listings_key(templates, template_path, page_size, basepath, assets, minify)
+    old_groups = state["groups"]
+    slugs = tag_slugs(tag for tag, _ in index.tags())
+
+    if state["key"] != key:
+        groups = {(DIRECTORY_GROUP, directory) for directory in index.directories()}
+        groups.update((TAG_GROUP, tag) for tag, _ in index.tags())
+        groups.update((MONTH_GROUP, month) for month, _ in index.months())
+        groups.update(tuple(group.split(":", 1)) for group in old_groups)
+    else:
+        groups = set(index.dirty_groups())
+        # Listing pages deleted from docs since the last build
+        groups.update(
+            tuple(group.split(":", 1)) for group, outputs in old_groups.items()
+            if not all(os.path.exists(os.path.join(docs_path, output)) for output in outputs)
+        )
+        # Tags whose slug changed since, a tag sharing it was added or removed
+        groups.update(
+            (TAG_GROUP, tag) for tag, slug in slugs.items()
+            if f"{TAG_GROUP}:{tag}" in old_groups and listing_output(posixpath.join(TAGS_DIR, slug), 1) not in old_groups[f"{TAG_GROUP}:{tag}"]
+        )
+    if any(kind == TAG_GROUP for kind, _ in groups):
+        groups.add((TAG_INDEX_GROUP, ""))
+    if any(kind == MONTH_GROUP for kind, _ in groups):
+        groups.add((ARCHIVE_INDEX_GROUP, ""))
+
+    new_groups = {group: outputs for group, outputs in old_groups.items() if tuple(group.split(":", 1)) not in groups}
+    written, unchanged = 0, 0
+    for kind, name in sorted(groups):
+        listing = _group_entries(index, kind, name, basepath, slugs)
+        if listing is None or not listing[2]:
+            continue
+        directory, title, entries = listing
+        template = load_template(_directory_template(directory, templates, template_path) if kind == DIRECTORY_GROUP else template_path)
+        old_outputs = old_groups.get(f"{kind}:{name}", {})
+        outputs = new_groups[f"{kind}:{name}"] = {}
+
+        count = (len(entries) + page_size - 1) // page_size
+        for number in range(1, count + 1):
+            output = listing_output(directory, number)
+            # Never overwrite a page
+            if index.has_output(output):
+                continue
+
+            page_entries = entries[(number - 1) * page_size:number * page_size]
+            values = {
+                "Title": title if number == 1 else f"{title} (page {number} of {count})",
+                "Content": render_listing_page([item for item, _ in page_entries], directory, number, count, basepath),
+                "Date": max(day for _, day in page_entries),
+                "Description": "",
+            }
+            html = template.render(values, basepath, assets)
+            if minify:
+                html = minify_html(html)
+
+            outputs[output] = hashlib.sha256(html.encode()).hexdigest()
+            file_path = os.path.join(docs_path, output)
+            if old_outputs.get(output) == outputs[output] and os.path.exists(file_path):
+                unchanged += 1
+                continue
+
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            tmp_path = file_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(html)
+            os.replace(tmp_path, file_path)
+            written += 1
+
+    # Pages of listings that shrank or went away, unless another listing or a page took their place
+    current = {output for outputs in new_groups.values() for output in outputs}
+    removed = 0
+    for outputs in old_groups.values():
+        for output in outputs:
+            file_path = os.path.join(docs_path, output)
+            if output not in current and not index.has_output(output) and os.path.exists(file_path):
+                _remove_listing(file_path, docs_path)
+                removed += 1
+
+    state = {"version": LISTINGS_STATE_VERSION, "key": key, "groups": new_groups}
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+    index.clear_dirty()
+    index.commit()
+
+    return len(groups), written, unchanged, removed
+
+'''
+    Deletes a listing page, then the page/<n>/ directories above it left empty
+'''
+def _remove_listing(file_path: str, docs_path: str):
+    os.remove(file_path)
+    dir_path = os.path.dirname(file_path)
+    while os.path.abspath(dir_path) != os.path.abspath(docs_path) and not os.listdir(dir_path):
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
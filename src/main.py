@@ -1,30 +1,135 @@
-from textnode import *
 from os import path
-from shutil import rmtree
-from copystatic import copy_directory
-from generatepage import generate_pages_recursive
-import sys 
+from build import full_build, incremental_build
+from watch import watch
+from daemon import serve_daemon
+from client import SOCKET_NAME
+from generatepage import PageBuildError
+from rendercache import RenderCache
+from images import DEFAULT_WIDTHS
+from listings import DEFAULT_PAGE_SIZE
+from pipeline import DEFAULT_IO_THREADS
+from depgraph import DependencyGraph, rebuild_report
+from linkcheck import check_links, link_report
+import profiling
+import argparse
+import os
+import sys
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate the static site from content/ and static/ into docs/")
     # default basepath is "/" since site assumes it's being served from the root
     # but will be set to first command line arg if provided.
-    basepath = sys.argv[1] if len(sys.argv) > 1 else '/'
+    parser.add_argument("basepath", nargs="?", default="/", help="base path the site is served from")
+    parser.add_argument("--incremental", action="store_true", help="only rebuild outputs whose sources changed since the last build")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes to render pages with, 0 uses every CPU core")
+    parser.add_argument("--link", choices=["reflink", "hardlink", "copy"], default="reflink", help="how static files are placed in docs, reflink and hardlink fall back to copying")
+    parser.add_argument("--hash-static", action="store_true", help="compare static files by content hash instead of size and mtime")
+    parser.add_argument("--precompress", action="store_true", help="write .gz (and .br with the brotli module) variants of compressible outputs")
+    parser.add_argument("--fingerprint", action="store_true", help="copy assets to content-hashed names, point pages at them and write docs/asset-manifest.json")
+    parser.add_argument("--optimize-images", action="store_true", help="recompress images losslessly and write resized variants (with Pillow) for srcset")
+    parser.add_argument("--image-widths", type=lambda value: [int(width) for width in value.split(",")], default=list(DEFAULT_WIDTHS), metavar="W,W,...", help=f"widths of the resized image variants, default is {','.join(map(str, DEFAULT_WIDTHS))}")
+    parser.add_argument("--minify", action="store_true", help="minify pages and static HTML/CSS and report the bytes saved per file type")
+    parser.add_argument("--site-url", metavar="URL", help="scheme and host the site is served from, e.g. https://example.com; writes sitemap.xml, atom.xml and rss.xml")
+    parser.add_argument("--listings", action="store_true", help="write paginated listings of directories without an index page, of every tag (docs/tags/) and of every month (docs/archive/)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, metavar="N", help=f"entries per listing page, default is {DEFAULT_PAGE_SIZE}")
+    parser.add_argument("--search", action="store_true", help="write a sharded client-side search index and its loader to docs/search/")
+    parser.add_argument("--pipeline", type=int, nargs="?", const=DEFAULT_IO_THREADS, metavar="THREADS", help=f"read sources ahead and write pages behind rendering on THREADS reader and writer threads each (default {DEFAULT_IO_THREADS}), and report the overlap")
+    parser.add_argument("--max-rss", type=int, metavar="MB", help="memory budget of the build process in MB, page rendering is throttled while over it")
+    parser.add_argument("--watch", action="store_true", help="serve docs with live reload and rebuild affected outputs on every change")
+    parser.add_argument("--daemon", action="store_true", help="build, then keep the site's state in memory and serve build requests from src/client.py on .build-cache/daemon.sock")
+    parser.add_argument("--port", type=int, default=8888, help="port for --watch to serve on, default is 8888")
+    parser.add_argument("--render-cache-size", type=int, default=256, metavar="MB", help="size cap of the cache of rendered page bodies in MB, 0 disables the cache, default is 256")
+    parser.add_argument("--check-links", action="store_true", help="report internal links and images whose target isn't in the built site")
+    parser.add_argument("--strict-links", action="store_true", help="like --check-links, but fail the build when a link is broken")
+    parser.add_argument("--what-rebuilds", metavar="PATH", action="append", help="print the outputs the last build's dependency graph says would be regenerated if PATH changed, without building (repeatable); give the build's --fingerprint and --optimize-images too")
+    parser.add_argument("--profile", action="store_true", help="print a per-stage timing breakdown and the slowest pages after the build")
+    parser.add_argument("--trace", metavar="FILE", help="write a Chrome trace of every build stage to FILE (implies --profile)")
+    args = parser.parse_args()
 
-    src_dir = path.dirname(__file__)
+    workers = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+
+    profiler = None
+    if args.profile or args.trace:
+        profiler = profiling.enable()
+        if workers > 1:
+            # Stages are only recorded in this process, worker processes would be invisible
+            print("Profiling renders pages in a single process, ignoring --jobs")
+            workers = 1
+
+    src_dir = path.dirname(path.abspath(__file__))
     root_dir = path.dirname(src_dir)
     static_path = path.join(root_dir, "static")
     docs_path = path.join(root_dir, "docs")
+    content_path = path.join(root_dir, "content")
+    template_path = path.join(src_dir, "template.html")
+    manifest_path = path.join(root_dir, ".build-cache", "manifest.json")
+    precompress_state = path.join(root_dir, ".build-cache", "precompress.json") if args.precompress else None
+    depgraph_path = path.join(root_dir, ".build-cache", "depgraph.json")
+    metadata_db = path.join(root_dir, ".build-cache", "metadata.sqlite")
+    search_state = path.join(root_dir, ".build-cache", "search.json") if args.search else None
+    image_state = path.join(root_dir, ".build-cache", "images.json") if args.optimize_images else None
+    minify_state = path.join(root_dir, ".build-cache", "minify.json") if args.minify else None
+    feeds_state = path.join(root_dir, ".build-cache", "feeds.json") if args.site_url else None
+    listings_state = path.join(root_dir, ".build-cache", "listings.json") if args.listings else None
+    max_rss = args.max_rss * 1024 * 1024 if args.max_rss else None
+    render_cache = RenderCache(path.join(root_dir, ".build-cache", "render"), args.render_cache_size * 1024 * 1024) if args.render_cache_size > 0 else None
 
-    if path.exists(docs_path):
-        print(f"Docs directory {docs_path} already exists, deleting it to keep copy clean.")
-        rmtree(docs_path)
-    copy_directory(static_path, docs_path)
+    if args.what_rebuilds:
+        graph = DependencyGraph.load(depgraph_path, docs_path)
+        if not graph.pages:
+            print("No dependency graph recorded yet, run a build first", file=sys.stderr)
+            sys.exit(1)
+        print(rebuild_report(graph, args.what_rebuilds, args.fingerprint, args.optimize_images))
+        return
 
+    # Keyword arguments of full_build and incremental_build besides the render cache and dependency graph
+    build_options = {
+        "link": args.link,
+        "precompress_state": precompress_state,
+        "search_state": search_state,
+        "fingerprint": args.fingerprint,
+        "image_state": image_state,
+        "image_widths": args.image_widths,
+        "minify_state": minify_state,
+        "max_rss": max_rss,
+        "site_url": args.site_url,
+        "feeds_state": feeds_state,
+        "metadata_db": metadata_db,
+        "listings_state": listings_state,
+        "page_size": args.page_size,
+        "io_threads": args.pipeline,
+    }
 
-    content_path = path.join(root_dir, "content")
-    template_path = path.join(src_dir, "template.html")
+    if args.daemon:
+        serve_daemon(static_path, content_path, template_path, docs_path, manifest_path, path.join(root_dir, ".build-cache", SOCKET_NAME), args.basepath, workers, render_cache, depgraph_path, build_options)
+        return
+
+    if args.watch:
+        watch(static_path, content_path, template_path, docs_path, manifest_path, args.basepath, workers, args.port, render_cache=render_cache, depgraph_path=depgraph_path, build_options=build_options)
+        return
+
+    try:
+        if args.incremental:
+            incremental_build(static_path, content_path, template_path, docs_path, manifest_path, args.basepath, workers, render_cache=render_cache, depgraph_path=depgraph_path, **build_options)
+        else:
+            compare = "hash" if args.hash_static else "mtime"
+            full_build(static_path, content_path, template_path, docs_path, args.basepath, workers, compare=compare, render_cache=render_cache, depgraph_path=depgraph_path, **build_options)
+        print(profiling.memory_report())
 
-    generate_pages_recursive(content_path, template_path, docs_path, basepath)
+        if args.check_links or args.strict_links:
+            broken = check_links(DependencyGraph.load(depgraph_path, docs_path), docs_path)
+            print(link_report(broken, root_dir), file=sys.stderr if broken else sys.stdout)
+            if broken and args.strict_links:
+                sys.exit(1)
+    except PageBuildError as error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if profiler is not None:
+            print(profiler.report())
+            if args.trace:
+                profiler.write_chrome_trace(args.trace)
+                print(f"Wrote Chrome trace to {args.trace}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
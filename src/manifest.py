@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 2
+
+'''
+    Hashes a file's contents in fixed-size chunks so large static assets are never fully loaded into memory
+    Args:
+        file_path (str): REQUIRED - Path to the file to hash
+    Returns:
+        str: Hex digest (sha256) of the file's contents
+'''
+def hash_file(file_path: str):
+    digest = hashlib.sha256()
+
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+'''
+    Walks a directory and returns the paths of every file inside it, relative to that directory
+    Args:
+        root (str): REQUIRED - Directory to walk
+    Returns:
+        list[str]: Sorted relative file paths, using "/" as the separator
+'''
+def list_files(root: str):
+    files = []
+
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in file_names:
+            rel_path = os.path.relpath(os.path.join(dir_path, file_name), root)
+            files.append(rel_path.replace(os.sep, "/"))
+
+    return sorted(files)
+
+'''
+    Writes text to a file unless it already holds exactly that text, replacing it atomically otherwise
+    Args:
+        file_path (str): REQUIRED - Path of the file
+        text (str): REQUIRED - Text the file should hold
+    Returns:
+        bool: Whether the file was written
+'''
+def write_if_changed(file_path: str, text: str):
+    try:
+        with open(file_path, "r") as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, file_path)
+    return True
+
+class BuildManifest:
+
+    '''
+    BuildManifest class, records the content hash of every input used by the last build so the next
+    incremental build can tell which outputs are out of date.
+    Args:
+        basepath (str): The basepath the pages were generated with. Defaults to "/".
+        templates (dict[str, str] | None): Template path -> hash, for every template a page was rendered with
+            and every partial those templates include
+        pages (dict[str, dict[str, str]] | None): Source MD path (relative to content dir) -> {"hash", "output", "template"}
+        static (dict[str, str] | None): Static file path (relative to static dir) -> hash
+        minify (bool): Whether pages and static HTML/CSS were minified. Defaults to False.
+    '''
+    def __init__(self, basepath: str = "/", templates: dict[str, str] | None = None, pages: dict[str, dict[str, str]] | None = None, static: dict[str, str] | None = None, minify: bool = False):
+        self.basepath = basepath
+        self.templates = templates if templates is not None else {}
+        self.pages = pages if pages is not None else {}
+        self.static = static if static is not None else {}
+        self.minify = minify
+
+    '''
+    Loads a manifest from disk. A missing, unreadable or outdated manifest yields an empty one,
+    which simply makes the next incremental build a full one.
+    '''
+    @classmethod
+    def load(cls, manifest_path: str):
+        try:
+            with open(manifest_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+
+        if data.get("version") != MANIFEST_VERSION:
+            return cls()
+
+        return cls(
+            basepath=data.get("basepath", "/"),
+            templates=data.get("templates", {}),
+            pages=data.get("pages", {}),
+            static=data.get("static", {}),
+            minify=data.get("minify", False),
+        )
+
+    '''
+    Writes the manifest to disk, replacing the old one atomically so an interrupted build
+    never leaves a half-written manifest behind
+    '''
+    def save(self, manifest_path: str):
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+
+        data = {
+            "version": MANIFEST_VERSION,
+            "basepath": self.basepath,
+            "templates": self.templates,
+            "pages": self.pages,
+            "static": self.static,
+            "minify": self.minify,
+        }
+
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+
+    def __repr__(self):
+        return f"BuildManifest(basepath={self.basepath}, pages={len(self.pages)}, static={len(self.static)})"
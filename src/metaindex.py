@@ -0,0 +1,270 @@
+from generatepage import PageRecord
+from frontmatter import page_date
+from typing import Iterable, NamedTuple
+import json
+import os
+import posixpath
+import sqlite3
+
+# Stored as the database's user_version, an index of another version is dropped and rebuilt
+METAINDEX_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    source TEXT PRIMARY KEY,
+    output TEXT NOT NULL,
+    directory TEXT,
+    title TEXT NOT NULL,
+    date TEXT NOT NULL,
+    description TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_by_date ON pages (date DESC, output);
+CREATE INDEX IF NOT EXISTS pages_by_directory ON pages (directory, date DESC, output);
+CREATE INDEX IF NOT EXISTS pages_by_output ON pages (output);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (tag, source)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_by_source ON tags (source);
+CREATE TABLE IF NOT EXISTS dirty (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (kind, name)
+) WITHOUT ROWID;
+"""
+
+# Kinds of groups of pages the dirty table tracks
+DIRECTORY_GROUP = "directory"
+TAG_GROUP = "tag"
+MONTH_GROUP = "month"
+
+'''
+    Returns the directory a page is listed in, the one above the page's URL: "blog" for both blog/post.html
+    and blog/post/index.html, "" for pages at the root. None for the root index.html itself.
+'''
+def page_directory(output: str):
+    if output == "index.html":
+        return None
+    if output.endswith("/index.html"):
+        output = output[:-len("/index.html")]
+    return posixpath.dirname(output)
+
+class IndexedPage(NamedTuple):
+    '''
+        A page's row in the MetadataIndex
+        Args:
+            source (str): Source MD path
+            output (str): Output path relative to the docs directory
+            directory (str | None): Directory the page is listed in, see page_directory
+            title (str): Page title, from front matter or the page's h1
+            date (str): Page date in ISO format, see page_date
+            description (str): Front matter description, "" when it has none
+            tags (list[str]): Front matter tags, sorted
+            metadata (dict[str, str | list[str]]): The whole front matter
+    '''
+    source: str
+    output: str
+    directory: str | None
+    title: str
+    date: str
+    description: str
+    tags: list[str]
+    metadata: dict[str, str | list[str]]
+
+class MetadataIndex:
+
+    '''
+    MetadataIndex class, an SQLite database of every page's title, date, description, tags and front matter.
+    Builds update the rows of the pages they render and drop those of removed pages, so site-wide listings
+    (newest pages, pages by tag or month) are indexed queries rather than a read of every markdown file.
+    Changes are written in one transaction, committed by commit. The directories, tags and months a changed,
+    added or removed row was (or now is) in are marked dirty, so listings of them can be rebuilt from the index
+    alone, and only those, until clear_dirty.
+    Args:
+        db_path (str): REQUIRED - Database file, created (with its directory) when missing
+    '''
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != METAINDEX_VERSION:
+            self.connection.executescript("DROP TABLE IF EXISTS pages; DROP TABLE IF EXISTS tags; DROP TABLE IF EXISTS dirty;")
+            self.connection.execute(f"PRAGMA user_version = {METAINDEX_VERSION}")
+        self.connection.executescript(SCHEMA)
+
+    '''
+    Adds or replaces the row of a rendered page, a row that didn't change is left as it is
+    Args:
+        record (PageRecord): REQUIRED - Record of the rendered page, see render_page
+        docs_path (str): REQUIRED - Path to the output directory, output paths are stored relative to it
+    '''
+    def add_page(self, record: PageRecord, docs_path: str):
+        metadata = record.metadata or {}
+        tags = sorted({str(tag) for tag in metadata.get("tags", [])})
+        output = os.path.relpath(record.output, docs_path).replace(os.sep, "/")
+        row = (
+            record.source,
+            output,
+            page_directory(output),
+            record.title,
+            page_date(metadata, record.modified),
+            str(metadata.get("description", "")),
+            json.dumps(metadata, sort_keys=True, ensure_ascii=False),
+        )
+        old = self.page(record.source)
+        new = IndexedPage(*row[:6], tags, json.loads(row[6]))
+        if old == new:
+            return
+
+        self.mark_dirty(old)
+        self.mark_dirty(new)
+        self.connection.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+        self.connection.execute("DELETE FROM tags WHERE source = ?", (record.source,))
+        self.connection.executemany("INSERT INTO tags VALUES (?, ?)", [(tag, record.source) for tag in tags])
+
+    '''
+    Drops the rows of every page not in sources
+    Args:
+        sources (Iterable[str]): REQUIRED - Source MD paths of every page of the site
+    Returns:
+        int: Number of pages dropped
+    '''
+    def retain(self, sources: Iterable[str]):
+        stale = self.sources() - set(sources)
+        for source in stale:
+            self.mark_dirty(self.page(source))
+        self.connection.executemany("DELETE FROM pages WHERE source = ?", [(source,) for source in stale])
+        self.connection.executemany("DELETE FROM tags WHERE source = ?", [(source,) for source in stale])
+        return len(stale)
+
+    '''
+    Marks the directory, tags and month of a page dirty, does nothing for None
+    '''
+    def mark_dirty(self, page: IndexedPage | None):
+        if page is None:
+            return
+
+        groups = [(TAG_GROUP, tag) for tag in page.tags] + [(MONTH_GROUP, page.date[:7])]
+        if page.directory is not None:
+            groups.append((DIRECTORY_GROUP, page.directory))
+        # An index page decides whether its own directory gets a listing
+        if page.output == "index.html" or page.output.endswith("/index.html"):
+            groups.append((DIRECTORY_GROUP, page.output[:-len("index.html")].rstrip("/")))
+        self.connection.executemany("INSERT OR IGNORE INTO dirty VALUES (?, ?)", groups)
+
+    '''
+    Returns the (kind, name) of every group marked dirty since the last clear_dirty
+    '''
+    def dirty_groups(self):
+        return self.connection.execute("SELECT kind, name FROM dirty ORDER BY kind, name").fetchall()
+
+    '''
+    Forgets the dirty groups, once their listings are written
+    '''
+    def clear_dirty(self):
+        self.connection.execute("DELETE FROM dirty")
+
+    '''
+    Returns the indexed page of a source MD path, None when it isn't indexed
+    '''
+    def page(self, source: str):
+        pages = self._select("WHERE source = ?", [source])
+        return pages[0] if pages else None
+
+    '''
+    Returns True when a page is rendered to output (relative to the docs directory)
+    '''
+    def has_output(self, output: str):
+        return self.connection.execute("SELECT 1 FROM pages WHERE output = ?", (output,)).fetchone() is not None
+
+    '''
+    Returns the source MD paths of every indexed page
+    '''
+    def sources(self):
+        return {source for source, in self.connection.execute("SELECT source FROM pages")}
+
+    '''
+    Returns indexed pages, newest first (ties by output path)
+    Args:
+        tag (str | None): OPTIONAL - Only pages with this tag. Defaults to None.
+        month (str | None): OPTIONAL - Only pages dated in this month, "YYYY-MM". Defaults to None.
+        directory (str | None): OPTIONAL - Only pages listed in this directory, see page_directory. Defaults to None.
+        limit (int | None): OPTIONAL - Most pages returned. Defaults to None, every page.
+        offset (int): OPTIONAL - Pages skipped first, for pagination. Default is 0.
+    Returns:
+        list[IndexedPage]
+    '''
+    def pages(self, tag: str | None = None, month: str | None = None, directory: str | None = None, limit: int | None = None, offset: int = 0):
+        conditions, parameters = [], []
+        if tag is not None:
+            conditions.append("source IN (SELECT source FROM tags WHERE tag = ?)")
+            parameters.append(tag)
+        if month is not None:
+            conditions.append("date LIKE ?")
+            parameters.append(month + "-%")
+        if directory is not None:
+            conditions.append("directory = ?")
+            parameters.append(directory)
+        query = " WHERE " + " AND ".join(conditions) if conditions else ""
+        query += " ORDER BY date DESC, output LIMIT ? OFFSET ?"
+        parameters.extend((limit if limit is not None else -1, offset))
+        return self._select(query, parameters)
+
+    '''
+    Runs a query for rows of the pages table, query holds what follows FROM pages
+    '''
+    def _select(self, query: str, parameters: list):
+        pages = []
+        rows = self.connection.execute(f"SELECT source, output, directory, title, date, description, metadata FROM pages {query}", parameters)
+        for source, output, directory, title, day, description, metadata in rows:
+            metadata = json.loads(metadata)
+            pages.append(IndexedPage(source, output, directory, title, day, description, sorted({str(tag) for tag in metadata.get("tags", [])}), metadata))
+        return pages
+
+    '''
+    Returns the number of pages matching the filters of pages
+    '''
+    def count(self, tag: str | None = None, month: str | None = None):
+        if tag is not None and month is not None:
+            return self.connection.execute("SELECT COUNT(*) FROM pages JOIN tags USING (source) WHERE tag = ? AND date LIKE ?", (tag, month + "-%")).fetchone()[0]
+        if tag is not None:
+            return self.connection.execute("SELECT COUNT(*) FROM tags WHERE tag = ?", (tag,)).fetchone()[0]
+        if month is not None:
+            return self.connection.execute("SELECT COUNT(*) FROM pages WHERE date LIKE ?", (month + "-%",)).fetchone()[0]
+        return self.connection.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    '''
+    Returns every directory pages are listed in, see page_directory
+    '''
+    def directories(self):
+        return [directory for directory, in self.connection.execute("SELECT DISTINCT directory FROM pages WHERE directory IS NOT NULL ORDER BY directory")]
+
+    '''
+    Returns (tag, number of pages) for every tag, alphabetically
+    '''
+    def tags(self):
+        return self.connection.execute("SELECT tag, COUNT(*) FROM tags GROUP BY tag ORDER BY tag").fetchall()
+
+    '''
+    Returns (month "YYYY-MM", number of pages) for every month with pages, newest first
+    '''
+    def months(self):
+        return self.connection.execute("SELECT substr(date, 1, 7) AS month, COUNT(*) FROM pages GROUP BY month ORDER BY month DESC").fetchall()
+
+    '''
+    Writes the changes made since the last commit to disk
+    '''
+    def commit(self):
+        self.connection.commit()
+
+    '''
+    Closes the database, uncommitted changes are discarded
+    '''
+    def close(self):
+        self.connection.close()
+
+    def __repr__(self):
+        return f"MetadataIndex(db_path={self.db_path})"
@@ -0,0 +1,214 @@
+from os import path
+from manifest import hash_file, list_files
+import hashlib
+import json
+import os
+import re
+
+# Bump whenever the minifiers' output changes, cached results of older versions are ignored
+MINIFY_VERSION = 1
+
+# Elements whose content is kept byte for byte, whitespace inside them is significant
+PRESERVED_TAG_PATTERN = re.compile(r"<(pre|code|textarea|script|style)\b", re.I)
+# Comments, except IE conditional comments
+HTML_COMMENT_PATTERN = re.compile(r"<!--(?!\[if).*?-->", re.S)
+
+CSS_STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+# Comments, except /*! ... */ ones that are kept on purpose (licenses)
+CSS_COMMENT_PATTERN = re.compile(rf"({CSS_STRING})|/\*(?!!).*?\*/", re.S)
+# Whitespace around punctuation that never needs it, after colons, and any other run of whitespace.
+# Spaces before colons stay, "a :hover" and "a:hover" are different selectors.
+CSS_SPACE_PATTERN = re.compile(rf"({CSS_STRING})|\s*([{{}};,>])\s*|(:)\s+|\s+")
+CSS_LAST_SEMICOLON_PATTERN = re.compile(rf"({CSS_STRING})|;+(?=\}})")
+
+'''
+    Collapses every run of whitespace in a piece of HTML to a single space, keeping a space at either end
+'''
+def _collapse_whitespace(html: str):
+    if "<!--" in html:
+        html = HTML_COMMENT_PATTERN.sub("", html)
+
+    collapsed = " ".join(html.split())
+    if html[:1].isspace():
+        collapsed = " " + collapsed
+    if html[-1:].isspace() and collapsed != " ":
+        collapsed += " "
+    return collapsed
+
+'''
+    Minifies HTML: removes comments and collapses runs of whitespace to a single space, which renders the same.
+    The content of <pre>, <code>, <textarea>, <script> and <style> elements is left untouched.
+    Args:
+        html (str): REQUIRED - HTML document or fragment
+    Returns:
+        str: Minified HTML
+'''
+def minify_html(html: str):
+    # Lowercased once for finding closing tags, offsets are the same as in html
+    lowered = None
+    chunks = []
+    position = 0
+
+    while True:
+        match = PRESERVED_TAG_PATTERN.search(html, position)
+        if match is None:
+            chunks.append(_collapse_whitespace(html[position:]))
+            break
+
+        chunks.append(_collapse_whitespace(html[position:match.start()]))
+        if lowered is None:
+            lowered = html.lower()
+        close = lowered.find(f"</{match.group(1).lower()}", match.end())
+        end = lowered.find(">", close) + 1 if close != -1 else len(html)
+        # An unclosed element keeps everything after it
+        chunks.append(html[match.start():end or len(html)])
+        position = end or len(html)
+
+    return "".join(chunks).strip()
+
+'''
+    Minifies CSS: removes comments (but /*! ones), the whitespace around braces, semicolons, commas, child
+    combinators and after colons, and the last semicolon of every block. Strings are left untouched.
+    Args:
+        css (str): REQUIRED - Stylesheet
+    Returns:
+        str: Minified stylesheet
+'''
+def minify_css(css: str):
+    css = CSS_COMMENT_PATTERN.sub(lambda match: match.group(1) or "", css)
+    css = CSS_SPACE_PATTERN.sub(lambda match: match.group(1) or match.group(2) or match.group(3) or " ", css)
+    css = CSS_LAST_SEMICOLON_PATTERN.sub(lambda match: match.group(1) or "", css)
+    return css.strip()
+
+# Minifier for every extension the stage handles
+MINIFIERS = {".html": minify_html, ".css": minify_css}
+
+'''
+    Returns True for files the minification stage rewrites
+'''
+def is_minifiable(file_path: str):
+    return path.splitext(file_path)[1].lower() in MINIFIERS
+
+class MinifyReport:
+
+    '''
+    MinifyReport class, adds up the bytes minification saved per file type
+    Args:
+        totals (dict[str, list[int]] | None): Extension -> [files, bytes before, bytes after]
+    '''
+    def __init__(self, totals: dict[str, list[int]] | None = None):
+        self.totals = totals if totals is not None else {}
+
+    '''
+    Records one minified file
+    Args:
+        extension (str): REQUIRED - File type, e.g. ".css"
+        before (int): REQUIRED - Size in bytes before minification
+        after (int): REQUIRED - Size in bytes after minification
+    '''
+    def add(self, extension: str, before: int, after: int):
+        total = self.totals.setdefault(extension, [0, 0, 0])
+        total[0] += 1
+        total[1] += before
+        total[2] += after
+
+    '''
+    Returns one line per file type with the bytes before and after and the percentage saved
+    '''
+    def report(self):
+        if not self.totals:
+            return "Minified: nothing to minify"
+
+        lines = ["Minified:"]
+        for extension, (files, before, after) in sorted(self.totals.items()):
+            saved = 100 * (before - after) / before if before else 0
+            lines.append(f"  {extension:<6} {files:>6} file(s) {before:>12,} -> {after:>12,} bytes ({saved:.1f}% saved)")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"MinifyReport(totals={self.totals})"
+
+'''
+    Loads the state of the last run of minify_static, an empty one when missing or unreadable
+'''
+def load_minify_state(state_path: str):
+    try:
+        with open(state_path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"version": MINIFY_VERSION, "static": {}}
+
+    if state.get("version") != MINIFY_VERSION:
+        return {"version": MINIFY_VERSION, "static": {}}
+    return state
+
+'''
+    Writes minified copies of the static HTML and CSS files to the same paths in docs. Minified files are cached
+    by source hash in cache_dir, and files whose minified copy from the last run is still in place (same size and
+    hash, not overwritten by a build without minification) are skipped.
+    Args:
+        static_path (str): REQUIRED - Path to the static assets directory
+        docs_path (str): REQUIRED - Path to the output directory
+        state_path (str): REQUIRED - JSON file recording, per file, the cache key of the last run
+        cache_dir (str): REQUIRED - Directory holding minified files by cache key
+        report (MinifyReport): REQUIRED - Filled with the savings of every file minified or taken from the cache
+        hashes (dict[str, str] | None): OPTIONAL - Already known hashes by path relative to static. Defaults to None.
+    Returns:
+        tuple[list[str], int]: (paths relative to static of every minified file, number of files left in place)
+'''
+def minify_static(static_path: str, docs_path: str, state_path: str, cache_dir: str, report: MinifyReport, hashes: dict[str, str] | None = None):
+    previous = load_minify_state(state_path)["static"]
+    hashes = hashes if hashes is not None else {}
+    state, minified, skipped = {}, [], 0
+
+    for rel_path in list_files(static_path):
+        if not is_minifiable(rel_path):
+            continue
+        minified.append(rel_path)
+
+        source = path.join(static_path, rel_path)
+        key = hashlib.sha256(f"{MINIFY_VERSION}\n{hashes.get(rel_path) or hash_file(source)}".encode()).hexdigest()
+        dest = path.join(docs_path, rel_path)
+        entry = previous.get(rel_path)
+        if entry is not None and entry["key"] == key and _is_output(dest, entry):
+            state[rel_path] = entry
+            skipped += 1
+            continue
+
+        cache_path = path.join(cache_dir, key[:2], key)
+        try:
+            with open(cache_path, "rb") as f:
+                output = f.read()
+        except OSError:
+            with open(source, "r") as f:
+                output = MINIFIERS[path.splitext(rel_path)[1].lower()](f.read()).encode()
+            _write_atomic(cache_path, output)
+
+        _write_atomic(dest, output)
+        before = os.stat(source).st_size
+        report.add(path.splitext(rel_path)[1].lower(), before, len(output))
+        state[rel_path] = {"key": key, "before": before, "after": len(output), "output": hashlib.sha256(output).hexdigest()}
+
+    _write_atomic(state_path, json.dumps({"version": MINIFY_VERSION, "static": state}, indent=1, sort_keys=True).encode())
+    return minified, skipped
+
+'''
+    Returns True when the file at dest is still the minified output recorded in a state entry
+'''
+def _is_output(dest: str, entry: dict):
+    try:
+        if os.stat(dest).st_size != entry["after"]:
+            return False
+    except OSError:
+        return False
+    return hash_file(dest) == entry.get("output")
+
+'''
+    Writes bytes to a file through a temporary file, creating its directory if needed
+'''
+def _write_atomic(file_path: str, data: bytes):
+    os.makedirs(path.dirname(file_path), exist_ok=True)
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
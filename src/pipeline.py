@@ -0,0 +1,212 @@
+from generatepage import CHUNKS_PER_WORKER, MAX_CHUNK_PAGES, BudgetCollector, PageRecord, PendingPage, read_source, render_source, write_page
+from rendercache import RenderCache
+from assets import AssetManifest
+from images import ImageInfo
+from profiling import stage
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable
+import os
+import time
+
+# Reader and writer threads each, I/O bound so more of them than cores pays off on slow filesystems
+DEFAULT_IO_THREADS = 4
+# Most sources read ahead of the renderer, and most rendered pages waiting to be written, per I/O thread
+QUEUE_PAGES_PER_THREAD = 8
+
+STAGES = ("read", "render", "write")
+
+class PipelineReport:
+
+    '''
+    PipelineReport class, adds up the time each stage of generate_pipelined spent working and the time the
+    renderer spent waiting on the other two. Stages working for longer in total than the build took is the
+    overlap the pipeline achieved: 1.00x is a serial build, 3.00x all three stages busy the whole time (more
+    with several render workers).
+    Args:
+        busy (dict[str, float] | None): Stage -> seconds spent reading, rendering or writing
+        waited (dict[str, float] | None): Stage -> seconds the renderer waited on reads or writes
+    '''
+    def __init__(self, busy: dict[str, float] | None = None, waited: dict[str, float] | None = None):
+        self.busy = busy if busy is not None else dict.fromkeys(STAGES, 0.0)
+        self.waited = waited if waited is not None else dict.fromkeys(STAGES, 0.0)
+        self.pages = 0
+        self.wall = 0.0
+
+    '''
+    Returns the summed stage time over the wall time, 0 before anything ran
+    '''
+    def overlap(self):
+        return sum(self.busy.values()) / self.wall if self.wall else 0.0
+
+    '''
+    Returns a one line summary of the stage times, the overlap and the renderer's stalls
+    '''
+    def report(self):
+        busy = ", ".join(f"{name} {self.busy[name]:.2f}s" for name in STAGES)
+        return (
+            f"Pipeline: {self.pages} page(s) in {self.wall:.2f}s, busy {busy} ({self.overlap():.2f}x overlap), "
+            f"renderer waited {self.waited['read']:.2f}s on reads and {self.waited['write']:.2f}s on writes"
+        )
+
+    def __repr__(self):
+        return f"PipelineReport(pages={self.pages}, wall={self.wall}, busy={self.busy}, waited={self.waited})"
+
+'''
+    Calls function, returns (result, None, seconds) or (None, error, seconds) instead of raising
+'''
+def _timed(function: Callable, *args):
+    start = time.perf_counter()
+    try:
+        return function(*args), None, time.perf_counter() - start
+    except Exception as error:
+        return None, error, time.perf_counter() - start
+
+'''
+    Writer thread task: writes a page once its directory, created by an earlier task, exists
+'''
+def _write_in(directory: Future, dest_path: str, html: str | PendingPage):
+    directory.result()
+    write_page(dest_path, html, make_dirs=False)
+
+'''
+    Worker entry point rendering a chunk of already read pages, returns (result, error, seconds) per page
+'''
+def _render_sources_task(tasks: list[tuple]):
+    results = []
+    for from_path, markdown, modified, error, template_path, dest_path, basepath, render_cache, index_terms, assets, images, minify in tasks:
+        if error is not None:
+            results.append((None, error, 0.0))
+            continue
+        results.append(_timed(_render_source_html, from_path, markdown, modified, template_path, dest_path, basepath, render_cache, index_terms, assets, images, minify))
+    return results
+
+'''
+    render_source for worker processes: pages go back to the parent as strings, far smaller to pickle than their trees
+'''
+def _render_source_html(from_path: str, markdown: str, modified: float, template_path: str, dest_path: str, basepath: str, render_cache: RenderCache | None, index_terms: bool, assets: AssetManifest | None, images: dict[str, ImageInfo] | None, minify: bool):
+    record, html = render_source(from_path, markdown, modified, template_path, dest_path, basepath, None, render_cache, index_terms, assets, images, minify)
+    return record, html.render() if isinstance(html, PendingPage) else html
+
+'''
+    Generates a list of pages like generate_pages, but as a pipeline of three stages running at the same time:
+    reader threads prefetch the markdown of the next pages, the renderer (this process, or worker processes)
+    turns them into HTML, and writer threads write the pages out. Every output directory is created once, up
+    front, by the writers. Bounded queues between the stages cap the sources and pages held in memory, and the
+    renderer only waits on I/O when a queue is empty or full, which is what report measures.
+    Args:
+        pages (list[tuple[str, str, str]]): REQUIRED - (source MD path, destination HTML path, template path) triples, see find_pages
+        The arguments up to max_rss are those of generate_pages.
+        io_threads (int): OPTIONAL - Reader threads, and as many writer threads, default is DEFAULT_IO_THREADS
+        report (PipelineReport | None): OPTIONAL - Filled with the stages' times. Defaults to None.
+    Returns:
+        list[tuple[str, Exception]]: (source MD path, error) for every page that failed, in page order
+'''
+def generate_pipelined(pages: list[tuple[str, str, str]], basepath: str = "/", workers: int = 1, render_cache: RenderCache | None = None, index_terms: bool = False, assets: AssetManifest | None = None, images: dict[str, ImageInfo] | None = None, minify: bool = False, on_record: Callable[[PageRecord], None] | None = None, max_rss: int | None = None, io_threads: int = DEFAULT_IO_THREADS, report: PipelineReport | None = None):
+    report = report if report is not None else PipelineReport()
+    started = time.perf_counter()
+    errors = []
+    collector = BudgetCollector(max_rss) if max_rss is not None else None
+    queue_size = max(1, io_threads) * QUEUE_PAGES_PER_THREAD
+    parallel = workers > 1 and len(pages) > 1
+    chunksize = max(1, min(len(pages) // (workers * 4), MAX_CHUNK_PAGES)) if parallel else 1
+
+    upcoming = iter(enumerate(pages))
+    # (position, page, read future), (chunk, render future) and (position, source, record, write future), in page order
+    reads, renders, writes = deque(), deque(), deque()
+
+    def limit(size: int):
+        # Over the memory budget the stages go one page at a time
+        if collector is not None and collector.check():
+            return 1
+        return size
+
+    with (ProcessPoolExecutor(max_workers=workers) if parallel else nullcontext()) as executor:
+        if parallel:
+            # Forks every worker now, before any reader or writer thread runs: a process forked while other threads
+            # run can start out holding a lock no thread will ever release
+            executor.submit(int).result()
+
+        with ThreadPoolExecutor(max(1, io_threads)) as readers, ThreadPoolExecutor(max(1, io_threads)) as writers:
+            directories = {directory: writers.submit(os.makedirs, directory, exist_ok=True) for directory in sorted({os.path.dirname(dest_path) for _, dest_path, _ in pages})}
+
+            def read_ahead():
+                while len(reads) < limit(queue_size):
+                    upcoming_page = next(upcoming, None)
+                    if upcoming_page is None:
+                        return
+                    position, page = upcoming_page
+                    reads.append((position, page, readers.submit(_timed, read_source, page[0])))
+
+            def take_read():
+                position, page, future = reads.popleft()
+                waited = time.perf_counter()
+                source, error, seconds = future.result()
+                report.waited["read"] += time.perf_counter() - waited
+                report.busy["read"] += seconds
+                read_ahead()
+                return position, page, source, error
+
+            def finish_write():
+                position, from_path, record, future = writes.popleft()
+                waited = time.perf_counter()
+                _, error, seconds = future.result()
+                report.waited["write"] += time.perf_counter() - waited
+                report.busy["write"] += seconds
+                if error is not None:
+                    errors.append((position, from_path, error))
+                    return
+                if on_record is not None:
+                    on_record(record)
+
+            def rendered(position: int, page: tuple[str, str, str], result: tuple[PageRecord, str | PendingPage] | None, error: Exception | None):
+                from_path, dest_path, template_path = page
+                print(f"Generating page from {from_path} to {dest_path} using template {template_path}")
+                report.pages += 1
+                if error is not None:
+                    errors.append((position, from_path, error))
+                    return
+
+                record, html = result
+                while len(writes) >= limit(queue_size):
+                    finish_write()
+                writes.append((position, from_path, record, writers.submit(_timed, _write_in, directories[os.path.dirname(dest_path)], dest_path, html)))
+
+            def finish_render():
+                chunk, future = renders.popleft()
+                for (position, page), (result, error, seconds) in zip(chunk, future.result()):
+                    report.busy["render"] += seconds
+                    rendered(position, page, result, error)
+
+            read_ahead()
+            chunk, tasks = [], []
+            while reads:
+                position, page, source, error = take_read()
+                from_path, dest_path, template_path = page
+                markdown, modified = source if source is not None else (None, None)
+
+                if not parallel:
+                    result, seconds = None, 0.0
+                    if error is None:
+                        with stage("page", page=from_path):
+                            result, error, seconds = _timed(render_source, from_path, markdown, modified, template_path, dest_path, basepath, None, render_cache, index_terms, assets, images, minify)
+                    report.busy["render"] += seconds
+                    rendered(position, page, result, error)
+                    continue
+
+                chunk.append((position, page))
+                tasks.append((from_path, markdown, modified, error, template_path, dest_path, basepath, render_cache, index_terms, assets, images, minify))
+                if len(chunk) == chunksize or not reads:
+                    renders.append((chunk, executor.submit(_render_sources_task, tasks)))
+                    chunk, tasks = [], []
+                    while len(renders) >= limit(workers * CHUNKS_PER_WORKER):
+                        finish_render()
+
+            while renders:
+                finish_render()
+            while writes:
+                finish_write()
+
+    report.wall += time.perf_counter() - started
+    return [(from_path, error) for _, from_path, error in sorted(errors, key=lambda error: error[0])]
@@ -0,0 +1,185 @@
+from contextlib import nullcontext
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, memory is then not reported
+    resource = None
+
+# Shared no-op span handed out while profiling is disabled, so instrumented code pays almost nothing
+_DISABLED_SPAN = nullcontext()
+
+# The active Profiler, None unless enable() was called
+_profiler = None
+
+# Peak resident set size of child processes when this module was imported, see peak_rss
+_CHILDREN_BASELINE = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss if resource is not None else 0
+
+class Profiler:
+
+    '''
+    Profiler class, records the wall time and allocation count of every instrumented stage of a build.
+    Allocations are measured as the change in the interpreter's allocated memory blocks
+    (sys.getallocatedblocks) across the stage.
+    '''
+    def __init__(self):
+        self.origin = time.perf_counter()
+        # (stage name, page or None, start seconds since origin, duration seconds, allocated blocks)
+        self.events = []
+        self.page = None
+
+    def stage(self, name: str, page: str | None = None):
+        return _Span(self, name, page)
+
+    '''
+    Returns (stage name, calls, total seconds, allocated blocks) for every stage, slowest first
+    '''
+    def stage_totals(self):
+        totals = {}
+        for name, _, _, duration, allocations in self.events:
+            calls, seconds, blocks = totals.get(name, (0, 0.0, 0))
+            totals[name] = (calls + 1, seconds + duration, blocks + allocations)
+
+        return sorted(((name, *values) for name, values in totals.items()), key=lambda row: row[2], reverse=True)
+
+    '''
+    Returns (page, seconds, allocated blocks) for the count slowest pages
+    '''
+    def slowest_pages(self, count: int = 10):
+        pages = [(page, duration, allocations) for name, page, _, duration, allocations in self.events if name == "page"]
+        return sorted(pages, key=lambda row: row[1], reverse=True)[:count]
+
+    '''
+    Returns the end of build summary: a per-stage breakdown followed by the slowest pages
+    '''
+    def report(self, count: int = 10):
+        lines = ["Stage breakdown:", f"  {'stage':<22}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'alloc blocks':>14}"]
+        for name, calls, seconds, blocks in self.stage_totals():
+            lines.append(f"  {name:<22}{calls:>8}{seconds * 1000:>12.2f}{seconds * 1000 / calls:>10.3f}{blocks:>14}")
+
+        lines.append(f"Slowest {count} page(s):")
+        for page, seconds, blocks in self.slowest_pages(count):
+            lines.append(f"  {seconds * 1000:>10.2f} ms {blocks:>10} blocks  {page}")
+
+        return "\n".join(lines)
+
+    '''
+    Writes the recorded stages as a Chrome trace (chrome://tracing or ui.perfetto.dev)
+    Args:
+        trace_path (str): REQUIRED - File to write the JSON trace to
+    '''
+    def write_chrome_trace(self, trace_path: str):
+        pid = os.getpid()
+        trace_events = []
+
+        for name, page, start, duration, allocations in self.events:
+            args = {"allocated_blocks": allocations}
+            if page is not None:
+                args["page"] = page
+            trace_events.append({
+                "name": name,
+                "cat": "build",
+                "ph": "X",
+                "ts": round(start * 1_000_000, 3),
+                "dur": round(duration * 1_000_000, 3),
+                "pid": pid,
+                "tid": 0,
+                "args": args,
+            })
+
+        with open(trace_path, "w") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+class _Span:
+    '''
+        Context manager timing one stage, nested stages are attributed to the page being rendered
+    '''
+    __slots__ = ("profiler", "name", "page", "start", "blocks", "outer_page")
+
+    def __init__(self, profiler: Profiler, name: str, page: str | None):
+        self.profiler = profiler
+        self.name = name
+        self.page = page
+
+    def __enter__(self):
+        self.outer_page = self.profiler.page
+        if self.page is not None:
+            self.profiler.page = self.page
+        self.blocks = sys.getallocatedblocks()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        profiler = self.profiler
+        profiler.events.append((self.name, profiler.page, self.start - profiler.origin, end - self.start, sys.getallocatedblocks() - self.blocks))
+        profiler.page = self.outer_page
+        return False
+
+'''
+    Starts recording stages for the rest of the process
+    Returns:
+        Profiler: The new active profiler
+'''
+def enable():
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+'''
+    Stops recording stages
+'''
+def disable():
+    global _profiler
+    _profiler = None
+
+'''
+    Returns a context manager timing one build stage, a shared no-op while profiling is disabled
+    Args:
+        name (str): REQUIRED - Stage name
+        page (str | None): OPTIONAL - Page the stage belongs to, nested stages inherit it. Defaults to None.
+'''
+def stage(name: str, page: str | None = None):
+    if _profiler is None:
+        return _DISABLED_SPAN
+    return _profiler.stage(name, page)
+
+'''
+    Returns the resident set size of this process in bytes. Read from /proc on Linux, elsewhere the peak
+    so far is the closest available figure. None when neither is available.
+'''
+def current_rss():
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return peak_rss()[0]
+
+'''
+    Returns the peak resident set size in bytes of this process and of the largest of its finished child
+    processes (e.g. page workers), None for children when there were none and (None, None) where it can't be measured
+'''
+def peak_rss():
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes, except on macOS where it's in bytes
+    unit = 1 if sys.platform == "darwin" else 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # The figure survives exec, children of whatever ran before this process aren't ours
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit, children * unit if children > _CHILDREN_BASELINE else None
+
+'''
+    Returns the peak memory line of the build summary
+'''
+def memory_report():
+    own, children = peak_rss()
+    if own is None:
+        return "Peak memory: not available on this platform"
+    line = f"Peak memory: {own / (1024 * 1024):.1f} MB"
+    if children:
+        line += f", {children / (1024 * 1024):.1f} MB in the largest child process (page workers)"
+    return line
@@ -0,0 +1,141 @@
+from assets import AssetManifest
+from block_split import PARSER_VERSION
+from typing import NamedTuple
+import hashlib
+import json
+import os
+import re
+
+# Stands in for the basepath in cached HTML, so one cached render serves every basepath.
+# Passed to prefix_basepath like a basepath, root links become URL_MARKER + path without the leading "/".
+URL_MARKER = "\x00basepath\x00/"
+# A marked root link up to the end of its attribute value, or of its candidate in a srcset
+MARKED_URL_PATTERN = re.compile(re.escape(URL_MARKER) + r'([^"\s]*)')
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Bump whenever the format of cache entries changes, part of every key like PARSER_VERSION
+CACHE_FORMAT = 3
+
+class CachedRender(NamedTuple):
+    '''
+        A page body rendered by an earlier build
+        Args:
+            title (str | None): Title extracted from the page's markdown, None when it has no h1
+            html (str): Body HTML, root links start with URL_MARKER instead of the basepath
+            links (list[tuple[str, int]]): (URL, line number) of every link and image in the body, see PageRecord
+            terms (dict[str, int] | None): Search terms of the body, None if they weren't collected
+    '''
+    title: str | None
+    html: str
+    links: list[tuple[str, int]]
+    terms: dict[str, int] | None = None
+
+    '''
+    Returns the body HTML with its root links pointing under basepath, and at the fingerprinted copies of
+    assets when given an AssetManifest. Only the marked href/src values are touched.
+    '''
+    def html_for(self, basepath: str, assets: AssetManifest | None = None):
+        if assets is None:
+            return self.html.replace(URL_MARKER, basepath)
+        return MARKED_URL_PATTERN.sub(lambda match: basepath + assets.url_for("/" + match.group(1))[1:], self.html)
+
+class RenderCache:
+
+    '''
+    RenderCache class, an on-disk cache of rendered page bodies keyed by a hash of the markdown source
+    and PARSER_VERSION. Pages whose markdown didn't change skip parsing entirely, so template-only or
+    basepath-only rebuilds just re-run the template step. Every entry is its own file, using an entry
+    touches its mtime and prune evicts the least recently used entries once the cache is over its size cap.
+    Safe to share between worker processes, entries are written atomically.
+    Args:
+        cache_dir (str): REQUIRED - Directory holding the cache entries
+        max_bytes (int): OPTIONAL - Size cap enforced by prune. Defaults to DEFAULT_MAX_BYTES (256MB).
+        salt (str): OPTIONAL - Mixed into every key, for renders that depend on more than the markdown. Defaults to "".
+    '''
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES, salt: str = ""):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.salt = salt
+
+    '''
+    Returns a cache sharing this one's directory whose keys are mixed with salt, e.g. a digest of the images pages embed
+    '''
+    def salted(self, salt: str):
+        return RenderCache(self.cache_dir, self.max_bytes, salt)
+
+    '''
+    Returns the cache key of a markdown document
+    '''
+    def key(self, markdown: str):
+        prefix = f"{PARSER_VERSION}.{CACHE_FORMAT}\n{self.salt}\n" if self.salt else f"{PARSER_VERSION}.{CACHE_FORMAT}\n"
+        return hashlib.sha256(f"{prefix}{markdown}".encode()).hexdigest()
+
+    def entry_path(self, key: str):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    '''
+    Returns the CachedRender of a markdown document, or None if it isn't cached (or the entry is unreadable)
+    '''
+    def get(self, markdown: str):
+        entry_path = self.entry_path(self.key(markdown))
+        try:
+            with open(entry_path, "r") as f:
+                data = json.load(f)
+            # Marks the entry as recently used for prune
+            os.utime(entry_path)
+            return CachedRender(data["title"], data["html"], [(url, line) for url, line in data["links"]], data["terms"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    '''
+    Stores the rendered body of a markdown document
+    Args:
+        markdown (str): REQUIRED - Markdown source the page was rendered from
+        render (CachedRender): REQUIRED - Title, body HTML with root links marked with URL_MARKER, links and terms
+    Returns:
+        None
+    '''
+    def put(self, markdown: str, render: CachedRender):
+        entry_path = self.entry_path(self.key(markdown))
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+
+        # Unique per process, workers may render identical pages at the same time
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"title": render.title, "html": render.html, "links": render.links, "terms": render.terms}, f)
+        os.replace(tmp_path, entry_path)
+
+    '''
+    Evicts least recently used entries until the cache fits under max_bytes
+    Returns:
+        int: Number of entries removed
+    '''
+    def prune(self):
+        entries = []
+        total = 0
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                entry_path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(entry_path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry_path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        return removed
+
+    def __repr__(self):
+        return f"RenderCache(cache_dir={self.cache_dir}, max_bytes={self.max_bytes}, salt={self.salt})"
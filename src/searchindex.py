@@ -0,0 +1,226 @@
+from htmlnode import HTMLNode
+from manifest import write_if_changed
+import hashlib
+import json
+import os
+import re
+
+SEARCH_STATE_VERSION = 1
+
+# Directory inside docs the index and its loader are written to
+SEARCH_DIR = "search"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+MIN_TERM_LENGTH, MAX_TERM_LENGTH = 2, 32
+# Only a page's most frequent terms are indexed, keeping the index size linear in the number of pages
+MAX_TERMS_PER_PAGE = 300
+# Code isn't indexed, only the text of paragraphs, headings, quotes and lists
+SKIPPED_TAGS = ("pre", "code")
+
+# Browser side of the index: loads docs.json and the shard of every query term on demand and ranks the
+# pages matching all terms (each query term also matches longer index terms starting with it)
+SEARCH_SCRIPT = """// Generated by the site build, see searchindex.py
+(function () {
+  const base = new URL(".", document.currentScript.src);
+  const shards = new Map();
+  let docs = null;
+
+  function fetchJSON(name) {
+    return fetch(new URL(name, base)).then((response) => (response.ok ? response.json() : {}));
+  }
+
+  function shardKey(term) {
+    return /[a-z0-9]/.test(term[0]) ? term[0] : "_";
+  }
+
+  function loadShard(key) {
+    if (!shards.has(key)) shards.set(key, fetchJSON(`shard-${key}.json`));
+    return shards.get(key);
+  }
+
+  async function search(query, limit = 20) {
+    const terms = (query.toLowerCase().match(/[\\p{L}\\p{N}_]+/gu) || []).filter((term) => term.length >= %(min_length)d);
+    if (!terms.length) return [];
+    if (!docs) docs = fetchJSON("docs.json");
+
+    let scores = null;
+    for (const term of terms) {
+      const shard = await loadShard(shardKey(term));
+      const termScores = new Map();
+      for (const [indexTerm, postings] of Object.entries(shard)) {
+        if (!indexTerm.startsWith(term)) continue;
+        // Exact matches count fully, prefix matches half
+        const weight = indexTerm === term ? 1 : 0.5;
+        for (let i = 0; i < postings.length; i += 2) {
+          termScores.set(postings[i], (termScores.get(postings[i]) || 0) + postings[i + 1] * weight);
+        }
+      }
+      if (scores === null) {
+        scores = termScores;
+      } else {
+        for (const [id, score] of scores) {
+          if (termScores.has(id)) scores.set(id, score + termScores.get(id));
+          else scores.delete(id);
+        }
+      }
+    }
+
+    const pages = await docs;
+    return [...scores]
+      .sort((a, b) => b[1] - a[1])
+      .slice(0, limit)
+      .map(([id, score]) => ({ url: pages[id][0], title: pages[id][1], score }));
+  }
+
+  window.siteSearch = { search };
+})();
+""" % {"min_length": MIN_TERM_LENGTH}
+
+'''
+    Counts the search terms of a page from the text of its HTMLNode tree, code excluded
+    Args:
+        node (HTMLNode): REQUIRED - Root of the page's tree
+    Returns:
+        dict[str, int]: Term -> number of occurrences, for at most MAX_TERMS_PER_PAGE of the most frequent terms
+'''
+def page_terms(node: HTMLNode):
+    counts = {}
+
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.tag in SKIPPED_TAGS:
+            continue
+        if current.children:
+            stack.extend(current.children)
+        elif current.value:
+            for token in TOKEN_PATTERN.findall(current.value.lower()):
+                if MIN_TERM_LENGTH <= len(token) <= MAX_TERM_LENGTH:
+                    counts[token] = counts.get(token, 0) + 1
+
+    if len(counts) > MAX_TERMS_PER_PAGE:
+        # Ties broken alphabetically so the same text always keeps the same terms
+        kept = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:MAX_TERMS_PER_PAGE]
+        counts = dict(kept)
+
+    return counts
+
+'''
+    Returns the shard a term is stored in, its first character (or "_" for anything but a-z and 0-9)
+'''
+def shard_key(term: str):
+    first = term[0]
+    return first if first.isascii() and first.isalnum() else "_"
+
+'''
+    Returns the URL a page is served at, index.html pages by their directory
+'''
+def page_url(output: str, basepath: str):
+    if output == "index.html" or output.endswith("/index.html"):
+        output = output[:-len("index.html")]
+    return basepath + output
+
+'''
+    Loads the search state, an empty one when missing, unreadable or outdated
+'''
+def load_search_state(state_path: str):
+    try:
+        with open(state_path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"pages": {}, "shards": {}}
+
+    if state.get("version") != SEARCH_STATE_VERSION:
+        return {"pages": {}, "shards": {}}
+    return state
+
+'''
+    Returns the paths (relative to docs) of the index files written by the last update_search_index
+'''
+def search_outputs(state_path: str):
+    shards = load_search_state(state_path)["shards"]
+    return [f"{SEARCH_DIR}/docs.json", f"{SEARCH_DIR}/search.js", *(f"{SEARCH_DIR}/shard-{key}.json" for key in shards)]
+
+'''
+    Writes the search index for a site to docs/search/: docs.json (page id -> [URL, title]), one
+    shard-<key>.json per first character of the indexed terms (term -> [page id, count, page id, count, ...])
+    and the search.js loader. Page ids are kept stable between builds, so a shard is only rewritten when
+    the terms of a page that has terms in it changed.
+    Args:
+        docs_path (str): REQUIRED - Path to the output directory
+        state_path (str): REQUIRED - File keeping page ids, terms and shard digests between builds
+        pages (dict[str, tuple[str, str, dict[str, int]]]): REQUIRED - Source MD path -> (output path relative
+            to docs, title, terms) for every page of the site
+        basepath (str): OPTIONAL - Base path the site is served from, default is "/"
+    Returns:
+        tuple[int, int]: Number of (shards written, shards unchanged)
+'''
+def update_search_index(docs_path: str, state_path: str, pages: dict[str, tuple[str, str, dict[str, int]]], basepath: str = "/"):
+    state = load_search_state(state_path)
+    old_pages = state["pages"]
+    shard_digests = state["shards"]
+    search_path = os.path.join(docs_path, SEARCH_DIR)
+    os.makedirs(search_path, exist_ok=True)
+
+    # Pages keep their id, ids of removed pages are handed to new ones
+    ids = {source: entry["id"] for source, entry in old_pages.items() if source in pages}
+    used = set(ids.values())
+    free = (page_id for page_id in range(len(pages) + len(used)) if page_id not in used)
+    for source in sorted(pages.keys() - ids.keys()):
+        ids[source] = next(free)
+
+    # Shards holding a term of a page that was added, removed or whose terms changed
+    affected = set()
+    for source in pages.keys() | old_pages.keys():
+        old_entry = old_pages.get(source)
+        new_terms = pages[source][2] if source in pages else {}
+        if old_entry is None or source not in pages or old_entry["terms"] != new_terms or old_entry["id"] != ids[source]:
+            affected.update(shard_key(term) for term in new_terms)
+            if old_entry is not None:
+                affected.update(shard_key(term) for term in old_entry["terms"])
+    # Shards deleted from docs since the last build
+    affected.update(key for key in shard_digests if not os.path.exists(os.path.join(search_path, f"shard-{key}.json")))
+
+    shards = {key: {} for key in affected}
+    for source in sorted(pages, key=ids.get):
+        for term, count in pages[source][2].items():
+            shard = shards.get(shard_key(term))
+            if shard is not None:
+                shard.setdefault(term, []).extend((ids[source], count))
+
+    written, unchanged = 0, len(shard_digests.keys() - affected)
+    for key, shard in shards.items():
+        shard_path = os.path.join(search_path, f"shard-{key}.json")
+        if not shard:
+            if os.path.exists(shard_path):
+                os.remove(shard_path)
+            shard_digests.pop(key, None)
+            continue
+
+        text = json.dumps(shard, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        if shard_digests.get(key) != digest or not os.path.exists(shard_path):
+            write_if_changed(shard_path, text)
+            shard_digests[key] = digest
+            written += 1
+        else:
+            unchanged += 1
+
+    docs = [None] * (max(ids.values()) + 1 if ids else 0)
+    for source, (output, title, _) in pages.items():
+        docs[ids[source]] = [page_url(output, basepath), title]
+    write_if_changed(os.path.join(search_path, "docs.json"), json.dumps(docs, separators=(",", ":"), ensure_ascii=False))
+    write_if_changed(os.path.join(search_path, "search.js"), SEARCH_SCRIPT)
+
+    state = {
+        "version": SEARCH_STATE_VERSION,
+        "pages": {source: {"id": ids[source], "output": output, "title": title, "terms": terms} for source, (output, title, terms) in pages.items()},
+        "shards": shard_digests,
+    }
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+    return written, unchanged
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+class SiteTestCase(unittest.TestCase):
+    '''
+        Base of the tests working on a site in a temporary directory. setUp creates the directory and sets the paths
+        of the site's static, content and docs directories and template (none of which exist until written), and
+        tearDown removes it all.
+    '''
+    # Whether write moves every file's mtime on, for tests of (mtime, size) snapshots that rewrite files within
+    # one clock tick. Off elsewhere, so same-tick writes are tested as they happen.
+    bump_mtime = False
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.static = os.path.join(root, "static")
+        self.content = os.path.join(root, "content")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    '''
+    Writes text to file_path, creating its directory first
+    '''
+    def write(self, file_path: str, text: str):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(text)
+        if not self.bump_mtime:
+            return
+        stat = os.stat(file_path)
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    '''
+    Returns the text of file_path
+    '''
+    def read(self, file_path: str):
+        with open(file_path) as f:
+            return f.read()
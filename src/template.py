@@ -0,0 +1,168 @@
+from assets import AssetManifest
+import os
+import re
+
+# {{ Name }} placeholders, whitespace inside the braces is optional
+SLOT_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+# {{> file }} includes, the partial's path is relative to the directory of the file including it
+PARTIAL_PATTERN = re.compile(r"\{\{>\s*([\w./-]+)\s*\}\}")
+# href/src attributes holding a root-relative URL (but not a protocol-relative //host URL)
+ROOT_URL_ATTR_PATTERN = re.compile(r'\b(href|src)="(/(?!/)[^"]*)"')
+
+# Compiled templates by path, with the (mtime, size) of the template and every partial it was compiled from
+_template_cache: dict[str, tuple[list[tuple[int, int]], "Template"]] = {}
+
+'''
+    Prefixes a root-relative URL with the basepath the site is served from
+    Args:
+        url (str): REQUIRED - URL to rewrite
+        basepath (str): REQUIRED - Base path, e.g. "/" or "/ss-generator/"
+    Returns:
+        str: basepath + URL for root-relative URLs, anything else is returned unchanged
+'''
+def prefix_basepath(url: str, basepath: str):
+    if basepath == "/" or not url.startswith("/") or url.startswith("//"):
+        return url
+
+    return basepath + url[1:]
+
+class Template:
+
+    '''
+    Template class, an HTML template compiled once into literal segments and the named {{ Slot }}
+    placeholders between them, so rendering a page is a single pass over the segments.
+    {{> file }} includes are expanded before compiling, so partials may hold slots and include other partials.
+    Args:
+        source (str): REQUIRED - Template text
+        path (str | None): OPTIONAL - File the template was read from, partials are found relative to it. Defaults to None.
+    '''
+    def __init__(self, source: str, path: str | None = None):
+        self.path = path
+        # Every partial file the template includes (directly or not), in include order
+        self.partials = []
+        source = self.expand_partials(source, os.path.dirname(path) if path else ".", [path])
+        # literals[i] comes before slots[i], the last literal follows the last slot
+        self.literals = []
+        self.slots = []
+        # Literals with root links rewritten, per (basepath, asset manifest digest)
+        self._literals_by_basepath = {("/", None): self.literals}
+
+        position = 0
+        for match in SLOT_PATTERN.finditer(source):
+            self.literals.append(source[position:match.start()])
+            self.slots.append(match.group(1))
+            position = match.end()
+        self.literals.append(source[position:])
+
+    '''
+    Replaces the {{> file }} includes in source with the partials' text, recursively
+    Args:
+        source (str): REQUIRED - Text to expand
+        base_dir (str): REQUIRED - Directory include paths are relative to
+        including (list[str | None]): REQUIRED - Files currently being expanded, to detect include cycles
+    Returns:
+        str: source with every include expanded
+    '''
+    def expand_partials(self, source: str, base_dir: str, including: list[str | None]):
+        def include(match):
+            partial_path = os.path.normpath(os.path.join(base_dir, match.group(1)))
+            if partial_path in including:
+                raise ValueError(f"Template partial {partial_path} includes itself")
+            if partial_path not in self.partials:
+                self.partials.append(partial_path)
+
+            with open(partial_path, "r") as f:
+                partial = f.read()
+            return self.expand_partials(partial, os.path.dirname(partial_path), including + [partial_path])
+
+        return PARTIAL_PATTERN.sub(include, source)
+
+    '''
+    Returns the template's literal segments with their root-relative href/src attributes pointing
+    under basepath (and at the fingerprinted copies of assets when given an AssetManifest).
+    Only the template's own markup is rewritten, never the values put into slots.
+    '''
+    def literals_for(self, basepath: str, assets: AssetManifest | None = None):
+        key = (basepath, assets.digest if assets is not None else None)
+        if key not in self._literals_by_basepath:
+            def rewrite(match):
+                url = assets.url_for(match.group(2)) if assets is not None else match.group(2)
+                return f'{match.group(1)}="{prefix_basepath(url, basepath)}"'
+
+            self._literals_by_basepath[key] = [ROOT_URL_ATTR_PATTERN.sub(rewrite, literal) for literal in self.literals]
+
+        return self._literals_by_basepath[key]
+
+    '''
+    Writes the rendered template to a file-like sink. Slot values may be strings or HTMLNodes,
+    which are streamed with write_html. Slots without a value render as an empty string.
+    Args:
+        sink: REQUIRED - Object with a write method
+        values (dict[str, str | HTMLNode]): REQUIRED - Slot name -> value
+        basepath (str): OPTIONAL - Base path for the template's root links, default is "/"
+        assets (AssetManifest | None): OPTIONAL - Fingerprinted assets the template's links are pointed at. Defaults to None.
+    '''
+    def write(self, sink, values: dict, basepath: str = "/", assets: AssetManifest | None = None):
+        literals = self.literals_for(basepath, assets)
+
+        for literal, slot in zip(literals, self.slots):
+            sink.write(literal)
+            value = values.get(slot, "")
+            if hasattr(value, "write_html"):
+                value.write_html(sink)
+            else:
+                sink.write(value)
+
+        sink.write(literals[-1])
+
+    '''
+    Renders the template to a string, see write
+    '''
+    def render(self, values: dict, basepath: str = "/", assets: AssetManifest | None = None):
+        chunks = []
+        self.write(_ListSink(chunks), values, basepath, assets)
+        return "".join(chunks)
+
+    def __repr__(self):
+        return f"Template(path={self.path}, slots={self.slots}, partials={self.partials})"
+
+class _ListSink:
+    '''
+        Minimal sink collecting written chunks into a list
+    '''
+    def __init__(self, chunks: list[str]):
+        self.write = chunks.append
+
+'''
+    Returns the (mtime, size) of each file, None for files that can't be read
+'''
+def _file_versions(file_paths: list[str]):
+    versions = []
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            versions.append(None)
+            continue
+        versions.append((stat.st_mtime_ns, stat.st_size))
+    return versions
+
+'''
+    Returns the compiled template for a file, compiling it only the first time it's used
+    (or again after the file or one of its partials changes)
+    Args:
+        template_path (str): REQUIRED - Path to HTML template file
+    Returns:
+        Template
+'''
+def load_template(template_path: str):
+    cached = _template_cache.get(template_path)
+    if cached is not None and cached[0] == _file_versions([template_path, *cached[1].partials]):
+        return cached[1]
+
+    version = _file_versions([template_path])
+    with open(template_path, "r") as f:
+        template = Template(f.read(), template_path)
+
+    _template_cache[template_path] = (version + _file_versions(template.partials), template)
+    return template
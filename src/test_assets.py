@@ -0,0 +1,66 @@
+import unittest
+import json
+import os
+from assets import ASSET_MANIFEST_NAME, AssetManifest, fingerprint_path
+from copystatic import sync_directory
+from manifest import hash_file
+from sitefixture import SiteTestCase
+
+class TestAssets(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "logo.png"), "png")
+        self.write(os.path.join(self.static, "robots.txt"), "User-agent: *")
+
+    def test_fingerprint_path(self):
+        self.assertEqual(fingerprint_path("index.css", "3f9a1c2b" + "0" * 56), "index.3f9a1c2b.css")
+        self.assertEqual(fingerprint_path("js/app.min.js", "deadbeef" + "0" * 56), "js/app.min.deadbeef.js")
+
+    def test_from_static_only_fingerprints_assets(self):
+        assets = AssetManifest.from_static(self.static)
+        css_hash = hash_file(os.path.join(self.static, "index.css"))
+
+        self.assertEqual(set(assets.assets), {"index.css", "images/logo.png"})
+        self.assertEqual(assets.assets["index.css"], fingerprint_path("index.css", css_hash))
+
+    def test_url_for(self):
+        assets = AssetManifest({"index.css": "index.11111111.css", "images/logo.png": "images/logo.22222222.png"})
+
+        self.assertEqual(assets.url_for("/index.css"), "/index.11111111.css")
+        self.assertEqual(assets.url_for("/images/logo.png?v=2#top"), "/images/logo.22222222.png?v=2#top")
+        # Pages, relative and external URLs are left alone
+        self.assertEqual(assets.url_for("/blog/post"), "/blog/post")
+        self.assertEqual(assets.url_for("images/logo.png"), "images/logo.png")
+        self.assertEqual(assets.url_for("//cdn.example.com/index.css"), "//cdn.example.com/index.css")
+
+    def test_write_copies_and_saves_manifest(self):
+        assets = AssetManifest.from_static(self.static)
+
+        sync_directory(self.static, self.docs)
+
+        self.assertEqual(assets.write(self.docs), 2)
+        assets.save(self.docs)
+        # Fingerprinted names only change with the contents, existing copies are skipped
+        self.assertEqual(assets.write(self.docs), 0)
+
+        with open(os.path.join(self.docs, assets.assets["index.css"])) as f:
+            self.assertEqual(f.read(), "body {}")
+        with open(os.path.join(self.docs, ASSET_MANIFEST_NAME)) as f:
+            self.assertEqual(json.load(f), assets.assets)
+        self.assertEqual(AssetManifest.load(self.docs).assets, assets.assets)
+
+    def test_names_hash_the_docs_copies(self):
+        sync_directory(self.static, self.docs)
+        # Rewritten by a later stage, e.g. minified
+        self.write(os.path.join(self.docs, "index.css"), "body{}")
+
+        assets = AssetManifest.from_static(self.static, docs_path=self.docs)
+        self.assertEqual(assets.assets["index.css"], fingerprint_path("index.css", hash_file(os.path.join(self.docs, "index.css"))))
+        self.assertNotEqual(assets.assets, AssetManifest.from_static(self.static).assets)
+        assets.write(self.docs)
+        with open(os.path.join(self.docs, assets.assets["index.css"])) as f:
+            self.assertEqual(f.read(), "body{}")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import io
 from block_split import *
 
 class TestBlockSplit(unittest.TestCase):
@@ -139,5 +140,80 @@ the **same** even with inline stuff
             "<div><h1>Heading 1</h1><h2>Heading 2</h2><h3>Heading 3</h3></div>",
         )
 
+    def test_iter_blocks_types_and_line_ranges(self):
+        md = "# Title\n\nSome paragraph\nover two lines\n\n\n- a\n- b\n"
+        blocks = list(iter_blocks(md.split("\n")))
+        self.assertEqual(
+            blocks,
+            [
+                Block("# Title", BlockType.HEADING, 1, 1),
+                Block("Some paragraph\nover two lines", BlockType.PARAGRAPH, 3, 4),
+                Block("- a\n- b", BlockType.UNORDERED_LIST, 7, 8),
+            ],
+        )
+
+    def test_iter_blocks_code_with_blank_lines(self):
+        md = "Intro\n\n```\ndef f():\n\n    return 1\n```\nAfter the fence"
+        blocks = list(iter_blocks(md.split("\n")))
+        self.assertEqual(
+            blocks,
+            [
+                Block("Intro", BlockType.PARAGRAPH, 1, 1),
+                Block("```\ndef f():\n\n    return 1\n```", BlockType.CODE, 3, 7),
+                Block("After the fence", BlockType.PARAGRAPH, 8, 8),
+            ],
+        )
+
+    def test_iter_blocks_unclosed_fence_ends_at_blank_line(self):
+        md = "```\nnever closed\n\n# Title\n\nText"
+        blocks = list(iter_blocks(md.split("\n")))
+        self.assertEqual(
+            blocks,
+            [
+                Block("```\nnever closed", BlockType.PARAGRAPH, 1, 2),
+                Block("# Title", BlockType.HEADING, 4, 4),
+                Block("Text", BlockType.PARAGRAPH, 6, 6),
+            ],
+        )
+
+    def test_iter_blocks_indented_closing_fence(self):
+        md = "```\ncode\n  ```\n\nText"
+        blocks = list(iter_blocks(md.split("\n")))
+        self.assertEqual(
+            blocks,
+            [
+                Block("```\ncode\n  ```", BlockType.CODE, 1, 3),
+                Block("Text", BlockType.PARAGRAPH, 5, 5),
+            ],
+        )
+        self.assertEqual(markdown_to_html_node(md).to_html(), "<div><pre><code>code</code></pre><p>Text</p></div>")
+
+    def test_iter_blocks_inline_code_line_opens_no_fence(self):
+        md = "```x``` is inline\n\nText"
+        blocks = list(iter_blocks(md.split("\n")))
+        self.assertEqual(
+            blocks,
+            [
+                Block("```x``` is inline", BlockType.PARAGRAPH, 1, 1),
+                Block("Text", BlockType.PARAGRAPH, 3, 3),
+            ],
+        )
+
+    def test_iter_blocks_reads_file_lines(self):
+        lines = io.StringIO("# Title\r\n\r\nText\r\n")
+        self.assertEqual([block.text for block in iter_blocks(lines)], ["# Title", "Text"])
+
+    def test_code_block_with_blank_lines_to_html(self):
+        md = "```\nfirst\n\nsecond\n```"
+        self.assertEqual(markdown_to_html_node(md).to_html(), "<div><pre><code>first\n\nsecond</code></pre></div>")
+        self.assertEqual(markdown_to_html_node(io.StringIO(md)).to_html(), "<div><pre><code>first\n\nsecond</code></pre></div>")
+
+    def test_markdown_to_html_node_collects_links_with_lines(self):
+        md = "# Title with [link](/a)\n\nText and\nmore [b](/b) and ![img](/c.png)\n\n```\n[not](/code)\n```\n\n- one\n- two [d](/d) [d](/d)"
+        links = []
+        markdown_to_html_node(md, links)
+
+        self.assertEqual(links, [("/a", 1), ("/b", 4), ("/c.png", 4), ("/d", 11), ("/d", 11)])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,195 @@
+import os
+import shutil
+from assets import AssetManifest
+from build import full_build, incremental_build
+from depgraph import DependencyGraph
+from generatepage import PageBuildError
+from sitefixture import SiteTestCase
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+class TestIncrementalBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.manifest = os.path.join(root, ".build-cache", "manifest.json")
+        self.depgraph = os.path.join(root, ".build-cache", "depgraph.json")
+
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nSome **bold** text")
+        self.write(self.template, TEMPLATE)
+
+    def build(self, basepath="/", fingerprint=False, image_state=None, minify_state=None):
+        return incremental_build(self.static, self.content, self.template, self.docs, self.manifest, basepath, depgraph_path=self.depgraph, fingerprint=fingerprint, image_state=image_state, minify_state=minify_state)
+
+    def test_first_build_renders_everything(self):
+        self.assertEqual(self.build(), (2, 1, 0))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "blog", "post.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.css")))
+
+    def test_unchanged_rebuild_does_nothing(self):
+        self.build()
+        self.assertEqual(self.build(), (0, 0, 0))
+
+    def test_only_changed_page_rerendered(self):
+        self.build()
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nEdited")
+        self.assertEqual(self.build(), (1, 0, 0))
+
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            self.assertIn("Edited", f.read())
+
+    def test_template_or_basepath_change_rerenders_all(self):
+        self.build()
+        self.write(self.template, TEMPLATE + "\n")
+        self.assertEqual(self.build(), (2, 0, 0))
+        self.assertEqual(self.build("/site/"), (2, 0, 0))
+
+    def test_removed_sources_delete_outputs(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        os.remove(os.path.join(self.static, "index.css"))
+
+        self.assertEqual(self.build(), (0, 0, 2))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css")))
+
+    def test_deleted_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.docs, "index.html"))
+        self.assertEqual(self.build(), (1, 0, 0))
+
+    def test_partial_change_rerenders_pages_using_it(self):
+        self.write(os.path.join(os.path.dirname(self.template), "footer.html"), "<footer>v1</footer>")
+        self.write(self.template, TEMPLATE.replace("</body>", "{{> footer.html }}</body>"))
+        self.build()
+
+        self.write(os.path.join(os.path.dirname(self.template), "footer.html"), "<footer>v2</footer>")
+        self.assertEqual(self.build(), (2, 0, 0))
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertIn("<footer>v2</footer>", f.read())
+
+    def test_dependency_graph_kept_across_builds(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nRead the [post](/blog/post)")
+        self.build()
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nEdited")
+        self.build()
+
+        graph = DependencyGraph.load(self.depgraph, self.docs)
+        self.assertEqual(set(graph.pages), {os.path.join(self.content, "index.md"), os.path.join(self.content, "blog", "post.md")})
+        self.assertEqual(graph.linking_pages([os.path.join(self.content, "blog", "post.md")]), [os.path.join(self.content, "index.md")])
+
+    def test_fingerprinted_asset_change_rerenders_pages(self):
+        self.write(self.template, '<html><link href="/index.css"><body>{{ Content }}</body></html>')
+        self.build(fingerprint=True)
+        old = AssetManifest.load(self.docs).assets["index.css"]
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertIn(f'href="/{old}"', f.read())
+
+        self.assertEqual(self.build(fingerprint=True), (0, 0, 0))
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        # The old fingerprinted copy is removed and every page points at the new one
+        self.assertEqual(self.build(fingerprint=True), (2, 1, 1))
+        new = AssetManifest.load(self.docs).assets["index.css"]
+        self.assertNotEqual(new, old)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, old)))
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            self.assertIn(f'href="/{new}"', f.read())
+
+    def test_fingerprinted_names_follow_minification(self):
+        minify_state = os.path.join(self.tmp.name, ".build-cache", "minify.json")
+        self.write(os.path.join(self.static, "index.css"), "body {\n  margin: 0;\n}\n")
+        self.build(fingerprint=True)
+        plain = AssetManifest.load(self.docs).assets["index.css"]
+
+        incremental_build(self.static, self.content, self.template, self.docs, self.manifest, depgraph_path=self.depgraph, fingerprint=True, minify_state=minify_state)
+        minified = AssetManifest.load(self.docs).assets["index.css"]
+        # A name only ever stands for one content
+        self.assertNotEqual(minified, plain)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, plain)))
+        with open(os.path.join(self.docs, minified)) as f, open(os.path.join(self.docs, "index.css")) as g:
+            self.assertEqual(f.read(), g.read())
+
+    def test_resized_image_rerenders_pages(self):
+        image_state = os.path.join(self.tmp.name, ".build-cache", "images.json")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![logo](/images/logo.gif)")
+        self.write(os.path.join(self.static, "images", "logo.gif"), "GIF89a\x10\x00\x08\x00")
+        self.assertEqual(self.build(image_state=image_state), (2, 1, 0))
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertIn('width="16" height="8" loading="lazy"', f.read())
+
+        self.assertEqual(self.build(image_state=image_state), (0, 0, 0))
+        self.write(os.path.join(self.static, "images", "logo.gif"), "GIF89a\x20\x00\x08\x00")
+        self.assertEqual(self.build(image_state=image_state), (2, 0, 0))
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertIn('width="32" height="8"', f.read())
+
+    def test_turning_minify_on_and_off_rerenders_pages(self):
+        minify_state = os.path.join(self.tmp.name, ".build-cache", "minify.json")
+        self.write(self.template, "<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n")
+        self.write(os.path.join(self.static, "index.css"), "body {\n  color: red;\n}\n")
+        self.build()
+
+        self.assertEqual(self.build(minify_state=minify_state), (2, 0, 0))
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertEqual(f.read(), "<html> <body> <div><h1>Home</h1><p>Welcome</p></div> </body> </html>")
+        with open(os.path.join(self.docs, "index.css")) as f:
+            self.assertEqual(f.read(), "body{color:red}")
+
+        self.assertEqual(self.build(minify_state=minify_state), (0, 0, 0))
+
+        # And back
+        self.assertEqual(self.build(), (2, 1, 0))
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertTrue(f.read().startswith("<html>\n  <body>"))
+        with open(os.path.join(self.docs, "index.css")) as f:
+            self.assertEqual(f.read(), "body {\n  color: red;\n}\n")
+        self.assertEqual(self.build(), (0, 0, 0))
+
+    def test_listings_follow_front_matter(self):
+        metadata_db = os.path.join(self.tmp.name, ".build-cache", "metadata.sqlite")
+        listings_state = os.path.join(self.tmp.name, ".build-cache", "listings.json")
+        build = lambda: incremental_build(self.static, self.content, self.template, self.docs, self.manifest, metadata_db=metadata_db, listings_state=listings_state)
+        self.write(os.path.join(self.content, "blog", "post.md"), "---\ntags: [elves]\n---\n# Post\n\nText")
+        build()
+
+        with open(os.path.join(self.docs, "blog", "index.html")) as f:
+            self.assertIn('<a href="/blog/post.html">Post</a>', f.read())
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "tags", "elves", "index.html")))
+
+        # Metadata unchanged, the listings are left alone
+        mtime = os.stat(os.path.join(self.docs, "blog", "index.html")).st_mtime_ns
+        self.write(os.path.join(self.content, "blog", "post.md"), "---\ntags: [elves]\n---\n# Post\n\nEdited")
+        build()
+        self.assertEqual(os.stat(os.path.join(self.docs, "blog", "index.html")).st_mtime_ns, mtime)
+
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nEdited")
+        build()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "tags")))
+
+    def test_pipelined_build_matches(self):
+        self.build()
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            expected = f.read()
+
+        shutil.rmtree(os.path.join(self.docs, "blog"))
+        self.assertEqual(incremental_build(self.static, self.content, self.template, self.docs, self.manifest, io_threads=2), (1, 0, 0))
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_broken_page_still_updates_feeds(self):
+        feeds_state = os.path.join(self.tmp.name, ".build-cache", "feeds.json")
+        builds = {
+            "incremental": lambda: incremental_build(self.static, self.content, self.template, self.docs, self.manifest, site_url="https://example.com", feeds_state=feeds_state),
+            "full": lambda: full_build(self.static, self.content, self.template, self.docs, site_url="https://example.com", feeds_state=feeds_state),
+        }
+        self.write(os.path.join(self.content, "broken.md"), "No title")
+        for name, build in builds.items():
+            with self.subTest(build=name):
+                self.write(os.path.join(self.content, f"{name}.md"), "# New\n\nText")
+                with self.assertRaises(PageBuildError):
+                    build()
+                # The page that did render made it into the sitemap
+                self.assertIn(f"https://example.com/{name}.html", self.read(os.path.join(self.docs, "sitemap.xml")))
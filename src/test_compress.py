@@ -0,0 +1,53 @@
+import gzip
+import os
+from compress import is_compressible, precompress_tree
+from sitefixture import SiteTestCase
+
+class TestPrecompress(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.state = os.path.join(self.tmp.name, "cache", "precompress.json")
+        self.page = os.path.join(self.docs, "index.html")
+        self.write(self.page, "<p>" + "hello world " * 200 + "</p>")
+        self.write(os.path.join(self.docs, "index.css"), "body { margin: 0; } " * 50)
+        self.write(os.path.join(self.docs, "images", "a.png"), "png " * 100)
+
+    def test_is_compressible(self):
+        self.assertTrue(is_compressible("blog/index.html"))
+        self.assertTrue(is_compressible("index.CSS"))
+        self.assertFalse(is_compressible("images/tolkien.png"))
+        self.assertFalse(is_compressible("index.html.gz"))
+
+    def test_writes_gzip_variants(self):
+        self.assertEqual(precompress_tree(self.docs, self.state), (2, 0, 0))
+
+        with gzip.open(self.page + ".gz", "rt") as f, open(self.page) as original:
+            self.assertEqual(f.read(), original.read())
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images", "a.png.gz")))
+
+    def test_unchanged_files_skipped(self):
+        precompress_tree(self.docs, self.state)
+        self.assertEqual(precompress_tree(self.docs, self.state), (0, 2, 0))
+
+        self.write(self.page, "<p>" + "changed " * 200 + "</p>")
+        self.assertEqual(precompress_tree(self.docs, self.state), (1, 1, 0))
+
+    def test_missing_variant_recreated(self):
+        precompress_tree(self.docs, self.state)
+        os.remove(self.page + ".gz")
+
+        self.assertEqual(precompress_tree(self.docs, self.state), (1, 1, 0))
+        self.assertTrue(os.path.exists(self.page + ".gz"))
+
+    def test_removed_source_removes_variants(self):
+        precompress_tree(self.docs, self.state)
+        os.remove(self.page)
+
+        self.assertEqual(precompress_tree(self.docs, self.state), (0, 1, 1))
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+
+    def test_variant_not_smaller_is_skipped(self):
+        tiny = os.path.join(self.docs, "tiny.txt")
+        self.write(tiny, "a")
+        precompress_tree(self.docs, self.state)
+        self.assertFalse(os.path.exists(tiny + ".gz"))
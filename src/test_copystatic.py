@@ -0,0 +1,64 @@
+import os
+from copystatic import copy_directory, sync_directory, transfer_file
+from sitefixture import SiteTestCase
+
+class TestSyncDirectory(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png bytes")
+
+    def test_sync_into_missing_and_existing_dest(self):
+        self.assertEqual(sync_directory(self.static, self.docs), (2, 0, 0))
+        self.assertEqual(self.read(os.path.join(self.docs, "images", "a.png")), "png bytes")
+        self.assertEqual(sync_directory(self.static, self.docs), (0, 2, 0))
+
+    def test_copy_directory_syncs(self):
+        self.assertEqual(copy_directory(self.static, self.docs), (2, 0, 0))
+        # The destination existing is no longer an error
+        self.assertEqual(copy_directory(self.static, self.docs, link="copy"), (0, 2, 0))
+
+    def test_modified_file_recopied(self):
+        sync_directory(self.static, self.docs)
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+
+        self.assertEqual(sync_directory(self.static, self.docs), (1, 1, 0))
+        self.assertEqual(self.read(os.path.join(self.docs, "index.css")), "body { margin: 0 }")
+
+    def test_hash_compare_detects_same_size_edit(self):
+        sync_directory(self.static, self.docs)
+        css = os.path.join(self.static, "index.css")
+        stat = os.stat(css)
+        self.write(css, "body {{")
+        os.utime(css, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        self.assertEqual(sync_directory(self.static, self.docs, compare="hash"), (1, 1, 0))
+
+    def test_stale_files_removed_unless_kept(self):
+        self.write(os.path.join(self.docs, "old", "stale.png"), "old")
+        self.write(os.path.join(self.docs, "index.html"), "<p>page</p>")
+
+        self.assertEqual(sync_directory(self.static, self.docs, keep={"index.html"}), (2, 0, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "old")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_excluded_files_neither_copied_nor_removed(self):
+        self.write(os.path.join(self.docs, "images", "a.png"), "optimized png")
+        excluded = {"images/a.png"}
+
+        self.assertEqual(sync_directory(self.static, self.docs, exclude=excluded), (1, 0, 0))
+        self.assertEqual(self.read(os.path.join(self.docs, "images", "a.png")), "optimized png")
+
+    def test_hardlink_replaced_not_written_through(self):
+        sync_directory(self.static, self.docs, link="hardlink")
+        src_css = os.path.join(self.static, "index.css")
+        dest_css = os.path.join(self.docs, "index.css")
+        self.assertTrue(os.path.samefile(src_css, dest_css))
+
+        # Overwriting the output must leave the source untouched
+        other = os.path.join(self.tmp.name, "other.css")
+        self.write(other, "replacement")
+        transfer_file(other, dest_css, "copy")
+
+        self.assertEqual(self.read(src_css), "body {}")
+        self.assertEqual(self.read(dest_css), "replacement")
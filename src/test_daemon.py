@@ -0,0 +1,112 @@
+import unittest
+import os
+import socket
+import threading
+from client import describe, request
+from daemon import BuildDaemon, serve
+from watch import SiteWatcher
+from depgraph import DependencyGraph
+from metaindex import MetadataIndex
+from sitefixture import SiteTestCase
+
+class TestBuildDaemon(SiteTestCase):
+    # Every write is visible to the watcher's (mtime, size) snapshot
+    bump_mtime = True
+
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.socket = os.path.join(root, "daemon.sock")
+
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nText")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+        self.daemon = BuildDaemon(SiteWatcher(self.static, self.content, self.template, self.docs), root)
+
+    def read_output(self, *parts):
+        with open(os.path.join(self.docs, *parts)) as f:
+            return f.read()
+
+    def test_build_and_page_requests(self):
+        self.assertEqual(self.daemon.handle({"command": "build"})["outputs"], 0)
+
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nEdited")
+        response = self.daemon.handle({"command": "page", "path": "content/blog/post.md"})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["outputs"], 1)
+        self.assertIn("Edited", self.read_output("blog", "post.html"))
+        # Already rebuilt by the page request
+        self.assertEqual(self.daemon.handle({"command": "build"})["outputs"], 0)
+
+        self.write(self.template, "<h1>{{ Title }}</h1>")
+        self.assertEqual(self.daemon.handle({"command": "build"})["outputs"], 2)
+        self.assertEqual(self.daemon.handle({"command": "status"})["builds"], 4)
+
+    def test_page_request_recorded(self):
+        depgraph = os.path.join(self.tmp.name, ".build-cache", "depgraph.json")
+        metadata_db = os.path.join(self.tmp.name, ".build-cache", "metadata.sqlite")
+        daemon = BuildDaemon(SiteWatcher(self.static, self.content, self.template, self.docs, build_options={"depgraph_path": depgraph, "metadata_db": metadata_db}), self.tmp.name)
+
+        self.write(os.path.join(self.content, "blog", "post.md"), "---\ntags: [elves]\n---\n# Post\n\nSee [home](/)")
+        self.assertTrue(daemon.handle({"command": "page", "path": "content/blog/post.md"})["ok"])
+
+        post = os.path.join(self.content, "blog", "post.md")
+        self.assertEqual(DependencyGraph.load(depgraph, self.docs).pages[post]["links"], [["/", 6]])
+        index = MetadataIndex(metadata_db)
+        self.assertEqual(index.tags(), [("elves", 1)])
+        index.close()
+
+    def test_failures_are_responses(self):
+        self.write(os.path.join(self.content, "broken.md"), "No title")
+        response = self.daemon.handle({"command": "page", "path": "content/broken.md"})
+        self.assertFalse(response["ok"])
+        self.assertIn("broken.md", response["errors"][0])
+
+        self.assertIn("isn't a page", self.daemon.handle({"command": "page", "path": "content/missing.md"})["error"])
+        self.assertIn("Unknown command", self.daemon.handle({"command": "deploy"})["error"])
+
+    def test_busy_daemon_socket_is_kept(self):
+        # Accepts connections (into the backlog) but doesn't answer, like a daemon in the middle of a build
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as busy:
+            busy.bind(self.socket)
+            busy.listen()
+            with self.assertRaises(RuntimeError):
+                serve(self.daemon, self.socket)
+            self.assertTrue(os.path.exists(self.socket))
+
+    def test_page_request_with_build_options(self):
+        manifest = os.path.join(self.tmp.name, ".build-cache", "manifest.json")
+        self.write(self.template, '<link href="/index.css"><title>{{ Title }}</title>{{ Content }}')
+        watcher = SiteWatcher(self.static, self.content, self.template, self.docs, manifest_path=manifest, build_options={"fingerprint": True})
+        daemon = BuildDaemon(watcher, self.tmp.name)
+
+        response = daemon.handle({"command": "page", "path": "content/blog/post.md"})
+        self.assertTrue(response["ok"])
+        self.assertNotIn('href="/index.css"', self.read_output("blog", "post.html"))
+        self.assertIn("isn't a page", daemon.handle({"command": "page", "path": "content/missing.md"})["error"])
+
+    def test_socket_round_trip(self):
+        # A socket left behind by a daemon that died
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+            stale.bind(self.socket)
+
+        ready = threading.Event()
+        server = threading.Thread(target=serve, args=(self.daemon, self.socket, ready))
+        server.start()
+        ready.wait(5)
+
+        status = request(self.socket, {"command": "status"}, timeout=5)
+        self.assertEqual(status["pages"], 2)
+        self.assertEqual(describe("status", status)[:12], "Build daemon")
+        with self.assertRaises(RuntimeError):
+            serve(self.daemon, self.socket)
+
+        self.assertEqual(request(self.socket, {"command": "stop"}, timeout=5), {"ok": True})
+        server.join(5)
+        self.assertFalse(server.is_alive())
+        self.assertFalse(os.path.exists(self.socket))
+
+if __name__ == "__main__":
+    unittest.main()
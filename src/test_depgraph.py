@@ -0,0 +1,72 @@
+import unittest
+import os
+import tempfile
+from depgraph import DependencyGraph, rebuild_report
+from generatepage import PageRecord
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.blog_template = os.path.join(root, "content", "blog", "template.html")
+        self.footer = os.path.join(root, "footer.html")
+        self.home = os.path.join(root, "content", "index.md")
+        self.post = os.path.join(root, "content", "blog", "post", "index.md")
+        self.logo = os.path.join(root, "static", "images", "logo.png")
+
+        self.graph = DependencyGraph(self.docs)
+        self.graph.static = {self.logo: "images/logo.png"}
+        self.graph.templates = {self.template: [self.footer], self.blog_template: []}
+        self.graph.add_page(PageRecord(self.home, os.path.join(self.docs, "index.html"), self.template, "Home", [("/blog/post", 3), ("https://example.com", 5)]))
+        self.graph.add_page(PageRecord(self.post, os.path.join(self.docs, "blog", "post", "index.html"), self.blog_template, "Post", [("../../images/logo.png#top", 3), ("/", 4)]))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_resolve_link(self):
+        self.assertEqual(self.graph.resolve_link(self.home, "/blog/post"), self.post)
+        self.assertEqual(self.graph.resolve_link(self.home, "/blog/post/"), self.post)
+        self.assertEqual(self.graph.resolve_link(self.post, "../../images/logo.png#top"), self.logo)
+        self.assertEqual(self.graph.resolve_link(self.post, "/"), self.home)
+        self.assertIsNone(self.graph.resolve_link(self.home, "https://example.com"))
+        self.assertIsNone(self.graph.resolve_link(self.home, "/missing"))
+
+    def test_affected_outputs(self):
+        self.assertEqual(self.graph.affected_outputs([self.post]), {"blog/post/index.html"})
+        self.assertEqual(self.graph.affected_outputs([self.footer]), {"index.html"})
+        self.assertEqual(self.graph.affected_outputs([self.blog_template, self.logo]), {"blog/post/index.html", "images/logo.png"})
+        self.assertEqual(self.graph.affected_outputs([os.path.join(self.tmp.name, "unrelated.md")]), set())
+
+    def test_linking_pages(self):
+        self.assertEqual(self.graph.linking_pages([self.logo]), [self.post])
+        self.assertEqual(self.graph.linking_pages([self.home, self.post]), sorted([self.home, self.post]))
+
+    def test_save_and_load(self):
+        depgraph_path = os.path.join(self.tmp.name, ".build-cache", "depgraph.json")
+        self.graph.save(depgraph_path)
+        loaded = DependencyGraph.load(depgraph_path, self.docs)
+
+        self.assertEqual(loaded.pages, self.graph.pages)
+        self.assertEqual(loaded.templates, self.graph.templates)
+        self.assertEqual(loaded.static, self.graph.static)
+        self.assertEqual(DependencyGraph.load(os.path.join(self.tmp.name, "missing.json"), self.docs).pages, {})
+
+    def test_rebuild_report(self):
+        report = rebuild_report(self.graph, [self.logo])
+
+        self.assertIn("regenerates 1 output(s):\n  images/logo.png", report)
+        self.assertIn(f"Linked to or embedded by 1 other page(s), their outputs are unaffected:\n  {self.post}", report)
+
+    def test_rewritten_asset_links_rerender_every_page(self):
+        every_output = {"index.html", "blog/post/index.html", "images/logo.png"}
+        self.assertEqual(self.graph.affected_outputs([self.logo], fingerprint=True), every_output)
+        self.assertEqual(self.graph.affected_outputs([self.logo], optimize_images=True), every_output)
+
+        report = rebuild_report(self.graph, [self.logo], fingerprint=True)
+        self.assertIn("regenerates 3 output(s):", report)
+        self.assertNotIn("unaffected", report)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import os
+import tempfile
+from feeds import feed_outputs, update_feeds
+
+class TestFeeds(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.state = os.path.join(self.tmp.name, ".build-cache", "feeds.json")
+        self.pages = {f"content/post-{i}.md": (f"post-{i}.html", f"Post {i}", 1000.0 + i, f"hash-{i}") for i in range(5)}
+        self.pages["content/index.md"] = ("index.html", "Home & Garden", 900.0, "hash-home")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def update(self, max_urls=50000):
+        return update_feeds(self.docs, self.state, self.pages, "https://example.com/", "/blog/", max_urls)
+
+    def read(self, name):
+        with open(os.path.join(self.docs, name)) as f:
+            return f.read()
+
+    def test_sitemap_and_feeds(self):
+        self.assertEqual(self.update(), (3, 0))
+        self.assertEqual(sorted(feed_outputs(self.state)), ["atom.xml", "rss.xml", "sitemap.xml"])
+
+        sitemap = self.read("sitemap.xml")
+        self.assertIn("<url><loc>https://example.com/blog/</loc><lastmod>1970-01-01T00:15:00+00:00</lastmod></url>", sitemap)
+        self.assertEqual(sitemap.count("<url>"), 6)
+
+        atom = self.read("atom.xml")
+        self.assertIn("<title>Home &amp; Garden</title>", atom)
+        # Newest first
+        self.assertLess(atom.index("post-4.html"), atom.index("post-0.html"))
+        self.assertIn("<pubDate>Thu, 01 Jan 1970 00:16:44 GMT</pubDate>", self.read("rss.xml"))
+
+        self.assertEqual(self.update(), (0, 3))
+
+    def test_lastmod_follows_source_hash(self):
+        self.update()
+        # Touched but unchanged: the entry keeps its date
+        self.pages["content/post-1.md"] = ("post-1.html", "Post 1", 5000.0, "hash-1")
+        self.assertEqual(self.update(), (0, 3))
+
+        self.pages["content/post-1.md"] = ("post-1.html", "Post 1", 5000.0, "edited")
+        self.assertEqual(self.update(), (3, 0))
+        self.assertIn("<loc>https://example.com/blog/post-1.html</loc><lastmod>1970-01-01T01:23:20+00:00</lastmod>", self.read("sitemap.xml"))
+
+    def test_only_changed_shards_rewritten(self):
+        self.assertEqual(self.update(max_urls=2), (6, 0))
+        self.assertEqual(sorted(feed_outputs(self.state)), ["atom.xml", "rss.xml", "sitemap-0.xml", "sitemap-1.xml", "sitemap-2.xml", "sitemap.xml"])
+        self.assertIn("<loc>https://example.com/blog/sitemap-2.xml</loc>", self.read("sitemap.xml"))
+
+        # The edited page's shard, the index and the feeds
+        self.pages["content/post-4.md"] = ("post-4.html", "Post 4", 2000.0, "edited")
+        self.assertEqual(self.update(max_urls=2), (4, 2))
+
+        # A new page takes the slot of a removed one, only that shard changes
+        shard = next(name for name in ("sitemap-0.xml", "sitemap-1.xml", "sitemap-2.xml") if "post-0.html" in self.read(name))
+        del self.pages["content/post-0.md"]
+        self.pages["content/post-9.md"] = ("post-9.html", "Post 9", 900.0, "hash-9")
+        self.update(max_urls=2)
+        self.assertIn("post-9.html", self.read(shard))
+
+    def test_shrinking_site_goes_back_to_one_sitemap(self):
+        self.update(max_urls=2)
+        self.pages = {"content/index.md": self.pages["content/index.md"]}
+        self.update(max_urls=2)
+
+        self.assertEqual(sorted(os.listdir(self.docs)), ["atom.xml", "rss.xml", "sitemap.xml"])
+        self.assertIn("<urlset", self.read("sitemap.xml"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from datetime import date
+from frontmatter import page_date, parse_front_matter
+
+class TestFrontMatter(unittest.TestCase):
+    def test_no_front_matter(self):
+        markdown = "# Title\n\n---\n\ntext"
+        self.assertEqual(parse_front_matter(markdown), ({}, markdown))
+
+    def test_parse(self):
+        metadata, body = parse_front_matter('---\ntitle: "Rivendell: the Last Homely House"\n# a comment\nDate: 2024-05-01\ntags: [elves, places]\n---\n# Rivendell\n')
+        self.assertEqual(metadata, {"title": "Rivendell: the Last Homely House", "date": "2024-05-01", "tags": ["elves", "places"]})
+        # Front matter lines are blanked, the heading stays on line 7
+        self.assertEqual(body, "\n" * 6 + "# Rivendell\n")
+
+    def test_comma_separated_tags(self):
+        metadata, _ = parse_front_matter("---\ntags: elves, 'places'\n---\n")
+        self.assertEqual(metadata["tags"], ["elves", "places"])
+
+    def test_not_front_matter(self):
+        for markdown in ["---\nnot a pair\n---\n", "---\ntitle: Rivendell\n# Rivendell", "---\nbody"]:
+            self.assertEqual(parse_front_matter(markdown), ({}, markdown))
+
+    def test_page_date(self):
+        self.assertEqual(page_date({"date": "2024-05-01T10:00:00"}, 0), "2024-05-01")
+        self.assertEqual(page_date({}, 1e9), date.fromtimestamp(1e9).isoformat())
+        with self.assertRaises(ValueError):
+            page_date({"date": "May 1st"}, 0)
+
+if __name__ == "__main__":
+    unittest.main()
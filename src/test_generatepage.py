@@ -1,5 +1,9 @@
 import unittest 
-from generatepage import extract_title
+import os
+from unittest import mock
+from generatepage import extract_title, find_pages, generate_pages, iter_pages
+from template import Template
+from sitefixture import SiteTestCase
 
 class TestGeneratePage(unittest.TestCase):
     def test_extract_title(self):
@@ -10,4 +14,125 @@ class TestGeneratePage(unittest.TestCase):
         self.assertEqual(extract_title(basic_md), "This is a title")
         self.assertRaises(ValueError, extract_title, empty_md)
         self.assertRaises(ValueError, extract_title, no_title_md)
-        
\ No newline at end of file
+
+class TestGeneratePages(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+
+        pages = {
+            "index.md": "# Home\n\n[a link](/blog/post)",
+            "notes.txt": "not a page",
+            "blog/post.md": "# Post\n\nSome **bold** text",
+            "blog/broken.md": "No title in this page",
+            "blog/nested/deep.md": "# Deep\n\n- one\n- two",
+        }
+        for rel_path, text in pages.items():
+            self.write(os.path.join(self.content, rel_path), text)
+        self.write(self.template, "<title>{{ Title }}</title><main>{{ Content }}</main>")
+
+    def read_tree(self, root):
+        outputs = {}
+        for src, dest, _ in find_pages(self.content, root, self.template):
+            if os.path.exists(dest):
+                with open(dest) as f:
+                    outputs[os.path.relpath(dest, root)] = f.read()
+        return outputs
+
+    def test_find_pages_sorted_and_md_only(self):
+        pages = find_pages(self.content, "docs", self.template)
+        self.assertEqual(
+            [os.path.relpath(dest, "docs") for _, dest, _ in pages],
+            [
+                os.path.join("blog", "broken.html"),
+                os.path.join("blog", "nested", "deep.html"),
+                os.path.join("blog", "post.html"),
+                "index.html",
+            ],
+        )
+
+    def test_parallel_matches_serial(self):
+        serial_dest = os.path.join(self.tmp.name, "serial")
+        parallel_dest = os.path.join(self.tmp.name, "parallel")
+
+        serial_errors = generate_pages(find_pages(self.content, serial_dest, self.template), "/", workers=1)
+        parallel_errors = generate_pages(find_pages(self.content, parallel_dest, self.template), "/", workers=2)
+
+        self.assertEqual(self.read_tree(serial_dest), self.read_tree(parallel_dest))
+        self.assertEqual(len(self.read_tree(serial_dest)), 3)
+        self.assertEqual(
+            [(path, type(error), str(error)) for path, error in serial_errors],
+            [(path, type(error), str(error)) for path, error in parallel_errors],
+        )
+        self.assertEqual([path for path, _ in serial_errors], [os.path.join(self.content, "blog", "broken.md")])
+
+    def test_pages_streamed_from_iter_pages(self):
+        pages = find_pages(self.content, os.path.join(self.tmp.name, "docs"), self.template)
+        pulled, streamed = [], []
+
+        def stream():
+            for page in iter_pages(self.content, os.path.join(self.tmp.name, "docs"), self.template):
+                pulled.append(page)
+                yield page
+
+        # Taken from the iterator a chunk at a time, not listed up front
+        with mock.patch("generatepage.STREAM_CHUNK_PAGES", 1), mock.patch("generatepage.CHUNKS_PER_WORKER", 1):
+            errors = generate_pages(stream(), "/", workers=2, on_record=lambda record: streamed.append((record.source, len(pulled))))
+
+        self.assertEqual(pulled, pages)
+        self.assertEqual([source for source, _ in streamed], [source for source, _, _ in pages if source != errors[0][0]])
+        self.assertLess(streamed[0][1], len(pages))
+
+    def test_records_streamed_in_page_order_within_budget(self):
+        pages = find_pages(self.content, os.path.join(self.tmp.name, "docs"), self.template)
+        streamed = []
+
+        # A budget the build is always over still renders every page, one chunk at a time
+        with mock.patch("generatepage.MAX_CHUNK_PAGES", 1):
+            errors = generate_pages(pages, "/", workers=2, on_record=lambda record: streamed.append(record.source), max_rss=1)
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(streamed, [source for source, _, _ in pages if source != errors[0][0]])
+
+    def test_unminified_pages_streamed_into_their_files(self):
+        serial_dest = os.path.join(self.tmp.name, "serial")
+        streamed_dest = os.path.join(self.tmp.name, "streamed")
+        generate_pages(find_pages(self.content, serial_dest, self.template), "/")
+
+        # Written straight from the template and the page's tree, the page is never built as one string
+        with mock.patch.object(Template, "render", side_effect=AssertionError("page rendered to a string")):
+            errors = generate_pages(find_pages(self.content, streamed_dest, self.template), "/")
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(self.read_tree(streamed_dest), self.read_tree(serial_dest))
+
+    def test_directory_template_override(self):
+        override = os.path.join(self.content, "blog", "template.html")
+        self.write(override, "<article>{{ Content }}</article>")
+
+        templates = {os.path.relpath(src, self.content): template for src, _, template in find_pages(self.content, "docs", self.template)}
+
+        self.assertEqual(templates["index.md"], self.template)
+        self.assertEqual(templates[os.path.join("blog", "post.md")], override)
+        self.assertEqual(templates[os.path.join("blog", "nested", "deep.md")], override)
+
+    def test_front_matter_fills_slots(self):
+        self.write(os.path.join(self.content, "blog", "broken.md"), "---\ntitle: Fixed\ndate: 2024-05-01\ndescription: Now titled\n---\nNo title in this page")
+        self.write(self.template, "<title>{{ Title }}</title><time>{{ Date }}</time><meta content=\"{{ Description }}\">")
+        dest = os.path.join(self.tmp.name, "docs")
+        records = []
+        errors = generate_pages(find_pages(self.content, dest, self.template), "/", on_record=records.append)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.read_tree(dest)[os.path.join("blog", "broken.html")], '<title>Fixed</title><time>2024-05-01</time><meta content="Now titled">')
+        self.assertEqual(next(record.metadata for record in records if record.title == "Fixed")["description"], "Now titled")
+
+    def test_basepath_applied_to_links_not_text(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[a link](/blog/post) and `href=\"/code\"`")
+        dest = os.path.join(self.tmp.name, "docs")
+        generate_pages(find_pages(self.content, dest, self.template), "/site/")
+
+        with open(os.path.join(dest, "index.html")) as f:
+            html = f.read()
+        self.assertIn('<a href="/site/blog/post">a link</a>', html)
+        self.assertIn('<code>href="/code"</code>', html)
+
@@ -1,6 +1,7 @@
-import unittest 
+import unittest
+import io 
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, EMPTY_PROPS
 
 class TestHTMLNode(unittest.TestCase):
     def test_htmlnode_creation_no_children(self):
@@ -83,4 +84,35 @@ class TestParentNode(unittest.TestCase):
 
         self.assertRaises(ValueError, parent_node.to_html)
 
-    
\ No newline at end of file
+    def test_iter_html_matches_to_html(self):
+        parent_node = ParentNode("div", [
+            LeafNode("b", "bold"),
+            ParentNode("p", [LeafNode(None, "text "), LeafNode("a", "link", {"href": "/x"})], {"class": "intro"}),
+        ])
+
+        self.assertEqual("".join(parent_node.iter_html()), parent_node.to_html())
+        self.assertEqual(
+            list(parent_node.iter_html()),
+            ["<div>", "<b>bold</b>", '<p class="intro">', "text ", '<a href="/x">link</a>', "</p>", "</div>"],
+        )
+
+    def test_write_html_streams_to_sink(self):
+        parent_node = ParentNode("ul", [LeafNode("li", "Item 1"), LeafNode("li", "Item 2")])
+        sink = io.StringIO()
+        parent_node.write_html(sink)
+
+        self.assertEqual(sink.getvalue(), "<ul><li>Item 1</li><li>Item 2</li></ul>")
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in [HTMLNode("p"), LeafNode("b", "bold"), ParentNode("div", [])]:
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_empty_props_are_shared(self):
+        first = LeafNode("b", "bold")
+        second = ParentNode("p", [first], {})
+
+        self.assertIs(first.props, EMPTY_PROPS)
+        self.assertIs(second.props, EMPTY_PROPS)
+        self.assertEqual(first.props_to_html(), "")
+        with self.assertRaises(TypeError):
+            first.props["href"] = "/"
@@ -0,0 +1,117 @@
+import unittest
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from unittest import mock
+from block_split import markdown_to_html_node
+from images import ImageInfo, apply_images, image_size, load_images, optimize_images, optimize_png
+
+'''
+    Builds a PNG of solid gray 8-bit pixels, deflated at level 1 and with a text chunk so there's something to optimize
+'''
+def make_png(width, height):
+    def chunk(chunk_type, body):
+        return struct.pack(">I", len(body)) + chunk_type + body + struct.pack(">I", zlib.crc32(chunk_type + body))
+
+    pixels = b"".join(b"\x00" + bytes([128]) * width for _ in range(height))
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)),
+        chunk(b"tEXt", b"Comment\x00" + b"x" * 200),
+        chunk(b"IDAT", zlib.compress(pixels, 1)),
+        chunk(b"IEND", b""),
+    ])
+
+'''
+    Returns the decompressed pixel data of a PNG
+'''
+def png_pixels(data):
+    position, idat = 8, []
+    while position < len(data):
+        length = struct.unpack(">I", data[position:position + 4])[0]
+        if data[position + 4:position + 8] == b"IDAT":
+            idat.append(data[position + 8:position + 8 + length])
+        position += 12 + length
+    return zlib.decompress(b"".join(idat))
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        self.state = os.path.join(root, ".build-cache", "images.json")
+        self.cache = os.path.join(root, ".build-cache", "images")
+        os.makedirs(os.path.join(self.static, "images"))
+        with open(os.path.join(self.static, "images", "wide.png"), "wb") as f:
+            f.write(make_png(1200, 300))
+        with open(os.path.join(self.static, "index.css"), "w") as f:
+            f.write("body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def optimize(self, widths=(480, 960)):
+        return optimize_images(self.static, self.docs, self.state, self.cache, widths=list(widths))
+
+    def test_image_size(self):
+        self.assertEqual(image_size(make_png(64, 32)), (64, 32))
+        self.assertEqual(image_size(b"GIF89a" + struct.pack("<HH", 10, 20)), (10, 20))
+        jpeg = b"\xff\xd8" + b"\xff\xe0" + struct.pack(">H", 4) + b"JF" + b"\xff\xc0" + struct.pack(">HBHH", 11, 8, 90, 160) + b"\x03"
+        self.assertEqual(image_size(jpeg), (160, 90))
+        self.assertIsNone(image_size(b"not an image"))
+
+    def test_optimize_png_is_lossless(self):
+        original = make_png(200, 100)
+        optimized = optimize_png(original)
+
+        self.assertLess(len(optimized), len(original))
+        self.assertEqual(png_pixels(optimized), png_pixels(original))
+        self.assertNotIn(b"tEXt", optimized)
+        self.assertEqual(image_size(optimized), (200, 100))
+
+    def test_results_are_cached_by_hash(self):
+        images, processed, reused = self.optimize()
+        self.assertEqual((processed, reused), (1, 0))
+        self.assertEqual(images["images/wide.png"].width, 1200)
+        self.assertNotIn("index.css", images)
+
+        with open(os.path.join(self.docs, "images", "wide.png"), "rb") as f:
+            self.assertEqual(png_pixels(f.read()), png_pixels(make_png(1200, 300)))
+
+        # A fresh docs directory is filled from the cache without processing anything
+        shutil.rmtree(self.docs)
+        with mock.patch("images.process_image", side_effect=AssertionError("processed again")):
+            self.assertEqual(self.optimize(), (images, 0, 1))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "images", "wide.png")))
+        self.assertEqual(load_images(self.state), images)
+
+    def test_variants_written_with_pillow(self):
+        def write_variant(source, dest, width):
+            with open(dest, "wb") as f:
+                f.write(make_png(width, width // 4))
+
+        with mock.patch("images.Image", object()), mock.patch("images.write_variant", side_effect=write_variant):
+            images, _, _ = self.optimize()
+            self.assertEqual(images["images/wide.png"].variants, [(480, "images/wide.480w.png"), (960, "images/wide.960w.png")])
+            self.assertTrue(os.path.exists(os.path.join(self.docs, "images", "wide.480w.png")))
+
+            # Variants no longer produced are removed from docs
+            images, _, _ = self.optimize(widths=[960, 2000])
+            self.assertEqual(images["images/wide.png"].variants, [(960, "images/wide.960w.png")])
+            self.assertFalse(os.path.exists(os.path.join(self.docs, "images", "wide.480w.png")))
+
+    def test_apply_images(self):
+        node = markdown_to_html_node("![wide](/images/wide.png) ![other](/images/other.png) ![ext](https://example.com/wide.png)")
+        apply_images(node, {"images/wide.png": ImageInfo(1200, 300, [(480, "images/wide.480w.png")])})
+
+        self.assertEqual(node.to_html(), (
+            '<div><p><img src="/images/wide.png" alt="wide" srcset="/images/wide.480w.png 480w, /images/wide.png 1200w"'
+            ' sizes="(max-width: 1200px) 100vw, 1200px" width="1200" height="300" loading="lazy"></img>'
+            ' <img src="/images/other.png" alt="other"></img> <img src="https://example.com/wide.png" alt="ext"></img></p></div>'
+        ))
+
+if __name__ == "__main__":
+    unittest.main()
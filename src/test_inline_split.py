@@ -130,6 +130,63 @@ class TestInlineSplit(unittest.TestCase):
         ]
         self.assertListEqual(expected_nodes, new_nodes)
 
+    def test_text_to_textnodes_matches_reference(self):
+        texts = [
+            "",
+            "Plain text only",
+            "**Bold**",
+            "a****b",
+            "This is **text** with an _italic_ word and a `code block`",
+            "Links [one](https://a.dev) and [two](https://b.dev) and ![img](/images/x.png) end",
+            "Image ![only](/x.png)",
+            "[link](/a) **bold** [link](/b) _italic_ ![img](/c)",
+        ]
+        for text in texts:
+            self.assertListEqual(text_to_textnodes_reference(text), text_to_textnodes(text))
+
+    def test_text_to_textnodes_nested_emphasis(self):
+        new_nodes = text_to_textnodes("A **bold _and italic_ with `code`** end")
+        expected_nodes = [
+            TextNode("A ", TextType.PLAIN_TEXT),
+            TextNode("bold and italic with code", TextType.BOLD_TEXT, children=[
+                TextNode("bold ", TextType.PLAIN_TEXT),
+                TextNode("and italic", TextType.ITALIC_TEXT),
+                TextNode(" with ", TextType.PLAIN_TEXT),
+                TextNode("code", TextType.CODE),
+            ]),
+            TextNode(" end", TextType.PLAIN_TEXT),
+        ]
+        self.assertListEqual(expected_nodes, new_nodes)
+
+    def test_text_to_textnodes_code_and_urls_are_literal(self):
+        new_nodes = text_to_textnodes("Run `snake_case **x**` or see [docs](https://a.dev/some_page_here)")
+        expected_nodes = [
+            TextNode("Run ", TextType.PLAIN_TEXT),
+            TextNode("snake_case **x**", TextType.CODE),
+            TextNode(" or see ", TextType.PLAIN_TEXT),
+            TextNode("docs", TextType.LINK, "https://a.dev/some_page_here"),
+        ]
+        self.assertListEqual(expected_nodes, new_nodes)
+
+    def test_text_to_textnodes_underscore_inside_word_is_literal(self):
+        self.assertListEqual([TextNode("my_var", TextType.BOLD_TEXT)], text_to_textnodes("**my_var**"))
+        self.assertListEqual([TextNode("use snake_case names", TextType.PLAIN_TEXT)], text_to_textnodes("use snake_case names"))
+        self.assertListEqual([TextNode("a_b", TextType.ITALIC_TEXT)], text_to_textnodes("_a_b_"))
+
+    def test_text_to_textnodes_empty_code_span_in_emphasis(self):
+        for text in ["**``**", "**a``b**", "x `` y"]:
+            self.assertListEqual(text_to_textnodes_reference(text), text_to_textnodes(text))
+
+    def test_text_to_textnodes_stray_delimiters_in_emphasis_are_literal(self):
+        for text in ["**use _ here**", "**a ` b**", "**a ` b** and `c`", "x **a _ b** y _c_"]:
+            self.assertListEqual(text_to_textnodes_reference(text), text_to_textnodes(text))
+
+    def test_text_to_textnodes_unmatched_delimiter_raises(self):
+        for text, delimiter in [("Invalid **Markdown", "**"), ("_open **closed**", "_"), ("a `code", "`")]:
+            with self.assertRaises(Exception) as context:
+                text_to_textnodes(text)
+            self.assertIn(f"Unmatched delimiter '{delimiter}' found in text", str(context.exception))
+
 
 class TestExtractMarkdownImagesAndLinks(unittest.TestCase):
     def test_extract_markdown_images(self):
@@ -0,0 +1,45 @@
+import unittest
+import os
+import tempfile
+from depgraph import DependencyGraph
+from generatepage import PageRecord
+from linkcheck import BrokenLink, check_links, link_report
+
+class TestLinkCheck(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.docs = os.path.join(root, "docs")
+        for rel_path in ["index.html", "blog/post/index.html", "about.html", "images/logo.png"]:
+            os.makedirs(os.path.dirname(os.path.join(self.docs, rel_path)), exist_ok=True)
+            open(os.path.join(self.docs, rel_path), "w").close()
+
+        self.home = os.path.join(root, "content", "index.md")
+        self.post = os.path.join(root, "content", "blog", "post", "index.md")
+        self.graph = DependencyGraph(self.docs)
+        self.graph.add_page(PageRecord(self.home, os.path.join(self.docs, "index.html"), "template.html", "Home", [
+            ("/blog/post", 3), ("/about#team", 3), ("https://example.com/missing", 4), ("#top", 5), ("/blog/missing", 7),
+        ]))
+        self.graph.add_page(PageRecord(self.post, os.path.join(self.docs, "blog", "post", "index.html"), "template.html", "Post", [
+            ("../../images/logo.png", 2), ("../../../../about", 2), ("images/missing.png", 6),
+        ]))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reports_broken_internal_links_with_lines(self):
+        self.assertEqual(check_links(self.graph, self.docs), [
+            BrokenLink(self.post, 6, "images/missing.png"),
+            BrokenLink(self.home, 7, "/blog/missing"),
+        ])
+
+    def test_link_report(self):
+        broken = check_links(self.graph, self.docs)
+        report = link_report(broken, self.tmp.name)
+
+        self.assertTrue(report.startswith("Link check: 2 broken link(s) in 2 page(s)"))
+        self.assertIn(f"  {os.path.join('content', 'index.md')}:7: /blog/missing", report)
+        self.assertEqual(link_report([], self.tmp.name), "Link check: no broken links")
+
+if __name__ == "__main__":
+    unittest.main()
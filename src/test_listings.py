@@ -0,0 +1,102 @@
+import unittest
+import os
+import tempfile
+from generatepage import PageRecord
+from metaindex import MetadataIndex
+from listings import listing_outputs, tag_slug, tag_slugs, update_listings
+
+class TestListings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.state = os.path.join(self.tmp.name, ".build-cache", "listings.json")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        self.index = MetadataIndex(os.path.join(self.tmp.name, ".build-cache", "metadata.sqlite"))
+        self.add("index", "2024-01-01", [])
+        for day in range(1, 6):
+            self.add(f"blog/post-{day}", f"2024-05-0{day}", ["elves"] if day % 2 else [])
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def add(self, name, day, tags, title=None):
+        record = PageRecord(f"content/{name}.md", os.path.join(self.docs, f"{name}.html"), self.template, title or name, [], metadata={"date": day, "tags": tags})
+        self.index.add_page(record, self.docs)
+
+    def update(self, page_size=2, basepath="/"):
+        return update_listings(self.docs, self.state, self.index, self.template, {}, page_size, basepath)
+
+    def read(self, output):
+        with open(os.path.join(self.docs, output)) as f:
+            return f.read()
+
+    def test_listings_written(self):
+        self.assertEqual(self.update()[1:], (11, 0, 0))
+        self.assertEqual(sorted(listing_outputs(self.state)), [
+            "archive/2024-01/index.html", "archive/2024-05/index.html", "archive/2024-05/page/2/index.html",
+            "archive/2024-05/page/3/index.html", "archive/index.html", "blog/index.html", "blog/page/2/index.html",
+            "blog/page/3/index.html", "tags/elves/index.html", "tags/elves/page/2/index.html", "tags/index.html",
+        ])
+
+        first = self.read("blog/index.html")
+        # Newest first, with a link to the next page
+        self.assertLess(first.index("blog/post-5.html"), first.index("blog/post-4.html"))
+        self.assertIn('<a href="/blog/page/2/" rel="next">Older</a>', first)
+        self.assertIn("<title>blog (page 3 of 3)</title>", self.read("blog/page/3/index.html"))
+        self.assertIn('<a href="/archive/2024-05/">2024-05</a> (5)', self.read("archive/index.html"))
+        # The root has an index page of its own
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_only_changed_groups_rendered(self):
+        self.update()
+        self.assertEqual(self.update(), (0, 0, 0, 0))
+
+        # Untagged, so only the blog and the archive of its month are queried
+        self.add("blog/post-2", "2024-05-02", [], title="Renamed")
+        groups, written, unchanged, removed = self.update()
+        self.assertEqual((groups, written, removed), (3, 2, 0))
+        self.assertIn("Renamed", self.read("blog/page/2/index.html"))
+
+    def test_removed_pages_shrink_listings(self):
+        self.update()
+        self.index.retain(["content/index.md", "content/blog/post-2.md"])
+        self.assertEqual(self.update()[3], 7)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "tags")))
+        self.assertEqual(sorted(listing_outputs(self.state)), ["archive/2024-01/index.html", "archive/2024-05/index.html", "archive/index.html", "blog/index.html"])
+
+    def test_settings_change_rerenders_everything(self):
+        self.update()
+        self.assertEqual(self.update(basepath="/site/")[1], 11)
+        self.assertIn('href="/site/blog/page/2/"', self.read("blog/index.html"))
+
+    def test_tag_slug(self):
+        self.assertEqual(tag_slug("Middle Earth!"), "middle-earth")
+        self.assertEqual(tag_slug("???"), "tag")
+        self.assertEqual(tag_slug("Café au lait"), "café-au-lait")
+        self.assertEqual(tag_slug("日本"), "日本")
+
+    def test_colliding_tags_get_their_own_listings(self):
+        slugs = tag_slugs(["C", "C++", "c", "elves"])
+        self.assertEqual(len(set(slugs.values())), 4)
+        self.assertEqual((slugs["c"], slugs["elves"]), ("c", "elves"))
+
+        self.add("blog/c", "2024-06-01", ["C"], title="Plain C")
+        self.update()
+        self.assertIn("Plain C", self.read("tags/c/index.html"))
+
+        # A second tag with the same slug moves the first one out of the way instead of sharing its page
+        self.add("blog/cpp", "2024-06-02", ["C++"], title="Templates")
+        self.update()
+        slugs = tag_slugs(["C", "C++"])
+        tags = self.read("tags/index.html")
+        for tag, title in [("C", "Plain C"), ("C++", "Templates")]:
+            self.assertIn(f'href="/tags/{slugs[tag]}/">{tag}</a>', tags)
+            self.assertIn(title, self.read(f"tags/{slugs[tag]}/index.html"))
+        self.assertNotIn("Templates", self.read(f"tags/{slugs['C']}/index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "tags", "c")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import os
+import tempfile
+from generatepage import PageRecord
+from metaindex import MetadataIndex
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, ".build-cache", "metadata.sqlite")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.index = MetadataIndex(self.db_path)
+        self.add("a", "2024-05-01", ["elves", "places"])
+        self.add("b", "2024-05-20", ["elves"])
+        self.add("c", "2023-12-31", [], description="Old")
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def add(self, name, day, tags, description=None):
+        metadata = {"date": day, "tags": tags}
+        if description is not None:
+            metadata["description"] = description
+        record = PageRecord(f"content/{name}.md", os.path.join(self.docs, f"{name}.html"), "template.html", name.upper(), [], metadata=metadata)
+        self.index.add_page(record, self.docs)
+
+    def test_queries(self):
+        self.assertEqual([page.output for page in self.index.pages()], ["b.html", "a.html", "c.html"])
+        self.assertEqual([page.output for page in self.index.pages(tag="elves", limit=1, offset=1)], ["a.html"])
+        self.assertEqual([page.title for page in self.index.pages(month="2023-12")], ["C"])
+        self.assertEqual(self.index.pages(month="2023-12")[0].description, "Old")
+        self.assertEqual(self.index.count(tag="elves", month="2024-05"), 2)
+        self.assertEqual(self.index.count(), 3)
+        self.assertEqual(self.index.tags(), [("elves", 2), ("places", 1)])
+        self.assertEqual(self.index.months(), [("2024-05", 2), ("2023-12", 1)])
+
+    def test_update_retain_and_persist(self):
+        self.add("a", "2024-06-01", ["places"])
+        self.assertEqual(self.index.retain(["content/a.md", "content/c.md"]), 1)
+        self.index.commit()
+        self.index.close()
+
+        self.index = MetadataIndex(self.db_path)
+        self.assertEqual(self.index.sources(), {"content/a.md", "content/c.md"})
+        self.assertEqual(self.index.tags(), [("places", 1)])
+        self.assertEqual(self.index.pages()[0].tags, ["places"])
+
+    def test_dirty_groups(self):
+        self.assertIn(("tag", "places"), self.index.dirty_groups())
+        self.index.clear_dirty()
+
+        # Re-adding an unchanged page marks nothing
+        self.add("b", "2024-05-20", ["elves"])
+        self.assertEqual(self.index.dirty_groups(), [])
+
+        self.add("b", "2024-06-01", ["dwarves"])
+        self.assertEqual(self.index.dirty_groups(), [("directory", ""), ("month", "2024-05"), ("month", "2024-06"), ("tag", "dwarves"), ("tag", "elves")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+from minify import MinifyReport, minify_css, minify_html, minify_static
+
+class TestMinify(unittest.TestCase):
+    def test_minify_html_collapses_whitespace(self):
+        html = "<html>\n  <body>\n    <h1>Title</h1>\n\n    <p>Some   <b>bold</b>\n  text</p>\n  </body>\n</html>\n"
+        self.assertEqual(minify_html(html), "<html> <body> <h1>Title</h1> <p>Some <b>bold</b> text</p> </body> </html>")
+
+    def test_minify_html_keeps_preformatted_content(self):
+        html = "<div>\n  <pre>  line 1\n    line 2</pre>\n  <p>a   <code>x  =  1</code>   b</p>\n  <PRE class=\"x\">\n  y</PRE>\n</div>"
+        self.assertEqual(minify_html(html), "<div> <pre>  line 1\n    line 2</pre> <p>a <code>x  =  1</code> b</p> <PRE class=\"x\">\n  y</PRE> </div>")
+
+    def test_minify_html_removes_comments(self):
+        html = "<p>a</p>  <!-- note\n -->  <!--[if IE]><p>old</p><![endif]--> <script>// <!-- keep -->\n</script>"
+        self.assertEqual(minify_html(html), "<p>a</p> <!--[if IE]><p>old</p><![endif]--> <script>// <!-- keep -->\n</script>")
+
+    def test_minify_css(self):
+        css = '/* comment */\nbody {\n  font-family: "A  B", serif;\n  color : red ;\n}\n\nul > li,\na :hover { margin: 0 auto; }\n/*! license */\n'
+        self.assertEqual(minify_css(css), 'body{font-family:"A  B",serif;color :red}ul>li,a :hover{margin:0 auto}/*! license */')
+        self.assertEqual(minify_css('a::before { content: "/* x */ ; }"; }'), 'a::before{content:"/* x */ ; }"}')
+
+    def test_report(self):
+        report = MinifyReport()
+        report.add(".css", 200, 150)
+        report.add(".html", 1000, 900)
+        report.add(".html", 1000, 900)
+
+        self.assertEqual(report.totals, {".css": [1, 200, 150], ".html": [2, 2000, 1800]})
+        lines = report.report().splitlines()
+        self.assertIn("25.0% saved", lines[1])
+        self.assertIn("10.0% saved", lines[2])
+        self.assertEqual(MinifyReport().report(), "Minified: nothing to minify")
+
+    def test_minify_static_is_cached(self):
+        with tempfile.TemporaryDirectory() as root:
+            static, docs = os.path.join(root, "static"), os.path.join(root, "docs")
+            state, cache = os.path.join(root, "minify.json"), os.path.join(root, "minify")
+            os.makedirs(static)
+            with open(os.path.join(static, "index.css"), "w") as f:
+                f.write("body {\n  margin: 0;\n}\n")
+            with open(os.path.join(static, "logo.png"), "wb") as f:
+                f.write(b"png")
+
+            report = MinifyReport()
+            self.assertEqual(minify_static(static, docs, state, cache, report), (["index.css"], 0))
+            self.assertEqual(report.totals, {".css": [1, 22, 14]})
+            with open(os.path.join(docs, "index.css")) as f:
+                self.assertEqual(f.read(), "body{margin:0}")
+
+            # Still in place: skipped. Gone from docs: restored from the cache without minifying again
+            self.assertEqual(minify_static(static, docs, state, cache, MinifyReport()), (["index.css"], 1))
+            os.remove(os.path.join(docs, "index.css"))
+            with mock.patch.dict("minify.MINIFIERS", {".css": mock.Mock(side_effect=AssertionError("minified again"))}):
+                self.assertEqual(minify_static(static, docs, state, cache, MinifyReport()), (["index.css"], 0))
+            self.assertTrue(os.path.exists(os.path.join(docs, "index.css")))
+
+            # Overwritten unminified by a build without minification: rewritten
+            with open(os.path.join(docs, "index.css"), "w") as f:
+                f.write("body {\n  margin: 0;\n}\n")
+            self.assertEqual(minify_static(static, docs, state, cache, MinifyReport()), (["index.css"], 0))
+            with open(os.path.join(docs, "index.css")) as f:
+                self.assertEqual(f.read(), "body{margin:0}")
+
+if __name__ == "__main__":
+    unittest.main()
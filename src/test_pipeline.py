@@ -0,0 +1,56 @@
+import unittest
+import os
+import time
+from unittest import mock
+from generatepage import find_pages, generate_pages, read_source
+from pipeline import PipelineReport, generate_pipelined
+from sitefixture import SiteTestCase
+
+class TestPipeline(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(20):
+            self.write(os.path.join(self.content, f"section-{i % 3}", f"page-{i}.md"), f"# Page {i}\n\nSome **bold** text")
+        self.write(os.path.join(self.content, "broken.md"), "No title in this page")
+        self.write(self.template, "<title>{{ Title }}</title><main>{{ Content }}</main>")
+
+    def read_tree(self, root):
+        outputs = {}
+        for dir_path, _, file_names in os.walk(root):
+            for file_name in file_names:
+                with open(os.path.join(dir_path, file_name)) as f:
+                    outputs[os.path.relpath(os.path.join(dir_path, file_name), root)] = f.read()
+        return outputs
+
+    def test_matches_generate_pages(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        generate_pages(find_pages(self.content, serial, self.template))
+
+        for workers in (1, 2):
+            dest = os.path.join(self.tmp.name, f"pipelined-{workers}")
+            records, report = [], PipelineReport()
+            errors = generate_pipelined(find_pages(self.content, dest, self.template), workers=workers, on_record=records.append, io_threads=2, report=report)
+
+            self.assertEqual([os.path.basename(from_path) for from_path, _ in errors], ["broken.md"])
+            self.assertEqual(self.read_tree(dest), self.read_tree(serial))
+            # In page order, like generate_pages
+            self.assertEqual([record.source for record in records], [src for src, _, _ in find_pages(self.content, dest, self.template) if not src.endswith("broken.md")])
+            self.assertEqual(report.pages, 21)
+
+    def test_slow_reads_overlap(self):
+        def slow_read(from_path):
+            time.sleep(0.02)
+            return read_source(from_path)
+
+        report = PipelineReport()
+        with mock.patch("pipeline.read_source", slow_read):
+            generate_pipelined(find_pages(self.content, os.path.join(self.tmp.name, "docs"), self.template), io_threads=8, report=report)
+
+        # 21 reads of 20ms on 8 threads: the renderer waits for far less than the reads took
+        self.assertGreater(report.busy["read"], 0.4)
+        self.assertLess(report.waited["read"], report.busy["read"] / 2)
+        self.assertGreater(report.overlap(), 1)
+        self.assertIn("x overlap", report.report())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import json
+import os
+import tempfile
+import profiling
+from block_split import markdown_to_html_node
+
+class TestProfiling(unittest.TestCase):
+    def tearDown(self):
+        profiling.disable()
+
+    def test_disabled_stage_is_shared_noop(self):
+        self.assertIs(profiling.stage("a"), profiling.stage("b"))
+
+    def test_nested_stages_attributed_to_page(self):
+        profiler = profiling.enable()
+        with profiling.stage("page", page="index.md"):
+            markdown_to_html_node("# Title\n\nSome **text**\n\n- a\n- b")
+        with profiling.stage("copy_directory"):
+            pass
+
+        pages = {name: page for name, page, _, _, _ in profiler.events}
+        self.assertEqual(pages["text_to_children"], "index.md")
+        self.assertEqual(pages["markdown_to_blocks"], "index.md")
+        self.assertIsNone(pages["copy_directory"])
+
+        totals = {name: calls for name, calls, _, _ in profiler.stage_totals()}
+        # One call per block plus the call that finds the end of the document
+        self.assertEqual(totals["markdown_to_blocks"], 4)
+        self.assertEqual(totals["text_to_children"], 4)
+        self.assertEqual([page for page, _, _ in profiler.slowest_pages()], ["index.md"])
+        self.assertIn("Stage breakdown:", profiler.report())
+
+    def test_memory_report(self):
+        own, _ = profiling.peak_rss()
+        if own is None:
+            self.skipTest("resource module not available")
+
+        self.assertGreater(profiling.current_rss(), 0)
+        self.assertRegex(profiling.memory_report(), r"^Peak memory: \d+\.\d MB")
+
+    def test_write_chrome_trace(self):
+        profiler = profiling.enable()
+        with profiling.stage("page", page="index.md"):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            trace_path = os.path.join(tmp, "trace.json")
+            profiler.write_chrome_trace(trace_path)
+            with open(trace_path) as f:
+                events = json.load(f)["traceEvents"]
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["name"], "page")
+        self.assertEqual(events[0]["ph"], "X")
+        self.assertEqual(events[0]["args"]["page"], "index.md")
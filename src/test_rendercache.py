@@ -0,0 +1,96 @@
+import unittest
+import os
+from unittest import mock
+from assets import AssetManifest
+from generatepage import render_page
+from images import ImageInfo
+from rendercache import URL_MARKER, CachedRender, RenderCache
+from sitefixture import SiteTestCase
+
+MARKDOWN = "# Home\n\n[Post](/blog/post) and ![logo](/images/logo.png) and [out](https://example.com)"
+TEMPLATE = '<html><title>{{ Title }}</title><link href="/index.css"><body>{{ Content }}</body></html>'
+
+class TestRenderCache(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = RenderCache(os.path.join(self.tmp.name, "render"))
+
+    def render(self, basepath, render_cache, assets=None, images=None):
+        source = os.path.join(self.tmp.name, "index.md")
+        template = os.path.join(self.tmp.name, "template.html")
+        dest = os.path.join(self.tmp.name, "docs", "index.html")
+        self.write(source, MARKDOWN)
+        self.write(template, TEMPLATE)
+        render_page(source, template, dest, basepath, render_cache=render_cache, assets=assets, images=images)
+        return self.read(dest)
+
+    def test_get_returns_what_was_put(self):
+        self.assertIsNone(self.cache.get(MARKDOWN))
+        self.cache.put(MARKDOWN, CachedRender("Home", f'<a href="{URL_MARKER}blog">Post</a>', [("/blog", 3)]))
+
+        cached = self.cache.get(MARKDOWN)
+        self.assertEqual(cached.title, "Home")
+        self.assertEqual(cached.html_for("/site/"), '<a href="/site/blog">Post</a>')
+        self.assertIsNone(self.cache.get(MARKDOWN + "\nEdited"))
+
+    def test_parser_version_is_part_of_the_key(self):
+        key = self.cache.key(MARKDOWN)
+        with mock.patch("rendercache.PARSER_VERSION", -1):
+            self.assertNotEqual(self.cache.key(MARKDOWN), key)
+
+    def test_cached_render_matches_uncached(self):
+        for basepath in ["/", "/site/"]:
+            expected = self.render(basepath, None)
+            self.assertEqual(self.render(basepath, self.cache), expected)
+            # Second render of each basepath is a cache hit
+            self.assertEqual(self.render(basepath, self.cache), expected)
+
+    def test_cached_render_with_fingerprinted_assets(self):
+        assets = AssetManifest({"index.css": "index.11111111.css", "images/logo.png": "images/logo.22222222.png"})
+        for basepath in ["/", "/site/"]:
+            expected = self.render(basepath, None, assets)
+            self.assertIn(f'src="{basepath}images/logo.22222222.png"', expected)
+            self.assertIn(f'href="{basepath}index.11111111.css"', expected)
+            self.assertEqual(self.render(basepath, self.cache, assets), expected)
+            self.assertEqual(self.render(basepath, self.cache, assets), expected)
+
+    def test_cached_render_with_image_variants(self):
+        assets = AssetManifest({"images/logo.png": "images/logo.22222222.png"})
+        images = {"images/logo.png": ImageInfo(800, 400, [(480, "images/logo.480w.png")])}
+        cache = self.cache.salted("images")
+        for basepath in ["/", "/site/"]:
+            expected = self.render(basepath, None, assets, images)
+            self.assertIn(f'srcset="{basepath}images/logo.480w.png 480w, {basepath}images/logo.22222222.png 800w"', expected)
+            self.assertEqual(self.render(basepath, cache, assets, images), expected)
+            self.assertEqual(self.render(basepath, cache, assets, images), expected)
+
+    def test_salt_is_part_of_the_key(self):
+        self.assertNotEqual(self.cache.salted("images").key(MARKDOWN), self.cache.key(MARKDOWN))
+
+    def test_cache_hit_skips_parsing(self):
+        self.render("/", self.cache)
+        with mock.patch("generatepage.markdown_to_html_node", side_effect=AssertionError("parsed again")):
+            html = self.render("/site/", self.cache)
+
+        self.assertIn('href="/site/blog/post"', html)
+        self.assertIn('src="/site/images/logo.png"', html)
+        self.assertIn('href="/site/index.css"', html)
+        self.assertIn('href="https://example.com"', html)
+
+    def test_prune_evicts_least_recently_used(self):
+        documents = [f"# Page {i}\n\n{'text ' * 100}" for i in range(3)]
+        for i, markdown in enumerate(documents):
+            self.cache.put(markdown, CachedRender(f"Page {i}", "x" * 1000, []))
+            os.utime(self.cache.entry_path(self.cache.key(markdown)), ns=(i * 10**9, i * 10**9))
+
+        # Using the oldest entry makes the second one the least recently used
+        self.cache.get(documents[0])
+        self.cache.max_bytes = 2500
+
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNotNone(self.cache.get(documents[0]))
+        self.assertIsNone(self.cache.get(documents[1]))
+        self.assertIsNotNone(self.cache.get(documents[2]))
+
+if __name__ == "__main__":
+    unittest.main()
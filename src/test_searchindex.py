@@ -0,0 +1,103 @@
+import unittest
+import json
+import os
+import tempfile
+from block_split import markdown_to_html_node
+from searchindex import MAX_TERMS_PER_PAGE, page_terms, search_outputs, shard_key, update_search_index
+
+class TestPageTerms(unittest.TestCase):
+    def test_counts_text_and_skips_code(self):
+        node = markdown_to_html_node("# Ring Lore\n\nThe **ring** of power, a ring.\n\n```\nsecret ring\n```\n\nUse `hidden` words")
+        terms = page_terms(node)
+
+        self.assertEqual(terms["ring"], 3)
+        self.assertEqual(terms["lore"], 1)
+        self.assertEqual(terms["words"], 1)
+        # Single characters aren't indexed, neither is code
+        self.assertNotIn("a", terms)
+        self.assertNotIn("secret", terms)
+        self.assertNotIn("hidden", terms)
+
+    def test_keeps_most_frequent_terms(self):
+        words = [f"word{i}" for i in range(MAX_TERMS_PER_PAGE + 10)]
+        node = markdown_to_html_node(" ".join(words) + " common common")
+        terms = page_terms(node)
+
+        self.assertEqual(len(terms), MAX_TERMS_PER_PAGE)
+        self.assertEqual(terms["common"], 2)
+
+    def test_shard_key(self):
+        self.assertEqual(shard_key("ring"), "r")
+        self.assertEqual(shard_key("42nd"), "4")
+        self.assertEqual(shard_key("_private"), "_")
+        self.assertEqual(shard_key("élan"), "_")
+
+class TestUpdateSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.state = os.path.join(self.tmp.name, ".build-cache", "search.json")
+        self.pages = {
+            "content/index.md": ("index.html", "Home", {"ring": 2, "bearer": 1}),
+            "content/blog/post/index.md": ("blog/post/index.html", "Post", {"ring": 1, "tower": 3}),
+            "content/about.md": ("about.html", "About", {"author": 1}),
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.docs, "search", name)) as f:
+            return json.load(f)
+
+    def ids(self):
+        return {url: page_id for page_id, (url, _) in enumerate(self.read("docs.json"))}
+
+    def test_writes_shards_and_docs(self):
+        self.assertEqual(update_search_index(self.docs, self.state, self.pages, "/site/"), (4, 0))
+
+        ids = self.ids()
+        self.assertEqual(set(ids), {"/site/", "/site/blog/post/", "/site/about.html"})
+        # Postings are in page id order
+        postings = sorted([(ids["/site/"], 2), (ids["/site/blog/post/"], 1)])
+        self.assertEqual(self.read("shard-r.json"), {"ring": [value for posting in postings for value in posting]})
+        self.assertEqual(self.read("shard-t.json"), {"tower": [ids["/site/blog/post/"], 3]})
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "search", "search.js")))
+        self.assertEqual(set(search_outputs(self.state)), {
+            "search/docs.json", "search/search.js", "search/shard-a.json", "search/shard-b.json", "search/shard-r.json", "search/shard-t.json",
+        })
+
+    def test_only_affected_shards_are_rewritten(self):
+        update_search_index(self.docs, self.state, self.pages)
+        self.assertEqual(update_search_index(self.docs, self.state, self.pages), (0, 4))
+
+        self.pages["content/about.md"] = ("about.html", "About", {"author": 1, "tolkien": 1})
+        # Shard a is recomputed for the changed page but its content is the same
+        self.assertEqual(update_search_index(self.docs, self.state, self.pages), (1, 3))
+        self.assertEqual(self.read("shard-t.json")["tolkien"], [self.ids()["/about.html"], 1])
+
+    def test_page_ids_are_stable(self):
+        update_search_index(self.docs, self.state, self.pages)
+        before = self.ids()
+
+        del self.pages["content/about.md"]
+        self.pages["content/new.md"] = ("new.html", "New", {"bearer": 5})
+        update_search_index(self.docs, self.state, self.pages)
+        after = self.ids()
+
+        self.assertEqual(after["/"], before["/"])
+        self.assertEqual(after["/blog/post/"], before["/blog/post/"])
+        # The removed page's id is reused and its terms are gone
+        self.assertEqual(after["/new.html"], before["/about.html"])
+        self.assertNotIn("/about.html", after)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "search", "shard-a.json")))
+
+    def test_deleted_shard_is_rewritten(self):
+        update_search_index(self.docs, self.state, self.pages)
+        os.remove(os.path.join(self.docs, "search", "shard-t.json"))
+
+        self.assertEqual(update_search_index(self.docs, self.state, self.pages), (1, 3))
+        self.assertIn("tower", self.read("shard-t.json"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import os
+import tempfile
+from assets import AssetManifest
+from htmlnode import LeafNode, ParentNode
+from template import Template, load_template, prefix_basepath
+
+class TestTemplate(unittest.TestCase):
+    def test_compile_segments(self):
+        template = Template("<title>{{ Title }}</title><p>{{Content}}</p>")
+
+        self.assertEqual(template.literals, ["<title>", "</title><p>", "</p>"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+
+    def test_render_named_slots(self):
+        template = Template("<h1>{{ Title }}</h1><time>{{ Date }}</time><meta content=\"{{ Description }}\">")
+        html = template.render({"Title": "Home", "Date": "2024-01-01"})
+
+        # Slots without a value render empty
+        self.assertEqual(html, "<h1>Home</h1><time>2024-01-01</time><meta content=\"\">")
+
+    def test_render_streams_html_nodes(self):
+        template = Template("<main>{{ Content }}</main>")
+        content = ParentNode("p", [LeafNode(None, "Hi "), LeafNode("b", "there")])
+
+        self.assertEqual(template.render({"Content": content}), "<main><p>Hi <b>there</b></p></main>")
+
+    def test_basepath_only_rewrites_template_attributes(self):
+        template = Template('<link href="/index.css"><script src="//cdn.example.com/x.js"></script>{{ Content }}')
+        html = template.render({"Content": 'text with href="/not-a-link"'}, "/site/")
+
+        self.assertEqual(html, '<link href="/site/index.css"><script src="//cdn.example.com/x.js"></script>text with href="/not-a-link"')
+
+    def test_fingerprinted_assets_in_template_attributes(self):
+        template = Template('<link href="/index.css"><a href="/about">About</a>{{ Content }}')
+        assets = AssetManifest({"index.css": "index.11111111.css"})
+
+        self.assertEqual(template.render({"Content": ""}, "/site/", assets), '<link href="/site/index.11111111.css"><a href="/site/about">About</a>')
+        self.assertEqual(template.render({"Content": ""}, "/site/"), '<link href="/site/index.css"><a href="/site/about">About</a>')
+
+    def test_prefix_basepath(self):
+        self.assertEqual(prefix_basepath("/images/a.png", "/site/"), "/site/images/a.png")
+        self.assertEqual(prefix_basepath("https://boot.dev", "/site/"), "https://boot.dev")
+        self.assertEqual(prefix_basepath("/images/a.png", "/"), "/images/a.png")
+
+    def test_load_template_cached_until_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template_path = os.path.join(tmp, "template.html")
+            with open(template_path, "w") as f:
+                f.write("<p>{{ Title }}</p>")
+
+            template = load_template(template_path)
+            self.assertIs(load_template(template_path), template)
+
+            with open(template_path, "w") as f:
+                f.write("<h1>{{ Title }}</h1>")
+            os.utime(template_path, ns=(0, 0))
+
+            self.assertEqual(load_template(template_path).render({"Title": "x"}), "<h1>x</h1>")
+
+    def test_partials_are_included(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "partials"))
+            with open(os.path.join(tmp, "partials", "header.html"), "w") as f:
+                f.write("<h1>{{ Title }}</h1>{{> nav.html }}")
+            with open(os.path.join(tmp, "partials", "nav.html"), "w") as f:
+                f.write('<a href="/">Home</a>')
+            template_path = os.path.join(tmp, "template.html")
+            with open(template_path, "w") as f:
+                f.write("{{> partials/header.html }}<main>{{ Content }}</main>")
+
+            template = load_template(template_path)
+            self.assertEqual(template.partials, [os.path.join(tmp, "partials", "header.html"), os.path.join(tmp, "partials", "nav.html")])
+            self.assertEqual(template.render({"Title": "Hi", "Content": "x"}, "/site/"), '<h1>Hi</h1><a href="/site/">Home</a><main>x</main>')
+
+            # Editing a partial recompiles the template including it
+            with open(os.path.join(tmp, "partials", "nav.html"), "w") as f:
+                f.write("<nav></nav>")
+            os.utime(os.path.join(tmp, "partials", "nav.html"), ns=(0, 0))
+            self.assertEqual(load_template(template_path).render({"Title": "Hi"}), "<h1>Hi</h1><nav></nav><main></main>")
+
+    def test_partial_cycle_raises(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "a.html"), "w") as f:
+                f.write("{{> b.html }}")
+            with open(os.path.join(tmp, "b.html"), "w") as f:
+                f.write("{{> a.html }}")
+
+            self.assertRaises(ValueError, Template, "{{> a.html }}", os.path.join(tmp, "template.html"))
@@ -67,5 +67,18 @@ class TestTextNode(unittest.TestCase):
         self.assertEqual(html_node.value, "")   
         self.assertEqual(html_node.props, {"src": "https://boot.dev/logo.png", "alt": "Boot.dev Logo"})
 
+    def test_nested_text(self):
+        node = TextNode("bold and italic", TextType.BOLD_TEXT, children=[
+            TextNode("bold ", TextType.PLAIN_TEXT),
+            TextNode("and italic", TextType.ITALIC_TEXT),
+        ])
+        html_node = node.text_node_to_html_node()
+
+        self.assertEqual(html_node.to_html(), "<b>bold <i>and italic</i></b>")
+
+    def test_invalid_text_type_raises(self):
+        self.assertRaises(ValueError, TextNode("text", None).text_node_to_html_node)
+        self.assertRaises(ValueError, TextNode("code", TextType.CODE, children=[]).text_node_to_html_node)
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+from watch import SiteWatcher
+from metaindex import MetadataIndex
+from depgraph import DependencyGraph
+from sitefixture import SiteTestCase
+
+class TestSiteWatcher(SiteTestCase):
+    # Every write is visible to the watcher's (mtime, size) snapshot
+    bump_mtime = True
+
+    def setUp(self):
+        super().setUp()
+
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nText")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+        self.watcher = SiteWatcher(self.static, self.content, self.template, self.docs)
+
+    def poll_and_rebuild(self):
+        changed, removed = self.watcher.poll()
+        return self.watcher.rebuild(changed, removed)
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(), (set(), set()))
+
+    def test_markdown_edit_rebuilds_one_page(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nEdited")
+
+        self.assertEqual(self.poll_and_rebuild(), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "blog", "post.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_template_edit_rebuilds_every_page(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.poll_and_rebuild(), 2)
+
+    def test_template_override_rebuilds_its_pages(self):
+        self.write(os.path.join(self.content, "blog", "template.html"), "<article>{{ Content }}</article>")
+        self.assertEqual(self.poll_and_rebuild(), 1)
+
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            self.assertTrue(f.read().startswith("<article>"))
+
+    def test_partial_edit_rebuilds_pages_using_it(self):
+        footer = os.path.join(os.path.dirname(self.template), "footer.html")
+        self.write(footer, "<footer>v1</footer>")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}{{> footer.html }}")
+        self.poll_and_rebuild()
+
+        self.write(footer, "<footer>v2</footer>")
+        self.assertEqual(self.poll_and_rebuild(), 2)
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertTrue(f.read().endswith("<footer>v2</footer>"))
+
+    def test_added_and_removed_files(self):
+        self.write(os.path.join(self.content, "new.md"), "# New\n\nPage")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+        self.assertEqual(self.poll_and_rebuild(), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "new.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "images", "a.png")))
+
+        os.remove(os.path.join(self.content, "new.md"))
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.assertEqual(self.poll_and_rebuild(), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "new.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images")))
+
+    def test_metadata_index_kept_up_to_date(self):
+        metadata_db = os.path.join(self.tmp.name, ".build-cache", "metadata.sqlite")
+        self.watcher = SiteWatcher(self.static, self.content, self.template, self.docs, build_options={"metadata_db": metadata_db})
+        self.assertFalse(self.watcher.incremental)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nEdited")
+        self.poll_and_rebuild()
+
+        self.write(os.path.join(self.content, "blog", "post.md"), "---\ntags: [elves]\n---\n# Post\n\nText")
+        self.write(os.path.join(self.content, "blog", "new.md"), "# New\n\nText")
+        os.remove(os.path.join(self.content, "index.md"))
+        self.poll_and_rebuild()
+
+        index = MetadataIndex(metadata_db)
+        self.assertEqual(index.sources(), {os.path.join(self.content, "blog", "post.md"), os.path.join(self.content, "blog", "new.md")})
+        self.assertEqual(index.tags(), [("elves", 1)])
+        index.close()
+
+    def test_dependency_graph_kept_up_to_date(self):
+        depgraph = os.path.join(self.tmp.name, ".build-cache", "depgraph.json")
+        self.watcher = SiteWatcher(self.static, self.content, self.template, self.docs, build_options={"depgraph_path": depgraph})
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nSee [home](/index.html)")
+        self.write(os.path.join(self.static, "extra.css"), "p {}")
+        os.remove(os.path.join(self.content, "index.md"))
+        self.poll_and_rebuild()
+
+        graph = DependencyGraph.load(depgraph, self.docs)
+        post = os.path.join(self.content, "blog", "post.md")
+        self.assertEqual(list(graph.pages), [post])
+        self.assertEqual(graph.pages[post]["links"], [["/index.html", 3]])
+        self.assertIn(os.path.join(self.static, "extra.css"), graph.static)
+
+    def test_build_options_rebuild_incrementally(self):
+        manifest = os.path.join(self.tmp.name, ".build-cache", "manifest.json")
+        minify_state = os.path.join(self.tmp.name, ".build-cache", "minify.json")
+        self.write(self.template, '<title>{{ Title }}</title>\n  <link href="/index.css">\n{{ Content }}')
+        watcher = SiteWatcher(self.static, self.content, self.template, self.docs, manifest_path=manifest, build_options={"fingerprint": True, "minify_state": minify_state})
+        self.assertTrue(watcher.incremental)
+
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nEdited")
+        changed, removed = watcher.poll()
+        self.assertGreater(watcher.rebuild(changed, removed), 0)
+        with open(os.path.join(self.docs, "blog", "post.html")) as f:
+            html = f.read()
+        # Fingerprinted and minified like the build the options came from
+        self.assertNotIn('href="/index.css"', html)
+        self.assertNotIn("\n  ", html)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "asset-manifest.json")))
+
+        with self.assertRaises(ValueError):
+            SiteWatcher(self.static, self.content, self.template, self.docs, build_options={"fingerprint": True})
@@ -1,5 +1,5 @@
 from enum import Enum 
-from htmlnode import LeafNode
+from htmlnode import LeafNode, ParentNode
 
 '''
     Enum for the different types of inline text nodes
@@ -19,37 +19,65 @@ class TextNode:
         text (str): REQUIRED - The text content of the node
         text_type (TextType): REQUIRED - The type of text node (from TextType enum)
         url (str): OPTIONAL - The URL for link or image types. Defaults to an empty string.
+        children (list[TextNode] | None): OPTIONAL - Nested inline nodes for bold/italic text containing
+            other formatting, text is then the plain text of all children. Defaults to None.
     '''
-    def __init__(self, text: str, text_type: TextType, url: str = ""):
+    # Slots instead of a per-instance __dict__, every inline span of every page is a TextNode
+    __slots__ = ("text", "text_type", "url", "children")
+
+    def __init__(self, text: str, text_type: TextType, url: str = "", children: list["TextNode"] | None = None):
         self.text = text
         self.text_type = text_type
         self.url = url  # Used for links and images, defaulted to none
+        self.children = children
     
     def __eq__(self, other):
         if not isinstance(other, TextNode):
             return False 
         
-        return self.text == other.text and self.text_type == other.text_type and self.url == other.url
+        return self.text == other.text and self.text_type == other.text_type and self.url == other.url and self.children == other.children
     
     def __repr__(self):
+        if self.children is not None:
+            return f"TextNode({self.text}, {self.text_type.value}, {self.url}, {self.children})"
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
     
     '''
         Converts a TextNode into a corresponding HTMLNode (LeafNode)
     '''
     def text_node_to_html_node(self):
-        match self.text_type:
-            case TextType.PLAIN_TEXT:
-                return LeafNode(None, self.text)
-            case TextType.BOLD_TEXT:
-                return LeafNode("b", self.text)
-            case TextType.ITALIC_TEXT:
-                return LeafNode("i", self.text)
-            case TextType.CODE:
-                return LeafNode("code", self.text)
-            case TextType.LINK:
-                return LeafNode("a", self.text, {"href": self.url})
-            case TextType.IMAGE:
-                return LeafNode("img", "", {"src": self.url, "alt": self.text})
-            case _:
-                raise ValueError("ERROR: Invalid TextType provided to TextNode")
+        if self.children is not None:
+            return self.nested_text_node_to_html_node()
+
+        converter = LEAF_CONVERTERS.get(self.text_type)
+        if converter is None:
+            raise ValueError("ERROR: Invalid TextType provided to TextNode")
+        return converter(self)
+
+    '''
+        Converts a TextNode with nested children into a ParentNode wrapping the children's HTMLNodes
+    '''
+    def nested_text_node_to_html_node(self):
+        children = [child.text_node_to_html_node() for child in self.children]
+
+        tag = NESTED_TAGS.get(self.text_type)
+        if tag is None:
+            raise ValueError("ERROR: Only bold and italic TextNodes can have children")
+        return ParentNode(tag, children)
+
+# TextType -> function building the LeafNode for a TextNode without children,
+# looked up once per node instead of walking a match chain
+LEAF_CONVERTERS = {
+    TextType.PLAIN_TEXT: lambda node: LeafNode(None, node.text),
+    TextType.BOLD_TEXT: lambda node: LeafNode("b", node.text),
+    TextType.ITALIC_TEXT: lambda node: LeafNode("i", node.text),
+    TextType.CODE: lambda node: LeafNode("code", node.text),
+    TextType.LINK: lambda node: LeafNode("a", node.text, {"href": node.url}),
+    TextType.IMAGE: lambda node: LeafNode("img", "", {"src": node.url, "alt": node.text}),
+}
+
+# TextType -> tag of the ParentNode for a TextNode with children
+NESTED_TAGS = {
+    TextType.BOLD_TEXT: "b",
+    TextType.ITALIC_TEXT: "i",
+}
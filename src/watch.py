@@ -0,0 +1,357 @@
+from os import path
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from build import collect_record, incremental_build, prune_render_cache, record_dependencies, remove_output, template_partials, update_metadata
+from copystatic import transfer_file
+from generatepage import TEMPLATE_OVERRIDE_NAME, PageBuildError, find_pages, generate_pages
+from rendercache import RenderCache
+from metaindex import MetadataIndex
+from depgraph import DependencyGraph
+import os
+import threading
+import time
+
+# incremental_build options adding outputs (or changing them) that SiteWatcher's own rebuilds don't keep up to date.
+# With any of them on, every rebuild is an incremental_build instead
+INCREMENTAL_OPTIONS = ("precompress_state", "search_state", "fingerprint", "image_state", "minify_state", "feeds_state", "listings_state")
+
+# Endpoint the injected script listens on for reload events
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = f'<script>new EventSource("{LIVE_RELOAD_PATH}").onmessage = () => location.reload();</script>'
+
+'''
+    Records the (mtime, size) of every file below a directory, cheap enough to repeat many times a second
+    Args:
+        root (str): REQUIRED - Directory to scan
+    Returns:
+        dict[str, tuple[int, int]]: File path -> (mtime in ns, size)
+'''
+def scan_tree(root: str):
+    files = {}
+    if not path.isdir(root):
+        return files
+
+    dirs = [root]
+    while dirs:
+        with os.scandir(dirs.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+    return files
+
+class ReloadNotifier:
+
+    '''
+    ReloadNotifier class, lets any number of open live reload connections wait for the next rebuild
+    '''
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    '''
+    Blocks until the version moves past seen or timeout seconds pass, returns the current version
+    '''
+    def wait(self, seen: int, timeout: float):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != seen, timeout)
+            return self.version
+
+class SiteWatcher:
+
+    '''
+    SiteWatcher class, polls content, static, the template and its partials for changes and regenerates
+    only the outputs they affect: one page for a markdown edit, every page using a template for a template
+    (or partial) edit, one file for a static edit.
+    Args:
+        static_path (str): REQUIRED - Path to the static assets directory
+        content_path (str): REQUIRED - Path to the markdown content directory
+        template_path (str): REQUIRED - Path to the default HTML template file
+        docs_path (str): REQUIRED - Path to the output directory
+        basepath (str): OPTIONAL - Base path to use for generated links, default is "/"
+        workers (int): OPTIONAL - Number of worker processes for large rebuilds, default is 1
+        render_cache (RenderCache | None): OPTIONAL - Cache of rendered page bodies, so a template edit only
+            re-runs the template step of the pages using it. Defaults to None.
+        manifest_path (str | None): OPTIONAL - Path to the build manifest file, needed with build_options. Defaults to None.
+        build_options (dict | None): OPTIONAL - Keyword arguments of incremental_build (fingerprint, minify_state, ...).
+            With any of INCREMENTAL_OPTIONS on, rebuilds run incremental_build with them, so fingerprinted, minified
+            and optimized outputs, the search index, feeds, listings and compressed variants stay up to date.
+            Otherwise the depgraph_path and metadata_db options still get the entries of every page rebuilt, see
+            render_pages. Defaults to None.
+    '''
+    def __init__(self, static_path: str, content_path: str, template_path: str, docs_path: str, basepath: str = "/", workers: int = 1, render_cache: RenderCache | None = None, manifest_path: str | None = None, build_options: dict | None = None):
+        self.static_path = static_path
+        self.content_path = content_path
+        self.template_path = template_path
+        self.docs_path = docs_path
+        self.basepath = basepath
+        self.workers = workers
+        self.render_cache = render_cache
+        self.manifest_path = manifest_path
+        self.build_options = build_options or {}
+        self.incremental = any(self.build_options.get(name) for name in INCREMENTAL_OPTIONS)
+        if self.incremental and manifest_path is None:
+            raise ValueError("Rebuilding with build options needs a manifest_path")
+        depgraph_path = self.build_options.get("depgraph_path")
+        # Kept in memory between rebuilds, saved after each
+        self.graph = DependencyGraph.load(depgraph_path, docs_path) if depgraph_path is not None and not self.incremental else None
+        self.pages = self.find_pages()
+        self.partials = self.find_partials()
+        self.snapshot = self.scan()
+        # (source MD path, error) for every page the last rebuild failed to render
+        self.errors = []
+
+    '''
+    Returns source MD path -> (destination HTML path, template path) for every page
+    '''
+    def find_pages(self):
+        return {from_path: (dest_path, template) for from_path, dest_path, template in find_pages(self.content_path, self.docs_path, self.template_path)}
+
+    '''
+    Returns partial path -> paths of the templates including it, for every template in use
+    '''
+    def find_partials(self):
+        partials = {}
+        for template in {self.template_path, *(template for _, template in self.pages.values())}:
+            for partial in template_partials(template):
+                partials.setdefault(partial, set()).add(template)
+        return partials
+
+    def scan(self):
+        files = scan_tree(self.content_path)
+        files.update(scan_tree(self.static_path))
+        for file_path in [self.template_path, *self.partials]:
+            if path.exists(file_path):
+                stat = os.stat(file_path)
+                files[file_path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    '''
+    Rescans the watched files and returns the (changed or added, removed) file paths since the last poll
+    '''
+    def poll(self):
+        snapshot = self.scan()
+        changed = {file_path for file_path, version in snapshot.items() if self.snapshot.get(file_path) != version}
+        removed = self.snapshot.keys() - snapshot.keys()
+        self.snapshot = snapshot
+        return changed, removed
+
+    '''
+    Regenerates the outputs affected by a set of changed and removed files
+    Args:
+        changed (set[str]): REQUIRED - Files that were added or modified
+        removed (set[str]): REQUIRED - Files that were deleted
+    Returns:
+        int: Number of outputs written or removed
+    '''
+    def rebuild(self, changed: set[str], removed: set[str]):
+        if self.incremental:
+            return self.build_incremental()
+
+        old_pages = self.pages
+        # Adding or removing pages or template overrides changes the page list
+        if any(self.is_page_structure(file_path) for file_path in (changed - old_pages.keys()) | removed):
+            self.pages = self.find_pages()
+
+        stale, outputs = set(), 0
+        templates_changed = False
+
+        for file_path in sorted(changed | removed):
+            if file_path in self.partials:
+                templates_changed = True
+                for template in self.partials[file_path]:
+                    stale.update(from_path for from_path, (_, page_template) in self.pages.items() if page_template == template)
+            elif file_path.startswith(self.static_path + os.sep):
+                dest_path = path.join(self.docs_path, path.relpath(file_path, self.static_path))
+                if file_path in removed:
+                    remove_output(dest_path, self.docs_path)
+                else:
+                    transfer_file(file_path, dest_path)
+                outputs += 1
+            elif file_path == self.template_path or path.basename(file_path) == TEMPLATE_OVERRIDE_NAME:
+                templates_changed = True
+                # Pages that used the template before or after the change
+                for pages in (old_pages, self.pages):
+                    stale.update(from_path for from_path, (_, template) in pages.items() if template == file_path)
+            elif file_path.endswith(".md"):
+                if file_path in removed:
+                    remove_output(old_pages[file_path][0], self.docs_path)
+                    outputs += 1
+                else:
+                    stale.add(file_path)
+
+        if templates_changed:
+            # An edited template or partial may include different partials now
+            self.partials = self.find_partials()
+
+        stale_pages = [(from_path, *self.pages[from_path]) for from_path in sorted(stale) if from_path in self.pages]
+        self.errors = self.render_pages(stale_pages)
+        if self.errors:
+            print(PageBuildError(self.errors))
+
+        return outputs + len(stale_pages)
+
+    '''
+    Renders pages with generate_pages and records them like a build does: with a depgraph_path build option, the
+    dependency graph gets their entries, loses those of removed pages and is saved, and with a metadata_db one,
+    the metadata index gets their rows and loses those of removed pages. Returns (source MD path, error) for every
+    page that failed.
+    Args:
+        stale_pages (list[tuple[str, str, str]]): REQUIRED - (source MD path, destination HTML path, template path) triples
+    '''
+    def render_pages(self, stale_pages: list[tuple[str, str, str]]):
+        metadata_db = self.build_options.get("metadata_db")
+        metadata_index = MetadataIndex(metadata_db) if metadata_db is not None else None
+        errors = generate_pages(
+            stale_pages, self.basepath, self.workers if len(stale_pages) > 1 else 1, self.render_cache,
+            on_record=lambda record: collect_record(record, self.docs_path, self.graph, None, None, metadata_index=metadata_index),
+        )
+        pages = [(from_path, *page) for from_path, page in sorted(self.pages.items())]
+        if self.graph is not None:
+            for from_path in self.graph.pages.keys() - self.pages.keys():
+                del self.graph.pages[from_path]
+            # Templates may include other partials now
+            self.graph.templates = {}
+            record_dependencies(self.graph, self.static_path, pages)
+            self.graph.save(self.build_options["depgraph_path"])
+        if metadata_index is not None:
+            update_metadata(metadata_index, pages, len(stale_pages) - len(errors))
+        return errors
+
+    '''
+    Runs incremental_build with the build options, then refreshes the page list and partials. Returns the number
+    of outputs written or removed, 0 when a page failed.
+    '''
+    def build_incremental(self):
+        try:
+            rendered, copied, removed = incremental_build(self.static_path, self.content_path, self.template_path, self.docs_path, self.manifest_path, self.basepath, self.workers, render_cache=self.render_cache, **self.build_options)
+            self.errors = []
+        except PageBuildError as error:
+            print(error)
+            rendered, copied, removed = 0, 0, 0
+            self.errors = error.errors
+
+        self.pages = self.find_pages()
+        self.partials = self.find_partials()
+        return rendered + copied + removed
+
+    def is_page_structure(self, file_path: str):
+        return file_path.endswith(".md") or path.basename(file_path) == TEMPLATE_OVERRIDE_NAME
+
+'''
+    Returns a request handler class serving docs_path, with the live reload script injected into HTML pages
+    and a server-sent events endpoint that fires after every rebuild
+'''
+def make_handler(docs_path: str, notifier: ReloadNotifier):
+    class LiveReloadHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=docs_path, **kwargs)
+
+        def do_GET(self):
+            if self.path == LIVE_RELOAD_PATH:
+                return self.send_events()
+
+            file_path = self.translate_path(self.path)
+            if path.isdir(file_path):
+                file_path = path.join(file_path, "index.html")
+            if file_path.endswith(".html") and path.isfile(file_path):
+                return self.send_html(file_path)
+
+            return super().do_GET()
+
+        def send_html(self, file_path: str):
+            with open(file_path, "rb") as f:
+                body = f.read()
+            script = LIVE_RELOAD_SCRIPT.encode()
+            if b"</body>" in body:
+                body = body.replace(b"</body>", script + b"</body>", 1)
+            else:
+                body += script
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_events(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+
+            seen = notifier.version
+            try:
+                while True:
+                    version = notifier.wait(seen, timeout=15)
+                    # A comment line keeps idle connections open, a data line triggers the reload
+                    self.wfile.write(b"data: reload\n\n" if version != seen else b": ping\n\n")
+                    self.wfile.flush()
+                    seen = version
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    return LiveReloadHandler
+
+'''
+    Builds the site incrementally, serves docs with live reload and rebuilds affected outputs whenever
+    content, static files or templates change. Runs until interrupted.
+    Args:
+        static_path (str): REQUIRED - Path to the static assets directory
+        content_path (str): REQUIRED - Path to the markdown content directory
+        template_path (str): REQUIRED - Path to the default HTML template file
+        docs_path (str): REQUIRED - Path to the output directory
+        manifest_path (str): REQUIRED - Path to the build manifest file
+        basepath (str): OPTIONAL - Base path to use for generated links, default is "/"
+        workers (int): OPTIONAL - Number of worker processes, default is 1
+        port (int): OPTIONAL - Port to serve on, default is 8888
+        interval (float): OPTIONAL - Seconds between polls, default is 0.05
+        render_cache (RenderCache | None): OPTIONAL - Cache of rendered page bodies, pruned when watching stops. Defaults to None.
+        depgraph_path (str | None): OPTIONAL - File the initial build saves its DependencyGraph to. Defaults to None.
+        build_options (dict | None): OPTIONAL - Other keyword arguments of incremental_build, used by the initial build
+            and, see SiteWatcher, by rebuilds. Defaults to None.
+    Returns:
+        None
+'''
+def watch(static_path: str, content_path: str, template_path: str, docs_path: str, manifest_path: str, basepath: str = "/", workers: int = 1, port: int = 8888, interval: float = 0.05, render_cache: RenderCache | None = None, depgraph_path: str | None = None, build_options: dict | None = None):
+    build_options = {"depgraph_path": depgraph_path, **(build_options or {})}
+    try:
+        incremental_build(static_path, content_path, template_path, docs_path, manifest_path, basepath, workers, render_cache=render_cache, **build_options)
+    except PageBuildError as error:
+        print(error)
+
+    watcher = SiteWatcher(static_path, content_path, template_path, docs_path, basepath, workers, render_cache, manifest_path, build_options)
+    notifier = ReloadNotifier()
+    server = ThreadingHTTPServer(("", port), make_handler(docs_path, notifier))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {docs_path} at http://localhost:{port}, watching for changes (Ctrl+C to stop)")
+
+    try:
+        while True:
+            time.sleep(interval)
+            changed, removed = watcher.poll()
+            if not changed and not removed:
+                continue
+
+            start = time.perf_counter()
+            outputs = watcher.rebuild(changed, removed)
+            notifier.notify()
+            print(f"Rebuilt {outputs} output(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        print("Stopping watch")
+    finally:
+        server.shutdown()
+        if render_cache is not None:
+            prune_render_cache(render_cache)